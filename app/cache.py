@@ -0,0 +1,43 @@
+"""
+Small in-process caches shared by the feature blueprints.
+
+Each uwsgi worker keeps its own copy; entries are tagged with a version that
+callers read cheaply from the database, so a stale entry is simply replaced.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class VersionedCache:
+    """Thread-safe LRU mapping key -> (version, value)"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, version):
+        """Cached value for `key` if it was stored at `version`, else None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._data[key] = (version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -8,12 +8,24 @@ Add to app/__init__.py:
 Usage:
     flask seed-exercises
     flask seed-all
+    flask rebuild-user-stats
+    flask backfill-session-summaries
+    flask rebuild-personal-records
+    flask backfill-rollups --workers 8
+    flask rebuild-monthly-volumes
+    flask flush-set-autosaves
+    flask backfill-exercise-logs --chunk-size 500
+    flask import-workouts history.csv --user-id 1
+    flask export-columnar exports/sets
+    flask archive-workouts --older-than-months 12
+    flask compact-workouts --older-than-months 24
 """
 
 import click
 from flask import Flask
 from app.extensions import db
 from app.exercises.models import Exercise
+from app.exercises.catalog import bump_catalog_version
 
 
 def init_cli(app: Flask):
@@ -30,6 +42,7 @@ def init_cli(app: Flask):
                 click.echo("❌ Cancelled")
                 return
             Exercise.query.delete()
+            bump_catalog_version()
             db.session.commit()
 
         exercises_data = [
@@ -281,6 +294,7 @@ def init_cli(app: Flask):
         # Bulk insert
         try:
             db.session.bulk_save_objects(exercises)
+            bump_catalog_version()
             db.session.commit()
             click.echo(f"✅ Successfully seeded {len(exercises)} exercises!")
 
@@ -307,3 +321,345 @@ def init_cli(app: Flask):
         ctx.invoke(seed_exercises)
 
         click.echo("\n✅ All data seeded successfully!")
+
+    @app.cli.command("rebuild-user-stats")
+    @click.option("--user-id", type=int, help="Rebuild a single user only")
+    def rebuild_user_stats_command(user_id):
+        """Recompute the per-user workout stats rollup from scratch"""
+        from app.users.models import User
+        from app.workouts.stats import rebuild_user_stats
+
+        click.echo("🔄 Rebuilding user stats...")
+
+        if user_id:
+            user_ids = [user_id]
+        else:
+            user_ids = [uid for (uid,) in db.session.query(User.id).order_by(User.id)]
+
+        try:
+            for uid in user_ids:
+                rebuild_user_stats(uid)
+                db.session.commit()
+            click.echo(f"✅ Rebuilt stats for {len(user_ids)} users")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error rebuilding stats: {str(e)}", err=True)
+
+    @app.cli.command("backfill-session-summaries")
+    @click.option("--batch-size", default=500, show_default=True)
+    def backfill_session_summaries(batch_size):
+        """Store summary columns on completed sessions that don't have them"""
+        from app.workouts.models import WorkoutSession
+        from app.workouts.stats import refresh_session_summary
+
+        click.echo("🔄 Backfilling session summaries...")
+
+        total = 0
+        try:
+            while True:
+                batch = (
+                    WorkoutSession.query.filter(
+                        WorkoutSession.is_completed == True,
+                        WorkoutSession.summary_volume.is_(None),
+                    )
+                    .order_by(WorkoutSession.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not batch:
+                    break
+                for workout in batch:
+                    refresh_session_summary(workout)
+                db.session.commit()
+                total += len(batch)
+            click.echo(f"✅ Backfilled {total} sessions")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error backfilling summaries: {str(e)}", err=True)
+
+    @app.cli.command("rebuild-personal-records")
+    @click.option("--user-id", type=int, help="Rebuild a single user only")
+    def rebuild_personal_records_command(user_id):
+        """Recompute the personal-record index from completed sets"""
+        from app.users.models import User
+        from app.workouts.records import rebuild_personal_records
+
+        click.echo("🔄 Rebuilding personal records...")
+
+        if user_id:
+            user_ids = [user_id]
+        else:
+            user_ids = [uid for (uid,) in db.session.query(User.id).order_by(User.id)]
+
+        try:
+            for uid in user_ids:
+                rebuild_personal_records(uid)
+                db.session.commit()
+            click.echo(f"✅ Rebuilt personal records for {len(user_ids)} users")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error rebuilding personal records: {str(e)}", err=True)
+
+    @app.cli.command("backfill-rollups")
+    @click.option("--user-id", type=int, help="Rebuild a single user only")
+    @click.option(
+        "--workers", default=4, show_default=True, help="Users rebuilt in parallel"
+    )
+    def backfill_rollups(user_id, workers):
+        """Recompute weekly/monthly training rollups, several users at a time"""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.users.models import User
+        from app.workouts.rollups import rebuild_user_rollups
+
+        click.echo("🔄 Backfilling training rollups...")
+
+        if user_id:
+            user_ids = [user_id]
+        else:
+            user_ids = [uid for (uid,) in db.session.query(User.id).order_by(User.id)]
+        db.session.remove()
+
+        def rebuild(uid):
+            # Each thread gets its own app context, so its own session/connection
+            with app.app_context():
+                try:
+                    rows = rebuild_user_rollups(uid)
+                    db.session.commit()
+                    return rows, None
+                except Exception as e:
+                    db.session.rollback()
+                    return 0, e
+
+        total = 0
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            for uid, (rows, error) in zip(user_ids, pool.map(rebuild, user_ids)):
+                if error:
+                    failed += 1
+                    click.echo(f"❌ User {uid}: {str(error)}", err=True)
+                else:
+                    total += rows
+
+        click.echo(
+            f"✅ Rebuilt {total} rollup rows for {len(user_ids) - failed} users"
+            + (f" ({failed} failed)" if failed else "")
+        )
+
+    @app.cli.command("rebuild-monthly-volumes")
+    @click.option("--user-id", type=int, help="Rebuild a single user only")
+    def rebuild_monthly_volumes_command(user_id):
+        """Recompute per-exercise monthly volumes used by the leaderboards"""
+        from app.users.models import User
+        from app.workouts.leaderboard import rebuild_monthly_volumes
+
+        click.echo("🔄 Rebuilding monthly exercise volumes...")
+
+        if user_id:
+            user_ids = [user_id]
+        else:
+            user_ids = [uid for (uid,) in db.session.query(User.id).order_by(User.id)]
+
+        try:
+            for uid in user_ids:
+                rebuild_monthly_volumes(uid)
+                db.session.commit()
+            click.echo(f"✅ Rebuilt monthly volumes for {len(user_ids)} users")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error rebuilding monthly volumes: {str(e)}", err=True)
+
+    @app.cli.command("flush-set-autosaves")
+    def flush_set_autosaves():
+        """Apply every queued set autosave (e.g. from cron)"""
+        from app.workouts.services import apply_queued_autosaves
+
+        click.echo("🔄 Applying queued set updates...")
+        try:
+            applied = apply_queued_autosaves()
+            click.echo(f"✅ Applied {applied} queued set updates")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error applying set updates: {str(e)}", err=True)
+
+    @app.cli.command("backfill-exercise-logs")
+    @click.option(
+        "--chunk-size",
+        default=500,
+        show_default=True,
+        help="Sessions logged per transaction",
+    )
+    @click.option(
+        "--after-id", default=0, help="Start after this workout session id"
+    )
+    def backfill_exercise_logs(chunk_size, after_id):
+        """Log finished sessions that have no exercise logs yet (resumable)"""
+        from app.workouts.exercise_logs import backfill_chunk
+
+        click.echo("🔄 Backfilling exercise logs...")
+
+        sessions = logs = 0
+        while True:
+            try:
+                last_id, chunk_sessions, chunk_logs = backfill_chunk(
+                    after_id, chunk_size
+                )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                click.echo(f"❌ Error after session {after_id}: {str(e)}", err=True)
+                click.echo(f"   Resume with --after-id {after_id}", err=True)
+                return
+            if last_id is None:
+                break
+            after_id = last_id
+            sessions += chunk_sessions
+            logs += chunk_logs
+            click.echo(f"   ... {sessions} sessions, up to id {after_id}")
+
+        click.echo(f"✅ Logged {sessions} sessions into {logs} exercise log rows")
+
+    @app.cli.command("import-workouts")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--user-id", type=int, required=True, help="Owner of the history")
+    @click.option(
+        "--format", "fmt", type=click.Choice(["csv", "json"]), help="Default: by extension"
+    )
+    @click.option(
+        "--batch-size", default=5000, show_default=True, help="Sets per COPY batch"
+    )
+    def import_workouts_command(path, user_id, fmt, batch_size):
+        """Bulk-load workout history exported from another tracker"""
+        from app.workouts.importer import detect_format, import_workouts
+
+        click.echo(f"📥 Importing {path}...")
+
+        def progress(report):
+            click.echo(
+                f"   ... {report['sessions']} sessions, {report['sets']} sets "
+                f"({report['sets_per_second']:.0f} sets/s)"
+            )
+
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as stream:
+                report = import_workouts(
+                    user_id,
+                    stream,
+                    fmt or detect_format(path),
+                    batch_size=batch_size,
+                    progress=progress,
+                )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Import failed: {str(e)}", err=True)
+            return
+
+        click.echo(
+            f"✅ Imported {report['sessions']} sessions, {report['sets']} sets in "
+            f"{report['seconds']}s ({report['sets_per_second']} sets/s)"
+        )
+        if report["skipped"]:
+            click.echo(f"⚠️  Skipped {report['skipped']} rows")
+            for name, count in report["unknown_exercises"].items():
+                click.echo(f"   unknown exercise {name!r}: {count}")
+
+    @app.cli.command("export-columnar")
+    @click.argument("directory", type=click.Path(file_okay=False))
+    @click.option(
+        "--format",
+        "fmt",
+        type=click.Choice(["auto", "npy", "parquet"]),
+        default="auto",
+        show_default=True,
+        help="auto: Parquet if pyarrow is installed, else .npy per column",
+    )
+    @click.option(
+        "--chunk-size", default=50000, show_default=True, help="Rows per fetch"
+    )
+    def export_columnar_command(directory, fmt, chunk_size):
+        """Snapshot all exercise sets into column files for offline analysis"""
+        from app.workouts.columnar import export_columnar
+
+        click.echo(f"📦 Exporting set history to {directory}...")
+        try:
+            manifest = export_columnar(
+                directory,
+                fmt=fmt,
+                chunk_rows=chunk_size,
+                progress=lambda rows: click.echo(f"   ... {rows} rows"),
+            )
+        except Exception as e:
+            click.echo(f"❌ Export failed: {str(e)}", err=True)
+            return
+
+        rate = manifest["rows"] / max(manifest["seconds"], 0.01)
+        click.echo(
+            f"✅ Wrote {manifest['rows']} sets as {manifest['format']} in "
+            f"{manifest['seconds']}s ({rate:.0f} rows/s)"
+        )
+
+    @app.cli.command("archive-workouts")
+    @click.option(
+        "--older-than-months",
+        default=12,
+        show_default=True,
+        help="Archive completed sessions before the start of this many months ago",
+    )
+    @click.option(
+        "--batch-size", default=200, show_default=True, help="Sessions per transaction"
+    )
+    def archive_workouts(older_than_months, batch_size):
+        """Move sets of old completed sessions to the archive tables"""
+        from app.workouts.archive import archive_batch, months_ago
+
+        cutoff = months_ago(older_than_months)
+        click.echo(f"🗄️  Archiving sessions before {cutoff.isoformat()}...")
+
+        total = 0
+        while True:
+            try:
+                moved = archive_batch(cutoff, batch_size)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                click.echo(f"❌ Error archiving sessions: {str(e)}", err=True)
+                return
+            if not moved:
+                break
+            total += moved
+            click.echo(f"   ... {total} sessions")
+
+        click.echo(f"✅ Archived {total} sessions")
+
+    @app.cli.command("compact-workouts")
+    @click.option(
+        "--older-than-months",
+        default=24,
+        show_default=True,
+        help="Pack completed sessions before the start of this many months ago",
+    )
+    @click.option(
+        "--batch-size", default=200, show_default=True, help="Sessions per transaction"
+    )
+    def compact_workouts(older_than_months, batch_size):
+        """Pack sets of very old sessions into one row per exercise"""
+        from app.workouts.archive import compact_batch, months_ago
+
+        cutoff = months_ago(older_than_months)
+        click.echo(f"📦 Packing sessions before {cutoff.isoformat()}...")
+
+        total = 0
+        while True:
+            try:
+                packed = compact_batch(cutoff, batch_size)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                click.echo(f"❌ Error packing sessions: {str(e)}", err=True)
+                return
+            if not packed:
+                break
+            total += packed
+            click.echo(f"   ... {total} sessions")
+
+        click.echo(f"✅ Packed {total} sessions")
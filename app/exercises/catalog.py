@@ -0,0 +1,111 @@
+"""
+Process-wide exercise catalog.
+
+The catalog only changes when exercises are created or seeded, so each worker
+keeps an immutable snapshot (grouped by muscle group, indexed by id and name,
+plus the serialized /exercises/all payload). Every read checks the catalog's
+row in `catalog_versions` - a single primary-key lookup - and rebuilds the
+snapshot only when another worker or a CLI command has bumped it.
+"""
+
+import json
+from collections import namedtuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.cache import VersionedCache
+from app.extensions import db
+from .models import Exercise, CatalogVersion
+
+CATALOG_NAME = "exercises"
+
+CatalogExercise = namedtuple(
+    "CatalogExercise",
+    [
+        "id",
+        "name",
+        "description",
+        "muscle_group",
+        "equipment",
+        "difficulty",
+        "video_url",
+        "instructions",
+        "is_active",
+    ],
+)
+
+
+class ExerciseCatalog:
+    """Immutable snapshot of the exercises table"""
+
+    def __init__(self, version, exercises):
+        self.version = version
+        self.exercises = tuple(exercises)
+        self.by_id = {ex.id: ex for ex in self.exercises}
+        self.by_name = {ex.name: ex for ex in self.exercises}
+
+        # Active exercises only, in (muscle_group, name) query order
+        self.by_group = {}
+        for ex in self.exercises:
+            if ex.is_active:
+                self.by_group.setdefault(ex.muscle_group, []).append(ex)
+
+        self.all_json = json.dumps([ex._asdict() for ex in self.exercises]).encode()
+
+
+_cache = VersionedCache(maxsize=1)
+
+
+def catalog_version():
+    return (
+        db.session.scalar(
+            db.select(CatalogVersion.version).where(
+                CatalogVersion.name == CATALOG_NAME
+            )
+        )
+        or 0
+    )
+
+
+def bump_catalog_version():
+    """Mark the catalog as changed for every worker (caller commits)"""
+    # One upsert: the first bump creates the row, even when two race for it
+    db.session.execute(
+        pg_insert(CatalogVersion)
+        .values(name=CATALOG_NAME, version=1)
+        .on_conflict_do_update(
+            index_elements=[CatalogVersion.name],
+            set_={"version": CatalogVersion.version + 1},
+        )
+    )
+    _cache.clear()
+
+
+def get_catalog():
+    """Current catalog snapshot, rebuilt only if the version has moved"""
+    version = catalog_version()
+    catalog = _cache.get(CATALOG_NAME, version)
+    if catalog is None:
+        rows = Exercise.query.order_by(Exercise.muscle_group, Exercise.name).all()
+        catalog = _cache.put(
+            CATALOG_NAME,
+            version,
+            ExerciseCatalog(
+                version,
+                (
+                    CatalogExercise(
+                        id=e.id,
+                        name=e.name,
+                        description=e.description,
+                        muscle_group=e.muscle_group,
+                        equipment=e.equipment,
+                        difficulty=e.difficulty,
+                        video_url=e.video_url,
+                        instructions=e.instructions,
+                        is_active=e.is_active,
+                    )
+                    for e in rows
+                ),
+            ),
+        )
+    return catalog
@@ -47,20 +47,31 @@ class Exercise(db.Model):
 
 
 class ExerciseLog(db.Model):
+    """Completed sets of one exercise in one finished session, warmups apart"""
+
     __tablename__ = "exercise_logs"
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id"), nullable=False)
+    workout_session_id = db.Column(
+        db.Integer, db.ForeignKey("workout_sessions.id", ondelete="CASCADE")
+    )
     date = db.Column(db.Date, nullable=False)
     sets = db.Column(db.Integer, nullable=False)
     is_warmup = db.Column(db.Boolean, default=False)
-    reps = db.Column(db.Integer, nullable=False)
-    weight = db.Column(db.Float)  # in kg
+    reps = db.Column(db.Integer, nullable=False)  # total over the sets
+    weight = db.Column(db.Float)  # top set, in kg
+    volume = db.Column(db.Float, default=0.0, nullable=False, server_default="0")
 
     user = db.relationship("User", back_populates="exercise_logs")
     exercise = db.relationship("Exercise", back_populates="exercise_logs")
 
+    __table_args__ = (
+        db.Index("idx_exercise_log_progress", "user_id", "exercise_id", "date"),
+        db.Index("idx_exercise_log_session", "workout_session_id"),
+    )
+
 
 class ExerciseStatistic(db.Model):
     __tablename__ = "exercise_statistics"
@@ -72,3 +83,18 @@ class ExerciseStatistic(db.Model):
     last_performed = db.Column(db.Date)
     is_warmup = db.Column(db.Boolean, default=False, nullable=False)
     exercise = db.relationship("Exercise", back_populates="statistics")
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "exercise_id", "is_warmup", name="uq_exercise_statistic_exercise"
+        ),
+    )
+
+
+class CatalogVersion(db.Model):
+    """Version stamp per in-memory catalog, bumped whenever its rows change"""
+
+    __tablename__ = "catalog_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
@@ -1,6 +1,7 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from app.extensions import db
 from .models import Exercise
+from .catalog import get_catalog, bump_catalog_version
 
 exercise_routes = Blueprint("exercises", __name__, url_prefix="/exercises")
 
@@ -37,6 +38,7 @@ def create_exercise():
 
     try:
         db.session.add(exercise)
+        bump_catalog_version()
         db.session.commit()
         return jsonify({"message": f"Exercise {exercise.name} created!"}), 201
     except Exception as e:
@@ -46,20 +48,5 @@ def create_exercise():
 
 @exercise_routes.route("/all", methods=["GET"])
 def get_exercises():
-    exercises = Exercise.query.all()
-    return jsonify(
-        [
-            {
-                "id": e.id,
-                "name": e.name,
-                "description": e.description,
-                "muscle_group": e.muscle_group.value if e.muscle_group else None,
-                "equipment": e.equipment.value if e.equipment else None,
-                "difficulty": e.difficulty.value if e.difficulty else None,
-                "video_url": e.video_url,
-                "instructions": e.instructions,
-                "is_active": e.is_active,
-            }
-            for e in exercises
-        ]
-    )
+    # Pre-serialized by the catalog; rebuilt only when the catalog changes
+    return Response(get_catalog().all_json, mimetype="application/json")
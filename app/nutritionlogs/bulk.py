@@ -0,0 +1,177 @@
+"""
+Bulk nutrition logging for devices (supplement dispensers, meal loggers).
+
+A device posts its buffered entries in one request. Each entry is validated
+on its own. The valid ones go in with a single multi-row INSERT, and the
+response reports every entry by its position: created, duplicate or invalid.
+
+Devices retry on timeouts, so an entry may carry an `idempotency_key`, unique
+per user. The INSERT skips keys that are already stored (ON CONFLICT DO
+NOTHING), and a retried entry is reported as a duplicate with the id of the
+row the first attempt created.
+"""
+
+from datetime import date, time
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.extensions import db
+from app.users.models import User
+from .models import NutritionLog
+
+MAX_ENTRIES = 500
+KEY_LENGTH = 64
+
+
+class InvalidEntry(Exception):
+    pass
+
+
+def _text(entry, field, max_length):
+    value = entry.get(field)
+    if value is None or str(value).strip() == "":
+        raise InvalidEntry(f"{field} is required")
+    value = str(value).strip()
+    if len(value) > max_length:
+        raise InvalidEntry(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def _parse(entry):
+    """NutritionLog row for one entry; raises InvalidEntry"""
+    if not isinstance(entry, dict):
+        raise InvalidEntry("Expected an object")
+    try:
+        user_id = int(entry["user_id"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidEntry("user_id is required")
+
+    row = {
+        "user_id": user_id,
+        "name": _text(entry, "name", 100),
+        "amount": _text(entry, "amount", 50),
+        "idempotency_key": None,
+    }
+    try:
+        row["date"] = (
+            date.fromisoformat(entry["date"]) if entry.get("date") else date.today()
+        )
+        # Same default as the column: the database's current time
+        row["time"] = (
+            time.fromisoformat(entry["time"])
+            if entry.get("time")
+            else db.func.current_time()
+        )
+    except (TypeError, ValueError):
+        raise InvalidEntry("date must be YYYY-MM-DD and time HH:MM:SS")
+    if entry.get("idempotency_key") is not None:
+        row["idempotency_key"] = _text(entry, "idempotency_key", KEY_LENGTH)
+    return row
+
+
+def _allocate_ids(count):
+    """Reserve `count` primary keys from the table's sequence"""
+    return (
+        db.session.execute(
+            db.text(
+                "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                "FROM generate_series(1, :count)"
+            ),
+            {"table": NutritionLog.__tablename__, "count": count},
+        )
+        .scalars()
+        .all()
+    )
+
+
+def _stored_ids(keys):
+    """{(user_id, idempotency_key): id} of already stored entries"""
+    if not keys:
+        return {}
+    return {
+        (user_id, key): log_id
+        for log_id, user_id, key in db.session.query(
+            NutritionLog.id, NutritionLog.user_id, NutritionLog.idempotency_key
+        ).filter(
+            NutritionLog.user_id.in_({user_id for user_id, _ in keys}),
+            NutritionLog.idempotency_key.in_({key for _, key in keys}),
+        )
+        if (user_id, key) in keys
+    }
+
+
+def log_entries(entries):
+    """Validate and insert a batch of entries (caller commits).
+
+    Returns one result per entry, in order: {"index", "status", "id"} with
+    status created or duplicate, or {"index", "status": "invalid", "error"}.
+    """
+    results = [None] * len(entries)
+    parsed = {}
+    for index, entry in enumerate(entries):
+        try:
+            parsed[index] = _parse(entry)
+        except InvalidEntry as e:
+            results[index] = {"index": index, "status": "invalid", "error": str(e)}
+
+    # Unknown users are reported per entry instead of failing the whole insert
+    known_users = {
+        user_id
+        for (user_id,) in db.session.query(User.id).filter(
+            User.id.in_({row["user_id"] for row in parsed.values()})
+        )
+    }
+    rows, repeats, first_with_key = {}, {}, {}
+    for index, row in parsed.items():
+        key = (row["user_id"], row["idempotency_key"])
+        if row["user_id"] not in known_users:
+            results[index] = {
+                "index": index,
+                "status": "invalid",
+                "error": "Unknown user",
+            }
+        elif row["idempotency_key"] is not None and key in first_with_key:
+            # Sent twice in one batch: the first one counts
+            repeats[index] = first_with_key[key]
+        else:
+            if row["idempotency_key"] is not None:
+                first_with_key[key] = index
+            rows[index] = row
+    if not rows:
+        return results
+
+    # Ids are reserved up front, so RETURNING tells which rows went in
+    for row, log_id in zip(rows.values(), _allocate_ids(len(rows))):
+        row["id"] = log_id
+    stmt = (
+        pg_insert(NutritionLog)
+        .values(list(rows.values()))
+        .on_conflict_do_nothing(
+            index_elements=[NutritionLog.user_id, NutritionLog.idempotency_key]
+        )
+        .returning(NutritionLog.id)
+    )
+    inserted = set(db.session.scalars(stmt).all())
+
+    # Rows skipped by the conflict were logged by an earlier attempt
+    stored = _stored_ids(
+        {
+            (row["user_id"], row["idempotency_key"])
+            for row in rows.values()
+            if row["id"] not in inserted
+        }
+    )
+    for index, row in rows.items():
+        if row["id"] in inserted:
+            status, log_id = "created", row["id"]
+        else:
+            status = "duplicate"
+            log_id = stored.get((row["user_id"], row["idempotency_key"]))
+        results[index] = {"index": index, "status": status, "id": log_id}
+    for index, first in repeats.items():
+        results[index] = {
+            "index": index,
+            "status": "duplicate",
+            "id": results[first]["id"],
+        }
+    return results
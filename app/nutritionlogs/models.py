@@ -12,5 +12,13 @@ class NutritionLog(db.Model):
     amount = db.Column(db.String(50))  # "5g", "2 scoops"
     time = db.Column(db.Time, default=db.func.current_time())
     date = db.Column(db.Date, default=date.today, nullable=False)
+    # Set by devices so a retried upload is not logged twice
+    idempotency_key = db.Column(db.String(64))
 
     user = db.relationship("User", back_populates="nutrition_logs")
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "idempotency_key", name="uq_nutritionlog_idempotency_key"
+        ),
+    )
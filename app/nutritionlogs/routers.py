@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.extensions import db
+from .bulk import MAX_ENTRIES, log_entries
 from .models import NutritionLog
 
 nutrition_routes = Blueprint("nutrition", __name__, url_prefix="/nutrition")
@@ -30,6 +31,28 @@ def create_nutrition():
         return jsonify({"error": str(e)}), 500
 
 
+# Create many log entries at once (devices), see bulk.py
+@nutrition_routes.route("/bulk", methods=["POST"])
+def create_nutrition_bulk():
+    data = request.get_json(silent=True)
+    entries = data.get("entries") if isinstance(data, dict) else data
+
+    if not isinstance(entries, list) or not entries:
+        return jsonify({"error": "Expected a list of entries"}), 400
+    if len(entries) > MAX_ENTRIES:
+        return jsonify({"error": f"At most {MAX_ENTRIES} entries per request"}), 400
+
+    try:
+        results = log_entries(entries)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    created = sum(1 for result in results if result["status"] == "created")
+    return jsonify({"created": created, "results": results}), 201 if created else 200
+
+
 # Retrieve all logs for a user
 @nutrition_routes.route("/user/<int:user_id>", methods=["GET"])
 def get_user_nutrition(user_id):
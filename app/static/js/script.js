@@ -217,10 +217,14 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Auto-save workout sets
+    // Edits are collected per set and flushed to the bulk endpoint in one request
     let saveTimeout;
     const SAVE_DELAY = 1000; // 1 second delay after input
-    
-    function saveSet(setId) {
+    const workoutRoot = document.querySelector('[data-workout-id]');
+    const workoutId = workoutRoot ? workoutRoot.getAttribute('data-workout-id') : null;
+    const pendingSets = new Map();
+
+    function queueSet(setId) {
         const row = document.querySelector(`tr[data-set-id="${setId}"]`);
         if (!row) return;
         
@@ -228,48 +232,173 @@ document.addEventListener('DOMContentLoaded', function() {
         const reps = row.querySelector('.reps-input').value;
         const isCompleted = row.querySelector('.completed-checkbox').checked;
 
-        fetch(`/workouts/set/${setId}/update`, {
+        pendingSets.set(setId, {
+            id: parseInt(setId),
+            weight: weight ? parseFloat(weight) : null,
+            reps: reps ? parseInt(reps) : null,
+            is_completed: isCompleted
+        });
+    }
+
+    // Offline queue: saves, set deletes, starts and finishes made without a
+    // connection are kept in localStorage and replayed in one request to
+    // /workouts/sync once the device is online. The sync version from the
+    // last response is sent back as `since`, so only newer changes come down.
+    const SYNC_QUEUE_KEY = 'workout-sync-queue';
+    const SYNC_VERSION_KEY = 'workout-sync-version';
+
+    function loadSyncQueue() {
+        try {
+            return JSON.parse(localStorage.getItem(SYNC_QUEUE_KEY)) || [];
+        } catch (e) {
+            return [];
+        }
+    }
+
+    function queueMutation(mutation) {
+        const queue = loadSyncQueue();
+        queue.push(Object.assign({
+            id: `${Date.now()}-${Math.random().toString(36).slice(2)}`
+        }, mutation));
+        localStorage.setItem(SYNC_QUEUE_KEY, JSON.stringify(queue));
+    }
+    window.queueMutation = queueMutation;
+
+    function queueOffline(batch) {
+        batch.forEach(patch => queueMutation({
+            type: 'set',
+            set_id: patch.id,
+            weight: patch.weight,
+            reps: patch.reps,
+            is_completed: patch.is_completed
+        }));
+    }
+
+    function postSync(mutations) {
+        return fetch('/workouts/sync', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
-                weight: weight ? parseFloat(weight) : null,
-                reps: reps ? parseInt(reps) : null,
-                is_completed: isCompleted
+                since: parseInt(localStorage.getItem(SYNC_VERSION_KEY)) || 0,
+                mutations: mutations
             })
         })
-        .then(response => response.json())
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            localStorage.setItem(SYNC_VERSION_KEY, String(data.version));
+            (data.sessions || [])
+                .filter(workout => String(workout.id) === workoutId)
+                .forEach(applyRemoteWorkout);
+            // Later pages of changes carry no mutations
+            return data.has_more ? postSync([]).then(() => data) : data;
+        });
+    }
+
+    function replaySyncQueue() {
+        const queue = loadSyncQueue();
+        if (queue.length === 0 || !navigator.onLine) return Promise.resolve();
+
+        return postSync(queue)
+        .then(data => {
+            // Keep what was queued while the request was in flight
+            localStorage.setItem(SYNC_QUEUE_KEY, JSON.stringify(loadSyncQueue().slice(queue.length)));
+            // A workout started offline continues on its page
+            const started = data.results.find((result, i) =>
+                queue[i].type === 'start' && result.status === 'applied');
+            if (started && !workoutId) window.location = `/workouts/active/${started.workout_id}`;
+        })
+        .catch(error => console.error('Error syncing offline saves:', error));
+    }
+
+    window.addEventListener('online', replaySyncQueue);
+
+    function flushSets(keepalive = false) {
+        clearTimeout(saveTimeout);
+        if (!workoutId || pendingSets.size === 0) return Promise.resolve();
+
+        const batch = new Map(pendingSets);
+        pendingSets.clear();
+        batch.forEach((patch, setId) => recentSaves.set(setId, Date.now()));
+
+        if (!navigator.onLine) {
+            queueOffline(batch);
+            return Promise.resolve();
+        }
+
+        return fetch(`/workouts/${workoutId}/sets`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ sets: Array.from(batch.values()) }),
+            keepalive: keepalive
+        })
+        .then(response => {
+            // A rejected batch would be rejected again: don't re-queue it
+            if (response.status === 400) {
+                return response.json().then(data => {
+                    throw Object.assign(new Error(data.error), { rejected: true });
+                });
+            }
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
         .then(data => {
             // Visual feedback
-            row.style.backgroundColor = '#f0fdf4';
-            setTimeout(() => {
-                row.style.backgroundColor = '';
-            }, 300);
+            (data.updated || []).forEach(setId => {
+                const row = document.querySelector(`tr[data-set-id="${setId}"]`);
+                if (!row) return;
+                row.style.backgroundColor = '#f0fdf4';
+                setTimeout(() => {
+                    row.style.backgroundColor = '';
+                }, 300);
+            });
         })
-        .catch(error => console.error('Error saving set:', error));
+        .catch(error => {
+            if (error.rejected) {
+                console.error('Sets rejected:', error.message);
+                return;
+            }
+            if (!navigator.onLine) {
+                queueOffline(batch);
+                return;
+            }
+            // Re-queue unless the user has edited the set again meanwhile
+            batch.forEach((patch, setId) => {
+                if (!pendingSets.has(setId)) pendingSets.set(setId, patch);
+            });
+            console.error('Error saving sets:', error);
+        });
+    }
+
+    function scheduleFlush() {
+        clearTimeout(saveTimeout);
+        saveTimeout = setTimeout(() => flushSets(), SAVE_DELAY);
     }
 
     // Event listeners for workout inputs
     document.querySelectorAll('.weight-input, .reps-input').forEach(input => {
         input.addEventListener('input', function() {
-            const setId = this.getAttribute('data-set-id');
-            clearTimeout(saveTimeout);
-            saveTimeout = setTimeout(() => saveSet(setId), SAVE_DELAY);
+            queueSet(this.getAttribute('data-set-id'));
+            scheduleFlush();
         });
         
         input.addEventListener('blur', function() {
-            const setId = this.getAttribute('data-set-id');
-            clearTimeout(saveTimeout);
-            saveSet(setId);
+            queueSet(this.getAttribute('data-set-id'));
+            scheduleFlush();
         });
     });
 
     // Completed checkbox handlers
     document.querySelectorAll('.completed-checkbox').forEach(checkbox => {
         checkbox.addEventListener('change', function() {
-            const setId = this.getAttribute('data-set-id');
-            saveSet(setId);
+            queueSet(this.getAttribute('data-set-id'));
+            flushSets();
             
             const row = this.closest('tr');
             if (this.checked) {
@@ -280,6 +409,107 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // Don't lose queued edits when leaving the page
+    window.addEventListener('pagehide', () => flushSets(true));
+
+    // Live sync: sets saved on another device (phone, watch) show up here.
+    // Stream events only name what changed; the page then refetches /details
+    // with its last ETag.
+    const RECENT_SAVE_MS = 5000; // our own saves may still be in flight this long
+    const recentSaves = new Map();
+    let remoteEnded = false;
+    let detailsEtag = null;
+
+    function applyRemoteSet(set) {
+        const setId = String(set.id);
+        const row = document.querySelector(`tr[data-set-id="${setId}"]`);
+        // Local edits that are not saved yet win
+        if (!row || pendingSets.has(setId) || row.contains(document.activeElement)) return;
+        if (Date.now() - (recentSaves.get(setId) || 0) < RECENT_SAVE_MS) return;
+
+        row.querySelector('.weight-input').value = set.weight ?? '';
+        row.querySelector('.reps-input').value = set.reps ?? '';
+        row.querySelector('.completed-checkbox').checked = !!set.is_completed;
+        row.classList.toggle('opacity-60', !!set.is_completed);
+    }
+
+    function endRemotely(url) {
+        remoteEnded = true;
+        window.location = url;
+    }
+
+    function applyRemoteWorkout(workout) {
+        if (workout.is_completed) {
+            endRemotely(`/workouts/${workoutId}/summary`);
+            return;
+        }
+        const present = new Set();
+        workout.exercises.forEach(ex => ex.sets.forEach(set => {
+            present.add(String(set.id));
+            applyRemoteSet(set);
+        }));
+        // Sets deleted on another device
+        document.querySelectorAll('tr[data-set-id]').forEach(row => {
+            if (!present.has(row.getAttribute('data-set-id'))) row.remove();
+        });
+    }
+
+    function refreshWorkout() {
+        if (remoteEnded) return Promise.resolve();
+
+        return fetch(`/workouts/${workoutId}/details`, {
+            headers: detailsEtag ? { 'If-None-Match': detailsEtag } : {},
+            cache: 'no-store'
+        })
+        .then(response => {
+            if (response.status === 304) return;
+            // Cancelled on another device
+            if (response.status === 404) return endRemotely('/users/dashboard');
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            detailsEtag = response.headers.get('ETag');
+            return response.json().then(applyRemoteWorkout);
+        })
+        .catch(error => console.error('Error refreshing workout:', error));
+    }
+
+    if (workoutId && window.EventSource && workoutRoot.getAttribute('data-workout-completed') !== 'true') {
+        const events = new EventSource(`/workouts/${workoutId}/stream`);
+        let connected = false;
+
+        ['sets_updated', 'set_deleted'].forEach(name => {
+            events.addEventListener(name, refreshWorkout);
+        });
+        // Catch up on what changed while the stream was reconnecting
+        events.addEventListener('open', () => {
+            if (connected) refreshWorkout();
+            connected = true;
+        });
+        ['workout_finished', 'workout_cancelled'].forEach(name => {
+            events.addEventListener(name, e => {
+                events.close();
+                endRemotely(JSON.parse(e.data).redirect);
+            });
+        });
+    }
+
+    replaySyncQueue();
+
+    // Starting a workout offline queues the start with the time it happened
+    document.querySelectorAll('form[data-plan-day-id]').forEach(form => {
+        form.addEventListener('submit', function(e) {
+            if (navigator.onLine) return;
+            e.preventDefault();
+            queueMutation({
+                type: 'start',
+                client_id: `w-${Date.now()}-${Math.random().toString(36).slice(2)}`,
+                plan_day_id: parseInt(form.getAttribute('data-plan-day-id')),
+                started_at: new Date().toISOString()
+            });
+            form.querySelector('button').disabled = true;
+            alert('You are offline. The workout will start once you are back online.');
+        });
+    });
+
     // Toggle exercise notes
     window.toggleNotes = function(exerciseId) {
         const textarea = document.getElementById(`notes-${exerciseId}`);
@@ -297,7 +527,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const isFinished = workoutPage.getAttribute('data-workout-completed') === 'true';
         
         window.addEventListener('beforeunload', function(e) {
-            if (!isFinished) {
+            if (!isFinished && !remoteEnded) {
                 e.preventDefault();
                 e.returnValue = '';
             }
@@ -319,8 +549,29 @@ document.addEventListener('DOMContentLoaded', function() {
                 const confirmed = confirm('Not all working sets are marked as completed. Finish workout anyway?');
                 if (!confirmed) {
                     e.preventDefault();
+                    return;
                 }
             }
+
+            // Offline: finish on the next sync, with the time it happened
+            if (!navigator.onLine) {
+                e.preventDefault();
+                flushSets();
+                queueMutation({
+                    type: 'finish',
+                    workout_id: parseInt(workoutId),
+                    finished_at: new Date().toISOString()
+                });
+                finishForm.querySelector('button').disabled = true;
+                alert('You are offline. The workout will be finished once you are back online.');
+                return;
+            }
+
+            // Save queued edits before the workout is finished
+            if (pendingSets.size > 0) {
+                e.preventDefault();
+                flushSets(true).then(() => finishForm.submit());
+            }
         });
     }
 });
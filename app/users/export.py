@@ -0,0 +1,276 @@
+"""
+Full-history export.
+
+Every section is read through a `yield_per` query, which psycopg2 runs on a
+server-side cursor, and written out as it arrives: the response body is a
+generator of ~64 KB chunks. Memory stays flat however long the history is,
+and the worker thread sends data from the first chunk instead of building one
+huge payload.
+
+NDJSON puts everything in one stream, one object per line tagged with its
+"type" (session, set, goal, nutrition). CSV is one section per file; the
+default "sets" section holds the completed sets of finished sessions in the
+columns `flask import-workouts` reads, so it can be imported again.
+"""
+
+import csv
+import io
+import json
+
+from app.extensions import db
+from app.exercises.models import Exercise
+from app.nutritionlogs.models import NutritionLog
+from app.workouts.sources import set_sources
+from app.workouts.models import WorkoutSession
+from .models import Goal
+
+FORMATS = ("ndjson", "csv")
+CSV_SECTIONS = ("sets", "sessions", "goals", "nutrition")
+STREAM_CHUNK = 1000  # rows per server-side cursor fetch
+FLUSH_BYTES = 64 * 1024
+
+SESSION_FIELDS = (
+    "id",
+    "name",
+    "date",
+    "start_time",
+    "end_time",
+    "is_completed",
+    "notes",
+    "summary_volume",
+    "summary_sets",
+    "summary_duration",
+)
+GOAL_FIELDS = (
+    "id",
+    "goal_type",
+    "target_value",
+    "current_value",
+    "unit",
+    "target_date",
+    "is_active",
+    "created_at",
+)
+NUTRITION_FIELDS = ("id", "name", "amount", "date", "time")
+# Same columns and order as the importer reads
+IMPORT_FIELDS = (
+    "date",
+    "workout",
+    "exercise",
+    "set_number",
+    "weight",
+    "reps",
+    "is_warmup",
+    "rpe",
+    "notes",
+    "duration_minutes",
+)
+
+
+def _stream(query):
+    """Rows of `query`, fetched STREAM_CHUNK at a time from a server-side cursor"""
+    with db.session.execute(query.execution_options(yield_per=STREAM_CHUNK)) as result:
+        for row in result:
+            yield row._mapping
+
+
+def _workout_rows(user_id):
+    """One row per set, sessions in date order; sessions without sets appear
+    once with empty set columns. Each session is read from the tier it is in."""
+    selects = []
+    for workout_exercise, exercise_set, in_tables in set_sources():
+        selects.append(
+            db.select(
+                WorkoutSession.id.label("session_id"),
+                WorkoutSession.name.label("session_name"),
+                WorkoutSession.date,
+                WorkoutSession.start_time,
+                WorkoutSession.end_time,
+                WorkoutSession.is_completed.label("session_completed"),
+                WorkoutSession.notes.label("session_notes"),
+                WorkoutSession.summary_volume,
+                WorkoutSession.summary_sets,
+                WorkoutSession.summary_duration,
+                Exercise.name.label("exercise"),
+                workout_exercise.order_in_workout,
+                exercise_set.id.label("set_id"),
+                exercise_set.set_number,
+                exercise_set.weight,
+                exercise_set.reps,
+                exercise_set.is_completed,
+                exercise_set.is_warmup,
+                exercise_set.rpe,
+                exercise_set.notes,
+            )
+            .select_from(WorkoutSession)
+            .outerjoin(
+                workout_exercise,
+                workout_exercise.workout_session_id == WorkoutSession.id,
+            )
+            .outerjoin(Exercise, Exercise.id == workout_exercise.exercise_id)
+            .outerjoin(
+                exercise_set, exercise_set.workout_exercise_id == workout_exercise.id
+            )
+            .where(WorkoutSession.user_id == user_id)
+            .where(in_tables)
+        )
+    rows = db.union_all(*selects).subquery()
+    return _stream(
+        db.select(rows).order_by(
+            rows.c.date,
+            rows.c.session_id,
+            rows.c.order_in_workout,
+            rows.c.set_number,
+            rows.c.set_id,
+        )
+    )
+
+
+def _session_record(row):
+    return {
+        "id": row["session_id"],
+        "name": row["session_name"],
+        "date": row["date"],
+        "start_time": row["start_time"],
+        "end_time": row["end_time"],
+        "is_completed": row["session_completed"],
+        "notes": row["session_notes"],
+        "summary_volume": row["summary_volume"],
+        "summary_sets": row["summary_sets"],
+        "summary_duration": row["summary_duration"],
+    }
+
+
+def _set_record(row):
+    return {
+        "id": row["set_id"],
+        "workout_session_id": row["session_id"],
+        "exercise": row["exercise"],
+        "order_in_workout": row["order_in_workout"],
+        "set_number": row["set_number"],
+        "weight": row["weight"],
+        "reps": row["reps"],
+        "is_completed": row["is_completed"],
+        "is_warmup": row["is_warmup"],
+        "rpe": row["rpe"],
+        "notes": row["notes"],
+    }
+
+
+def _import_record(row):
+    duration = (
+        round((row["end_time"] - row["start_time"]).total_seconds() / 60)
+        if row["start_time"] and row["end_time"]
+        else None
+    )
+    return {
+        "date": row["start_time"] or row["date"],
+        "workout": row["session_name"],
+        "exercise": row["exercise"],
+        "set_number": row["set_number"],
+        "weight": row["weight"],
+        "reps": row["reps"],
+        "is_warmup": row["is_warmup"],
+        "rpe": row["rpe"],
+        "notes": row["notes"],
+        "duration_minutes": duration,
+    }
+
+
+def _goal_rows(user_id):
+    return _stream(
+        db.select(*(getattr(Goal, field) for field in GOAL_FIELDS))
+        .where(Goal.user_id == user_id)
+        .order_by(Goal.created_at, Goal.id)
+    )
+
+
+def _nutrition_rows(user_id):
+    return _stream(
+        db.select(*(getattr(NutritionLog, field) for field in NUTRITION_FIELDS))
+        .where(NutritionLog.user_id == user_id)
+        .order_by(NutritionLog.date, NutritionLog.time, NutritionLog.id)
+    )
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _chunked(pieces):
+    """Join small strings into ~FLUSH_BYTES chunks for the response body"""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= FLUSH_BYTES:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _ndjson_lines(user_id):
+    def line(record_type, record):
+        return json.dumps({"type": record_type, **record}, default=_isoformat) + "\n"
+
+    current_session = None
+    for row in _workout_rows(user_id):
+        if row["session_id"] != current_session:
+            current_session = row["session_id"]
+            yield line("session", _session_record(row))
+        if row["set_id"] is not None:
+            yield line("set", _set_record(row))
+    for row in _goal_rows(user_id):
+        yield line("goal", row)
+    for row in _nutrition_rows(user_id):
+        yield line("nutrition", row)
+
+
+def _csv_lines(user_id, section):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in values
+        )
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    if section == "sets":
+        yield line(IMPORT_FIELDS)
+        for row in _workout_rows(user_id):
+            # Only what the importer would recreate: completed sets of
+            # finished sessions
+            if row["is_completed"] and row["session_completed"]:
+                record = _import_record(row)
+                yield line(record[field] for field in IMPORT_FIELDS)
+    elif section == "sessions":
+        yield line(SESSION_FIELDS)
+        current_session = None
+        for row in _workout_rows(user_id):
+            if row["session_id"] != current_session:
+                current_session = row["session_id"]
+                record = _session_record(row)
+                yield line(record[field] for field in SESSION_FIELDS)
+    else:
+        fields = GOAL_FIELDS if section == "goals" else NUTRITION_FIELDS
+        rows = _goal_rows(user_id) if section == "goals" else _nutrition_rows(user_id)
+        yield line(fields)
+        for row in rows:
+            yield line(row[field] for field in fields)
+
+
+def export_chunks(user_id, fmt="ndjson", section="sets"):
+    """Generator of response body chunks; needs an app context while iterated"""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if fmt == "csv" and section not in CSV_SECTIONS:
+        raise ValueError(f"section must be one of {', '.join(CSV_SECTIONS)}")
+
+    lines = _ndjson_lines(user_id) if fmt == "ndjson" else _csv_lines(user_id, section)
+    return _chunked(lines)
@@ -24,6 +24,10 @@ class User(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    # Bumped on every change to the user's workouts; offline sync cursor
+    sync_version = db.Column(
+        db.BigInteger, default=0, server_default="0", nullable=False
+    )
 
     # Relationships
     workout_sessions = db.relationship(
@@ -39,6 +43,24 @@ class User(db.Model):
     nutrition_logs = db.relationship(
         "NutritionLog", back_populates="user", cascade="all, delete-orphan"
     )
+    personal_records = db.relationship(
+        "PersonalRecord", back_populates="user", cascade="all, delete-orphan"
+    )
+    rep_records = db.relationship(
+        "RepRecord", back_populates="user", cascade="all, delete-orphan"
+    )
+    workout_stats = db.relationship(
+        "UserWorkoutStats",
+        back_populates="user",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+    training_rollups = db.relationship(
+        "TrainingRollup", back_populates="user", cascade="all, delete-orphan"
+    )
+    monthly_volumes = db.relationship(
+        "ExerciseMonthlyVolume", back_populates="user", cascade="all, delete-orphan"
+    )
 
 
 class Goal(db.Model):
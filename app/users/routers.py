@@ -1,5 +1,6 @@
 from flask import (
     Blueprint,
+    Response,
     request,
     jsonify,
     render_template,
@@ -7,9 +8,11 @@ from flask import (
     url_for,
     session,
     flash,
+    stream_with_context,
 )
 from app.extensions import db
 from .models import User, Goal
+from .export import export_chunks
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from app.workouts.routers import get_user_stats
@@ -266,3 +269,29 @@ def dashboard():
     user = User.query.get(session["user_id"])
     stats = get_user_stats(user.id) if user else {}
     return render_template("users/dashboard.html", user=user, stats=stats)
+
+
+@user_routes.route("/export")
+def export_history():
+    """Download the user's full history as NDJSON (default) or CSV.
+
+    Query params: format (ndjson|csv); for CSV, section
+    (sets|sessions|goals|nutrition, default sets).
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    fmt = request.args.get("format", "ndjson")
+    section = request.args.get("section", "sets")
+    try:
+        chunks = export_chunks(session["user_id"], fmt=fmt, section=section)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filename = "history.ndjson" if fmt == "ndjson" else f"{section}.csv"
+    return Response(
+        # Keeps the app context (and DB session) alive while the body streams
+        stream_with_context(chunks),
+        mimetype="application/x-ndjson" if fmt == "ndjson" else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
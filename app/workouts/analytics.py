@@ -0,0 +1,114 @@
+"""
+Training volume time series.
+
+Raw (date, muscle_group, weight, reps) columns of a user's working sets are
+streamed out of one query and bucketed with NumPy: dates become day numbers,
+buckets and muscle groups become integer codes, and the per-bucket sums are a
+single `np.bincount`. Cost grows with the number of sets, not with Python work
+per row, so multi-year histories stay fast.
+"""
+
+import numpy as np
+
+from app.extensions import db
+from app.exercises.models import Exercise
+from .sources import set_sources
+from .models import WorkoutSession
+
+BUCKETS = ("day", "week", "month")
+UNKNOWN_GROUP = "other"
+
+# Rows fetched per round trip while streaming the set columns
+STREAM_CHUNK = 5000
+
+
+def _load_columns(user_id, start=None, end=None):
+    """Day numbers, muscle groups and per-set volume as NumPy arrays"""
+    selects = []
+    # Live, archived and packed sets, as one UNION ALL
+    for workout_exercise, exercise_set, _ in set_sources():
+        select = (
+            db.select(
+                WorkoutSession.date,
+                Exercise.muscle_group,
+                exercise_set.weight,
+                exercise_set.reps,
+            )
+            .join(
+                workout_exercise,
+                exercise_set.workout_exercise_id == workout_exercise.id,
+            )
+            .join(
+                WorkoutSession, workout_exercise.workout_session_id == WorkoutSession.id
+            )
+            .join(Exercise, Exercise.id == workout_exercise.exercise_id)
+            .where(WorkoutSession.user_id == user_id)
+            .where(WorkoutSession.is_completed == True)
+            .where(exercise_set.is_warmup == False)
+            .where(exercise_set.weight > 0, exercise_set.reps > 0)
+        )
+        if start is not None:
+            select = select.where(WorkoutSession.date >= start)
+        if end is not None:
+            select = select.where(WorkoutSession.date <= end)
+        selects.append(select)
+    query = db.union_all(*selects)
+
+    days, groups, volumes = [], [], []
+    result = db.session.execute(query.execution_options(yield_per=STREAM_CHUNK))
+    for rows in result.partitions():
+        session_dates, muscle_groups, weights, reps = zip(*rows)
+        days.append(np.array(session_dates, dtype="datetime64[D]").astype(np.int64))
+        groups.append(np.array([g or UNKNOWN_GROUP for g in muscle_groups]))
+        volumes.append(
+            np.array(weights, dtype=np.float64) * np.array(reps, dtype=np.float64)
+        )
+
+    if not days:
+        return np.empty(0, np.int64), np.empty(0, str), np.empty(0, np.float64)
+    return np.concatenate(days), np.concatenate(groups), np.concatenate(volumes)
+
+
+def _bucket_starts(days, bucket):
+    """First day (days since epoch) of the bucket each day falls into"""
+    if bucket == "week":
+        # 1970-01-01 was a Thursday; shift so buckets start on Monday
+        return days - (days + 3) % 7
+    if bucket == "month":
+        months = days.astype("datetime64[D]").astype("datetime64[M]")
+        return months.astype("datetime64[D]").astype(np.int64)
+    return days
+
+
+def volume_series(user_id, bucket="week", by_muscle_group=False, start=None, end=None):
+    """Working volume per day/week/month, optionally split by muscle group.
+
+    Returns a dict with ISO `labels` (bucket start dates), the matching
+    `volume` totals and, if requested, `muscle_groups` mapping each group to
+    a series aligned with `labels`. Empty buckets are omitted.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+
+    days, groups, volumes = _load_columns(user_id, start, end)
+    keys, bucket_idx = np.unique(_bucket_starts(days, bucket), return_inverse=True)
+    totals = np.bincount(bucket_idx, weights=volumes, minlength=len(keys))
+
+    series = {
+        "bucket": bucket,
+        "labels": keys.astype("datetime64[D]").astype(str).tolist(),
+        "volume": np.round(totals, 1).tolist(),
+    }
+
+    if by_muscle_group:
+        names, group_idx = np.unique(groups, return_inverse=True)
+        per_group = np.bincount(
+            group_idx * len(keys) + bucket_idx,
+            weights=volumes,
+            minlength=len(names) * len(keys),
+        ).reshape(len(names), len(keys))
+        series["muscle_groups"] = {
+            str(name): np.round(row, 1).tolist() for name, row in zip(names, per_group)
+        }
+
+    return series
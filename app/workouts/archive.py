@@ -0,0 +1,312 @@
+"""
+Cold archive for old workout sessions.
+
+Nearly every read touches recent sessions or pre-aggregated tables, so
+`flask archive-workouts` moves the workout_exercises and exercise_sets rows of
+completed sessions older than N months into `workout_exercises_archive` and
+`exercise_sets_archive`. The rows keep their ids, and each batch moves with
+one DELETE ... RETURNING feeding an INSERT. The hot tables, and their indexes,
+then only hold the last few months.
+
+The sessions themselves stay in workout_sessions (marked with `archived_at`)
+with their frozen summary, so history pages and streaks are unaffected. Pages
+that show the sets (summary, /details) read `WorkoutSession.exercise_entries`.
+Everything that scans sets across sessions (stats, rollups, records,
+leaderboards, exercise logs and their rebuild-* commands, volume analytics,
+exports) reads them through sources.py, which covers every tier. The active
+workout page shows an archived session read-only; set updates and deletes,
+offline sync and cancelling restore it first, so editing works as before.
+
+`flask compact-workouts` goes one step further for even older sessions: each
+exercise and all of its sets become one `packed_workout_exercises` row with
+one array per set column, cutting the set row count by the sets-per-exercise
+factor. `PackedWorkoutExercise.sets` expands the arrays lazily for pages. In
+SQL, set_sources() unnests them back into set-shaped rows.
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.util import identity_key
+
+from app.extensions import db
+from .models import (
+    WorkoutSession,
+    WorkoutExercise,
+    ExerciseSet,
+    ArchivedWorkoutExercise,
+    ArchivedExerciseSet,
+    PackedWorkoutExercise,
+)
+from .sources import PACKED_COLUMNS
+from .stats import refresh_session_summary
+
+BATCH_SESSIONS = 200
+
+
+def load_exercise_entries(workout):
+    """A session's exercises, sets and catalog rows in one round of queries"""
+    if workout.packed_at:
+        model, options = PackedWorkoutExercise, ()
+    else:
+        model = ArchivedWorkoutExercise if workout.archived_at else WorkoutExercise
+        options = (selectinload(model.sets),)
+    return (
+        model.query.options(joinedload(model.exercise), *options)
+        .filter_by(workout_session_id=workout.id)
+        .order_by(model.order_in_workout)
+        .all()
+    )
+
+
+def months_ago(months, today=None):
+    """First day of the month `months` before the current one"""
+    today = today or date.today()
+    month = today.month - 1 - months
+    return date(today.year + month // 12, month % 12 + 1, 1)
+
+
+def _copy_rows(source, target, criterion):
+    columns = [column.name for column in source.__table__.columns]
+    db.session.execute(
+        db.insert(target.__table__).from_select(
+            columns, db.select(*source.__table__.columns).where(criterion)
+        )
+    )
+
+
+def _move_rows(source, target, criterion):
+    """Move matching rows to `target` in one statement (DELETE ... RETURNING)"""
+    columns = [column.name for column in source.__table__.columns]
+    moved = (
+        source.__table__.delete()
+        .where(criterion)
+        .returning(*source.__table__.columns)
+        .cte("moved")
+    )
+    db.session.execute(
+        db.insert(target.__table__).from_select(columns, db.select(*moved.c))
+    )
+
+
+def _move_session_rows(session_ids, to_archive):
+    """Move the exercises and sets of sessions between hot and archive tables.
+
+    The exercises are copied first and removed last, so the sets' foreign
+    keys hold on both sides throughout.
+    """
+    if to_archive:
+        source_exercise, source_set = WorkoutExercise, ExerciseSet
+        target_exercise, target_set = ArchivedWorkoutExercise, ArchivedExerciseSet
+    else:
+        source_exercise, source_set = ArchivedWorkoutExercise, ArchivedExerciseSet
+        target_exercise, target_set = WorkoutExercise, ExerciseSet
+
+    in_sessions = source_exercise.workout_session_id.in_(session_ids)
+    _copy_rows(source_exercise, target_exercise, in_sessions)
+    _move_rows(
+        source_set,
+        target_set,
+        source_set.workout_exercise_id.in_(
+            db.select(source_exercise.id).where(in_sessions)
+        ),
+    )
+    db.session.execute(source_exercise.__table__.delete().where(in_sessions))
+
+
+def _claim_sessions(cutoff, batch_size, *criteria):
+    """Lock the next completed sessions dated before `cutoff` and make sure
+    their summary is frozen: pages list cold sessions from it"""
+    session_ids = [
+        session_id
+        for (session_id,) in db.session.query(WorkoutSession.id)
+        .filter(WorkoutSession.is_completed == True)
+        .filter(WorkoutSession.date < cutoff, *criteria)
+        .order_by(WorkoutSession.id)
+        .limit(batch_size)
+        .with_for_update()
+    ]
+    for workout in WorkoutSession.query.filter(
+        WorkoutSession.id.in_(session_ids), WorkoutSession.summary_volume.is_(None)
+    ):
+        refresh_session_summary(workout)
+    db.session.flush()
+    return session_ids
+
+
+def _expire_sessions(session_ids):
+    """Expire loaded sessions whose storage columns and exercise lists were
+    changed behind the ORM's back; other objects of the caller are left alone"""
+    for session_id in session_ids:
+        workout = db.session.identity_map.get(identity_key(WorkoutSession, session_id))
+        if workout is not None:
+            db.session.expire(workout)
+
+
+def archive_batch(cutoff, batch_size=BATCH_SESSIONS):
+    """Archive up to `batch_size` completed sessions dated before `cutoff`
+    (caller commits). Returns how many sessions were moved."""
+    session_ids = _claim_sessions(
+        cutoff, batch_size, WorkoutSession.archived_at.is_(None)
+    )
+    if not session_ids:
+        return 0
+
+    _move_session_rows(session_ids, to_archive=True)
+    db.session.query(WorkoutSession).filter(
+        WorkoutSession.id.in_(session_ids)
+    ).update({"archived_at": datetime.utcnow()}, synchronize_session=False)
+    _expire_sessions(session_ids)
+    return len(session_ids)
+
+
+def _pack(entry):
+    """packed_workout_exercises row for an exercise and its sets"""
+    sets = sorted(entry.sets, key=lambda s: (s.set_number, s.id))
+    row = {
+        "id": entry.id,
+        "workout_session_id": entry.workout_session_id,
+        "exercise_id": entry.exercise_id,
+        "order_in_workout": entry.order_in_workout,
+        "target_sets": entry.target_sets,
+        "notes": entry.notes,
+        "set_ids": [s.id for s in sets],
+    }
+    for array, column in PACKED_COLUMNS.items():
+        row[array] = [getattr(s, column) for s in sets]
+    return row
+
+
+def compact_batch(cutoff, batch_size=BATCH_SESSIONS):
+    """Pack up to `batch_size` completed sessions dated before `cutoff`, hot
+    or archived (caller commits). Returns how many sessions were packed."""
+    session_ids = _claim_sessions(
+        cutoff, batch_size, WorkoutSession.packed_at.is_(None)
+    )
+    if not session_ids:
+        return 0
+
+    rows, loaded = [], []
+    for model in (WorkoutExercise, ArchivedWorkoutExercise):
+        entries = (
+            model.query.options(selectinload(model.sets))
+            .filter(model.workout_session_id.in_(session_ids))
+            .all()
+        )
+        loaded.extend(entries)
+        rows.extend(_pack(entry) for entry in entries)
+    if rows:
+        db.session.execute(db.insert(PackedWorkoutExercise), rows)
+
+    for exercise_model, set_model in (
+        (WorkoutExercise, ExerciseSet),
+        (ArchivedWorkoutExercise, ArchivedExerciseSet),
+    ):
+        in_sessions = exercise_model.workout_session_id.in_(session_ids)
+        db.session.execute(
+            set_model.__table__.delete().where(
+                set_model.workout_exercise_id.in_(
+                    db.select(exercise_model.id).where(in_sessions)
+                )
+            )
+        )
+        db.session.execute(exercise_model.__table__.delete().where(in_sessions))
+
+    now = datetime.utcnow()
+    db.session.query(WorkoutSession).filter(
+        WorkoutSession.id.in_(session_ids)
+    ).update(
+        {
+            "packed_at": now,
+            "archived_at": db.func.coalesce(WorkoutSession.archived_at, now),
+        },
+        synchronize_session=False,
+    )
+
+    # Their rows are gone: detach what was loaded here, reload the sessions
+    for entry in loaded:
+        for exercise_set in entry.sets:
+            db.session.expunge(exercise_set)
+        db.session.expunge(entry)
+    _expire_sessions(session_ids)
+    return len(session_ids)
+
+
+def _unpack_session(workout):
+    """Write a packed session's exercises and sets back to the hot tables"""
+    entries = PackedWorkoutExercise.query.filter_by(workout_session_id=workout.id).all()
+    if entries:
+        db.session.execute(
+            db.insert(WorkoutExercise),
+            [
+                {
+                    "id": entry.id,
+                    "workout_session_id": entry.workout_session_id,
+                    "exercise_id": entry.exercise_id,
+                    "order_in_workout": entry.order_in_workout,
+                    "target_sets": entry.target_sets,
+                    "notes": entry.notes,
+                }
+                for entry in entries
+            ],
+        )
+        sets = [s._asdict() for entry in entries for s in entry.sets]
+        if sets:
+            db.session.execute(db.insert(ExerciseSet), sets)
+    db.session.execute(
+        PackedWorkoutExercise.__table__.delete().where(
+            PackedWorkoutExercise.workout_session_id == workout.id
+        )
+    )
+
+
+def restore_session(workout):
+    """Bring an archived or packed session's exercises and sets back to the
+    hot tables (caller commits)"""
+    if workout.archived_at is None:
+        return False
+    if workout.packed_at:
+        _unpack_session(workout)
+    else:
+        _move_session_rows([workout.id], to_archive=False)
+    workout.archived_at = None
+    workout.packed_at = None
+    db.session.flush()
+    db.session.expire(
+        workout, ["exercises", "archived_exercises", "packed_exercises"]
+    )
+    return True
+
+
+def editable_set(set_id, user_id):
+    """An ExerciseSet by id, restoring the user's archived or packed session
+    that holds it first (caller commits); None if there is no such set"""
+    exercise_set = db.session.get(ExerciseSet, set_id)
+    if exercise_set is not None:
+        return exercise_set
+
+    workout_session_id = db.session.scalar(
+        db.select(ArchivedWorkoutExercise.workout_session_id)
+        .join(ArchivedExerciseSet)
+        .where(ArchivedExerciseSet.id == set_id)
+    )
+    if workout_session_id is None:
+        # Set ids inside the arrays aren't indexed: only search this user's
+        # packed sessions
+        workout_session_id = db.session.scalar(
+            db.select(PackedWorkoutExercise.workout_session_id)
+            .join(WorkoutSession)
+            .where(
+                WorkoutSession.user_id == user_id,
+                WorkoutSession.packed_at.is_not(None),
+                PackedWorkoutExercise.set_ids.any(set_id),
+            )
+            .limit(1)
+        )
+    if workout_session_id is None:
+        return None
+    workout = db.session.get(WorkoutSession, workout_session_id)
+    if workout.user_id != user_id:
+        return None
+    restore_session(workout)
+    return db.session.get(ExerciseSet, set_id)
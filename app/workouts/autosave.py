@@ -0,0 +1,150 @@
+"""
+Write-behind queue for set autosave.
+
+The active workout page saves on nearly every edit. Applying each save on its
+own (bulk UPDATE, record index, session version) costs a dozen statements and
+a commit, so saves to an in-progress workout are upserted into
+`pending_set_updates` instead: one statement per save and one row per set, so
+repeated edits of a set collapse into its latest values. Once a session's
+oldest queued edit is a window old, the next autosave any worker handles
+applies the session (see services.flush_autosaves); `flask
+flush-set-autosaves` applies whatever is left, e.g. from cron.
+
+The queue is a table rather than worker memory, so every uwsgi worker sees it
+and a worker that dies loses nothing. finish_workout and the active workout
+page drain their session's rows in their own transaction, so they always see
+the final values; /details shows queued values over the applied ones, so
+other devices see a save as soon as it is queued.
+
+Set SET_AUTOSAVE_WINDOW (seconds) in the app config; 0 writes every save
+through immediately.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.extensions import db
+from .models import PendingSetUpdate
+
+DEFAULT_WINDOW = 2.0  # seconds
+BATCH_SIZE = 500
+BATCH_SESSIONS = 20  # sessions applied by one flush
+
+PATCH_FIELDS = ("weight", "reps", "is_completed", "rpe", "notes")
+
+
+def autosave_window():
+    return current_app.config.get("SET_AUTOSAVE_WINDOW", DEFAULT_WINDOW)
+
+
+def buffer_set_patches(workout_session_id, patches):
+    """Queue {set_id: patch} for a session (caller commits).
+
+    One multi-row INSERT ... ON CONFLICT: a set already in the queue gets the
+    new values but keeps its original timestamp, so a set that keeps being
+    edited is still applied within one window of its first edit.
+    """
+    if not patches:
+        return []
+
+    now = datetime.utcnow()
+    stmt = pg_insert(PendingSetUpdate).values(
+        [
+            {
+                "set_id": set_id,
+                "workout_session_id": workout_session_id,
+                "weight": patch.get("weight"),
+                "reps": patch.get("reps"),
+                "is_completed": bool(patch.get("is_completed", False)),
+                "rpe": patch.get("rpe"),
+                "notes": patch.get("notes"),
+                "received_at": now,
+            }
+            for set_id, patch in patches.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PendingSetUpdate.set_id],
+        set_={field: stmt.excluded[field] for field in PATCH_FIELDS},
+    )
+    db.session.execute(stmt)
+    return list(patches)
+
+
+def due_sessions(window, limit=BATCH_SESSIONS):
+    """Ids of sessions whose oldest queued edit is at least `window` seconds old"""
+    cutoff = datetime.utcnow() - timedelta(seconds=window)
+    oldest = db.func.min(PendingSetUpdate.received_at)
+    return db.session.scalars(
+        db.select(PendingSetUpdate.workout_session_id)
+        .group_by(PendingSetUpdate.workout_session_id)
+        .having(oldest <= cutoff)
+        .order_by(oldest)
+        .limit(limit)
+    ).all()
+
+
+def _take(rows):
+    """DELETE the queued rows selected by `rows` and return them grouped as
+    {workout_session_id: {set_id: patch}}"""
+    taken = {}
+    for row in db.session.execute(
+        db.delete(PendingSetUpdate)
+        .where(PendingSetUpdate.set_id.in_(rows.scalar_subquery()))
+        .returning(
+            PendingSetUpdate.set_id,
+            PendingSetUpdate.workout_session_id,
+            *[getattr(PendingSetUpdate, field) for field in PATCH_FIELDS],
+        )
+    ):
+        taken.setdefault(row.workout_session_id, {})[row.set_id] = {
+            field: getattr(row, field) for field in PATCH_FIELDS
+        }
+    return taken
+
+
+def take_queued(workout_session_ids, skip_locked=False):
+    """Remove and return the sessions' queued patches (caller commits).
+
+    Rows another transaction is applying are waited for, or skipped with
+    `skip_locked`.
+    """
+    workout_session_ids = list(workout_session_ids)
+    if not workout_session_ids:
+        return {}
+    return _take(
+        db.select(PendingSetUpdate.set_id)
+        .where(PendingSetUpdate.workout_session_id.in_(workout_session_ids))
+        .with_for_update(skip_locked=skip_locked)
+    )
+
+
+def take_queued_batch(limit=BATCH_SIZE):
+    """Remove and return up to `limit` of the oldest queued patches,
+    skipping rows another transaction is applying (caller commits)"""
+    return _take(
+        db.select(PendingSetUpdate.set_id)
+        .order_by(PendingSetUpdate.received_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+
+def queued_patches(workout_session_id):
+    """{set_id: patch} queued for a session, left in the queue"""
+    return {
+        row.set_id: {field: getattr(row, field) for field in PATCH_FIELDS}
+        for row in db.session.execute(
+            db.select(
+                PendingSetUpdate.set_id,
+                *[getattr(PendingSetUpdate, field) for field in PATCH_FIELDS],
+            ).where(PendingSetUpdate.workout_session_id == workout_session_id)
+        )
+    }
+
+
+def take_pending(workout_session_id):
+    """Every patch queued for a session (caller commits)"""
+    return take_queued([workout_session_id]).get(workout_session_id, {})
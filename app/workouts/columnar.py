@@ -0,0 +1,259 @@
+"""
+Columnar snapshot of the set history for offline analytics.
+
+Every exercise set, joined to its session and exercise, is written column by
+column: one `.npy` file per column (memory-mappable with
+`np.load(path, mmap_mode="r")`), or a single Parquet file when pyarrow is
+installed. Exercise and muscle group are dictionary-encoded as small integer
+codes; `manifest.json` holds the dictionaries, dtypes and row count.
+
+Rows are streamed from a server-side cursor in chunks and written straight
+into the output, so memory stays flat. The export runs in one REPEATABLE READ
+transaction: every column comes from the same snapshot.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.extensions import db
+from app.exercises.models import Exercise
+from .sources import set_sources
+from .models import WorkoutSession
+
+FORMATS = ("auto", "npy", "parquet")
+CHUNK_ROWS = 50000
+
+# Nullable numbers are float32 with NaN for missing values
+COLUMNS = {
+    "set_id": np.int64,
+    "workout_session_id": np.int64,
+    "user_id": np.int32,
+    "date": "datetime64[D]",
+    "exercise": np.int16,  # code into manifest["dictionaries"]["exercise"]
+    "muscle_group": np.int8,  # code into manifest["dictionaries"]["muscle_group"]
+    "set_number": np.int16,
+    "weight": np.float32,
+    "reps": np.float32,
+    "rpe": np.float32,
+    "is_warmup": np.bool_,
+    "is_completed": np.bool_,
+    "session_completed": np.bool_,
+}
+
+
+def _query():
+    """Live, archived and packed sets in set id order"""
+    rows = db.union_all(
+        *(
+            db.select(
+                exercise_set.id.label("set_id"),
+                WorkoutSession.id.label("workout_session_id"),
+                WorkoutSession.user_id,
+                WorkoutSession.date,
+                workout_exercise.exercise_id,
+                exercise_set.set_number,
+                exercise_set.weight,
+                exercise_set.reps,
+                exercise_set.rpe,
+                exercise_set.is_warmup,
+                exercise_set.is_completed,
+                WorkoutSession.is_completed.label("session_completed"),
+            )
+            .join(
+                workout_exercise,
+                exercise_set.workout_exercise_id == workout_exercise.id,
+            )
+            .join(
+                WorkoutSession, workout_exercise.workout_session_id == WorkoutSession.id
+            )
+            for workout_exercise, exercise_set, _ in set_sources()
+        )
+    ).subquery()
+    return db.select(rows).order_by(rows.c.set_id)
+
+
+def _dictionaries():
+    """Exercise names and muscle groups, plus lookup tables exercise id -> codes"""
+    exercises = db.session.execute(
+        db.select(Exercise.id, Exercise.name, Exercise.muscle_group).order_by(
+            Exercise.id
+        )
+    ).all()
+    groups = list(Exercise.__table__.c.muscle_group.type.enums)
+
+    size = max((exercise_id for exercise_id, _, _ in exercises), default=0) + 1
+    exercise_codes = np.full(size, -1, dtype=np.int16)
+    group_codes = np.full(size, -1, dtype=np.int8)
+    for code, (exercise_id, _, group) in enumerate(exercises):
+        exercise_codes[exercise_id] = code
+        group_codes[exercise_id] = groups.index(group)
+
+    names = [name for _, name, _ in exercises]
+    return {"exercise": names, "muscle_group": groups}, exercise_codes, group_codes
+
+
+def _chunk_columns(rows, exercise_codes, group_codes):
+    """NumPy arrays for one chunk of rows, keyed like COLUMNS"""
+    (
+        set_ids,
+        session_ids,
+        user_ids,
+        dates,
+        exercise_ids,
+        set_numbers,
+        weights,
+        reps,
+        rpes,
+        warmups,
+        completed,
+        session_completed,
+    ) = zip(*rows)
+    exercise_ids = np.array(exercise_ids, dtype=np.int64)
+
+    def nullable(values):
+        return np.array(
+            [np.nan if value is None else value for value in values],
+            dtype=np.float32,
+        )
+
+    return {
+        "set_id": np.array(set_ids, dtype=np.int64),
+        "workout_session_id": np.array(session_ids, dtype=np.int64),
+        "user_id": np.array(user_ids, dtype=np.int32),
+        "date": np.array(dates, dtype="datetime64[D]"),
+        "exercise": exercise_codes[exercise_ids],
+        "muscle_group": group_codes[exercise_ids],
+        "set_number": np.array(set_numbers, dtype=np.int16),
+        "weight": nullable(weights),
+        "reps": nullable(reps),
+        "rpe": nullable(rpes),
+        "is_warmup": np.array(warmups, dtype=np.bool_),
+        "is_completed": np.array(completed, dtype=np.bool_),
+        "session_completed": np.array(session_completed, dtype=np.bool_),
+    }
+
+
+def _chunks(chunk_rows, codes):
+    result = db.session.execute(_query().execution_options(yield_per=chunk_rows))
+    for rows in result.partitions():
+        yield _chunk_columns(rows, *codes)
+
+
+def _write_npy(directory, total, chunk_rows, codes, progress):
+    """Fill one preallocated, memory-mapped .npy file per column"""
+    paths = {name: os.path.join(directory, f"{name}.npy") for name in COLUMNS}
+    if total == 0:
+        for name, dtype in COLUMNS.items():
+            np.save(paths[name], np.empty(0, dtype=dtype))
+        return 0
+
+    outputs = {
+        name: np.lib.format.open_memmap(
+            paths[name], mode="w+", dtype=dtype, shape=(total,)
+        )
+        for name, dtype in COLUMNS.items()
+    }
+    written = 0
+    for columns in _chunks(chunk_rows, codes):
+        count = len(columns["set_id"])
+        for name, values in columns.items():
+            outputs[name][written : written + count] = values
+        written += count
+        if progress:
+            progress(written)
+    for output in outputs.values():
+        output.flush()
+    return written
+
+
+def _write_parquet(directory, chunk_rows, codes, dictionaries, progress):
+    """One Parquet file, a row group per chunk, with dictionary columns"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    encoded = {
+        "exercise": (pa.int16(), pa.array(dictionaries["exercise"], pa.string())),
+        "muscle_group": (pa.int8(), pa.array(dictionaries["muscle_group"], pa.string())),
+    }
+    writer = None
+    written = 0
+    try:
+        for columns in _chunks(chunk_rows, codes):
+            arrays = {}
+            for name, values in columns.items():
+                if name in encoded:
+                    index_type, dictionary = encoded[name]
+                    arrays[name] = pa.DictionaryArray.from_arrays(
+                        pa.array(values, index_type), dictionary
+                    )
+                else:
+                    # NaN becomes a proper null
+                    arrays[name] = pa.array(values, from_pandas=True)
+            table = pa.table(arrays)
+            if writer is None:
+                writer = pq.ParquetWriter(
+                    os.path.join(directory, "sets.parquet"), table.schema
+                )
+            writer.write_table(table)
+            written += table.num_rows
+            if progress:
+                progress(written)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_columnar(directory, fmt="auto", chunk_rows=CHUNK_ROWS, progress=None):
+    """Write the snapshot into `directory`; returns the manifest.
+
+    fmt "auto" picks Parquet when pyarrow is installed, .npy files otherwise.
+    `progress(rows written)` is called after every chunk.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if fmt == "auto":
+        fmt = "parquet" if parquet_available() else "npy"
+    elif fmt == "parquet" and not parquet_available():
+        raise ValueError("Parquet output needs pyarrow (pip install pyarrow)")
+
+    os.makedirs(directory, exist_ok=True)
+    started = time.monotonic()
+
+    # Count and rows must come from the same snapshot
+    db.session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    try:
+        dictionaries, *codes = _dictionaries()
+        if fmt == "npy":
+            total = db.session.scalar(
+                db.select(db.func.count()).select_from(_query().subquery())
+            )
+            rows = _write_npy(directory, total, chunk_rows, codes, progress)
+        else:
+            rows = _write_parquet(directory, chunk_rows, codes, dictionaries, progress)
+    finally:
+        db.session.rollback()
+
+    manifest = {
+        "format": fmt,
+        "rows": rows,
+        "exported_at": datetime.utcnow().isoformat(),
+        "seconds": round(time.monotonic() - started, 2),
+        "columns": {name: np.dtype(dtype).name for name, dtype in COLUMNS.items()},
+        "dictionaries": dictionaries,
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,223 @@
+"""
+Per-session exercise logs and global exercise statistics.
+
+When a workout is finished its completed sets are folded, in one grouped
+query, into `ExerciseLog` rows: one per exercise and warmup/working split,
+holding set count, total reps, top weight and volume. The same rows are
+added to the global `ExerciseStatistic` counters with a single upsert.
+Per-exercise progress is then read from a few log rows per session instead
+of from exercise_sets.
+
+Edits to a finished session take its logs out of the counters and log it
+again. `last_performed` only ever moves forward.
+"""
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.extensions import db
+from app.exercises.models import ExerciseLog, ExerciseStatistic
+from .models import WorkoutSession
+from .sources import stored_sets
+
+BACKFILL_CHUNK = 500  # sessions per backfill transaction
+
+
+def _session_logs(*criteria):
+    """ExerciseLog rows for the finished sessions matching `criteria`, from
+    whichever tier holds their sets"""
+    sets = stored_sets()
+    rows = (
+        db.session.query(
+            sets.c.workout_session_id,
+            WorkoutSession.user_id,
+            WorkoutSession.date,
+            sets.c.exercise_id,
+            sets.c.is_warmup,
+            db.func.count(sets.c.id),
+            db.func.coalesce(db.func.sum(sets.c.reps), 0),
+            db.func.max(sets.c.weight),
+            db.func.coalesce(db.func.sum(sets.c.weight * sets.c.reps), 0.0),
+        )
+        .select_from(sets)
+        .join(WorkoutSession, sets.c.workout_session_id == WorkoutSession.id)
+        .filter(WorkoutSession.is_completed == True)
+        .filter(sets.c.is_completed == True)
+        .filter(*criteria)
+        .group_by(
+            sets.c.workout_session_id,
+            WorkoutSession.user_id,
+            WorkoutSession.date,
+            sets.c.exercise_id,
+            sets.c.is_warmup,
+        )
+    )
+    return [
+        {
+            "workout_session_id": session_id,
+            "user_id": user_id,
+            "date": session_date,
+            "exercise_id": exercise_id,
+            "is_warmup": is_warmup,
+            "sets": sets,
+            "reps": reps,
+            "weight": weight,
+            "volume": volume,
+        }
+        for (
+            session_id,
+            user_id,
+            session_date,
+            exercise_id,
+            is_warmup,
+            sets,
+            reps,
+            weight,
+            volume,
+        ) in rows
+    ]
+
+
+def _add_statistics(logs, sign=1):
+    """Add (or with sign=-1 remove) log rows to the global counters.
+
+    One INSERT ... ON CONFLICT with increments, so concurrent finishes never
+    lose an update. Rows go in a fixed order to avoid lock-order deadlocks.
+    """
+    totals = {}
+    for log in logs:
+        key = (log["exercise_id"], bool(log["is_warmup"]))
+        total = totals.setdefault(key, {"sets": 0, "volume": 0.0, "last": None})
+        total["sets"] += log["sets"]
+        total["volume"] += log["volume"] or 0.0
+        if sign > 0 and (total["last"] is None or log["date"] > total["last"]):
+            total["last"] = log["date"]
+    if not totals:
+        return
+
+    stmt = pg_insert(ExerciseStatistic).values(
+        [
+            {
+                "exercise_id": exercise_id,
+                "is_warmup": is_warmup,
+                "total_performed": sign * total["sets"],
+                "total_weight_lifted": sign * total["volume"],
+                "last_performed": total["last"],
+            }
+            for (exercise_id, is_warmup), total in sorted(totals.items())
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ExerciseStatistic.exercise_id, ExerciseStatistic.is_warmup],
+        set_={
+            "total_performed": ExerciseStatistic.total_performed
+            + stmt.excluded.total_performed,
+            "total_weight_lifted": ExerciseStatistic.total_weight_lifted
+            + stmt.excluded.total_weight_lifted,
+            "last_performed": db.func.greatest(
+                ExerciseStatistic.last_performed, stmt.excluded.last_performed
+            ),
+        },
+    )
+    db.session.execute(stmt)
+
+
+def record_session_logs(workout_session_ids):
+    """Log finished sessions and count them in the statistics (caller commits).
+
+    Returns the number of log rows written.
+    """
+    db.session.flush()
+    logs = _session_logs(WorkoutSession.id.in_(workout_session_ids))
+    if logs:
+        # executemany: one round trip for all rows
+        db.session.execute(db.insert(ExerciseLog), logs)
+        _add_statistics(logs)
+    return len(logs)
+
+
+def forget_session_logs(workout_session_id):
+    """Drop a session's logs and take them out of the statistics (caller commits)"""
+    logs = [
+        {
+            "exercise_id": exercise_id,
+            "is_warmup": is_warmup,
+            "sets": sets,
+            "volume": volume,
+            "date": log_date,
+        }
+        for exercise_id, is_warmup, sets, volume, log_date in db.session.query(
+            ExerciseLog.exercise_id,
+            ExerciseLog.is_warmup,
+            ExerciseLog.sets,
+            ExerciseLog.volume,
+            ExerciseLog.date,
+        ).filter(ExerciseLog.workout_session_id == workout_session_id)
+    ]
+    if not logs:
+        return
+    _add_statistics(logs, sign=-1)
+    ExerciseLog.query.filter_by(workout_session_id=workout_session_id).delete()
+
+
+def refresh_session_logs(workout):
+    """Re-log a finished session whose sets changed (caller commits)"""
+    forget_session_logs(workout.id)
+    record_session_logs([workout.id])
+
+
+def backfill_chunk(after_id=0, chunk_size=BACKFILL_CHUNK):
+    """Log the next finished sessions after `after_id` that have no logs yet.
+
+    Returns (last session id, sessions, log rows); the id is None when there
+    is nothing left. Sessions with logs are skipped, so a stopped backfill
+    can simply be run again.
+    """
+    logged = (
+        db.session.query(ExerciseLog.id)
+        .filter(ExerciseLog.workout_session_id == WorkoutSession.id)
+        .exists()
+    )
+    session_ids = [
+        session_id
+        for (session_id,) in db.session.query(WorkoutSession.id)
+        .filter(WorkoutSession.is_completed == True)
+        .filter(WorkoutSession.id > after_id)
+        .filter(~logged)
+        .order_by(WorkoutSession.id)
+        .limit(chunk_size)
+    ]
+    if not session_ids:
+        return None, 0, 0
+    return session_ids[-1], len(session_ids), record_session_logs(session_ids)
+
+
+def exercise_progress(user_id, exercise_id, start=None, end=None):
+    """Working sets of one exercise per training day, from the logs"""
+    query = db.session.query(
+        ExerciseLog.date,
+        db.func.sum(ExerciseLog.sets),
+        db.func.sum(ExerciseLog.reps),
+        db.func.max(ExerciseLog.weight),
+        db.func.sum(ExerciseLog.volume),
+    ).filter(
+        ExerciseLog.user_id == user_id,
+        ExerciseLog.exercise_id == exercise_id,
+        ExerciseLog.is_warmup == False,
+    )
+    if start is not None:
+        query = query.filter(ExerciseLog.date >= start)
+    if end is not None:
+        query = query.filter(ExerciseLog.date <= end)
+
+    return [
+        {
+            "date": log_date.isoformat(),
+            "sets": sets,
+            "reps": reps,
+            "top_weight": weight,
+            "volume": round(volume or 0.0, 1),
+        }
+        for log_date, sets, reps, weight, volume in query.group_by(
+            ExerciseLog.date
+        ).order_by(ExerciseLog.date)
+    ]
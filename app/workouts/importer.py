@@ -0,0 +1,378 @@
+"""
+Bulk import of workout history exported from other trackers.
+
+Input is one row per set, as CSV or JSON (a top-level array or JSON Lines),
+read from the file in chunks:
+
+    date, workout, exercise, set_number, weight, reps, is_warmup, rpe, notes,
+    duration_minutes
+
+Only date and exercise are required. Consecutive rows with the same date and
+workout form one session, which is how every tracker exports them. Exercise
+names are matched case-insensitively through an index built from the exercise
+catalog; rows with unknown names are skipped and reported.
+
+Sessions are loaded in batches of about `batch_size` sets: ids are reserved
+from the table sequences, then each table is written with one COPY. Memory use
+does not grow with the file. Session summaries are written by the COPY and
+exercise logs per batch; user stats, records, rollups and monthly volumes are
+rebuilt once at the end. The whole import is one transaction (caller commits).
+"""
+
+import csv
+import io
+import json
+import math
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.exercises.catalog import get_catalog
+from .exercise_logs import record_session_logs
+from .leaderboard import rebuild_monthly_volumes
+from .models import WorkoutSession, WorkoutExercise, ExerciseSet
+from .records import rebuild_personal_records
+from .rollups import rebuild_user_rollups
+from .stats import rebuild_user_stats
+
+FORMATS = ("csv", "json")
+BATCH_SETS = 5000
+READ_CHUNK = 64 * 1024
+DEFAULT_WORKOUT_NAME = "Imported workout"
+
+# Column names used by common tracker exports
+FIELD_ALIASES = {
+    "exercise name": "exercise",
+    "workout name": "workout",
+    "set order": "set_number",
+    "duration": "duration_minutes",
+    "warmup": "is_warmup",
+}
+
+SESSION_COLUMNS = (
+    "id",
+    "user_id",
+    "name",
+    "date",
+    "start_time",
+    "end_time",
+    "is_completed",
+    "summary_volume",
+    "summary_sets",
+    "summary_duration",
+    "summary_muscle_groups",
+)
+EXERCISE_COLUMNS = (
+    "id",
+    "workout_session_id",
+    "exercise_id",
+    "order_in_workout",
+    "target_sets",
+)
+SET_COLUMNS = (
+    "id",
+    "workout_exercise_id",
+    "set_number",
+    "weight",
+    "reps",
+    "is_completed",
+    "rpe",
+    "notes",
+    "is_warmup",
+)
+
+
+class UnknownExercise(Exception):
+    pass
+
+
+def detect_format(filename):
+    """csv or json, from the file extension"""
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension == "csv":
+        return "csv"
+    if extension in ("json", "jsonl", "ndjson"):
+        return "json"
+    raise ValueError("Unsupported file type, expected .csv, .json or .jsonl")
+
+
+def _csv_rows(stream):
+    yield from csv.DictReader(stream)
+
+
+def _json_rows(stream):
+    """Objects of a JSON array or JSON Lines file, decoded chunk by chunk"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    while True:
+        # Array brackets, commas and newlines between objects
+        buffer = buffer.lstrip(" \t\r\n,[]")
+        if buffer:
+            try:
+                row, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Invalid JSON near: " + buffer[:50])
+            else:
+                if not isinstance(row, dict):
+                    raise ValueError("Expected one JSON object per set")
+                yield row
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            return
+
+        chunk = stream.read(READ_CHUNK)
+        eof = not chunk
+        buffer += chunk
+
+
+def _normalize(name):
+    return " ".join(str(name).split()).casefold()
+
+
+def _number(value, cast):
+    """None for blanks; raises ValueError for anything but a finite number"""
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except OverflowError:
+        raise ValueError(f"Number out of range: {value}")
+    # NaN and Infinity parse as floats (JSON has them as literals too)
+    if not math.isfinite(number):
+        raise ValueError(f"Not a finite number: {value}")
+    return cast(number)
+
+
+def _flag(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "y", "t", "w")
+
+
+def _parse_date(value):
+    """(date, start time or None) from 'YYYY-MM-DD' or an ISO datetime"""
+    value = str(value).strip()
+    if len(value) <= 10:
+        return datetime.strptime(value, "%Y-%m-%d").date(), None
+    started = datetime.fromisoformat(value.replace("Z", ""))
+    return started.date(), started
+
+
+def _parse_row(row, exercise_index):
+    """Normalized set dict; raises KeyError/ValueError for unusable rows and
+    UnknownExercise for names that are not in the catalog"""
+    row = {
+        FIELD_ALIASES.get(key.strip().lower(), key.strip().lower()): value
+        for key, value in row.items()
+        if key
+    }
+    day, started = _parse_date(row["date"])
+    exercise_name = row["exercise"]
+    exercise = exercise_index.get(_normalize(exercise_name))
+    if exercise is None:
+        raise UnknownExercise(exercise_name)
+
+    return {
+        "date": day,
+        "start_time": started,
+        "workout": (row.get("workout") or DEFAULT_WORKOUT_NAME)[:100],
+        "duration": _number(row.get("duration_minutes"), float),
+        "exercise_id": exercise.id,
+        "muscle_group": exercise.muscle_group,
+        "set_number": _number(row.get("set_number"), int),
+        "weight": _number(row.get("weight"), float),
+        "reps": _number(row.get("reps"), int),
+        "is_warmup": _flag(row.get("is_warmup") or ""),
+        "rpe": _number(row.get("rpe"), int),
+        "notes": row.get("notes") or None,
+    }
+
+
+def _sessions(rows, exercise_index, report):
+    """Group consecutive parsed rows into sessions: yields lists of sets"""
+    current_key = None
+    current = []
+    for row in rows:
+        try:
+            parsed = _parse_row(row, exercise_index)
+        except UnknownExercise as e:
+            report["skipped"] += 1
+            report["unknown_exercises"][e.args[0]] += 1
+            continue
+        except (KeyError, TypeError, ValueError):
+            report["skipped"] += 1
+            continue
+
+        key = (parsed["date"], parsed["workout"])
+        if key != current_key and current:
+            yield current
+            current = []
+        current_key = key
+        current.append(parsed)
+    if current:
+        yield current
+
+
+def _allocate_ids(table, count):
+    """Reserve `count` primary keys from the table's sequence"""
+    return (
+        db.session.execute(
+            db.text(
+                "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                "FROM generate_series(1, :count)"
+            ),
+            {"table": table, "count": count},
+        )
+        .scalars()
+        .all()
+    )
+
+
+def _copy(table, columns, rows):
+    """COPY rows into `table` over the session's connection (same transaction)"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def _load_batch(user_id, sessions):
+    """Write a batch of sessions with one COPY per table.
+
+    Returns (session ids, number of sets).
+    """
+    exercise_count = sum(
+        len({s["exercise_id"] for s in session_sets}) for session_sets in sessions
+    )
+    set_count = sum(len(session_sets) for session_sets in sessions)
+    session_ids = iter(_allocate_ids(WorkoutSession.__tablename__, len(sessions)))
+    exercise_ids = iter(_allocate_ids(WorkoutExercise.__tablename__, exercise_count))
+    set_ids = iter(_allocate_ids(ExerciseSet.__tablename__, set_count))
+
+    session_rows, exercise_rows, set_rows, loaded = [], [], [], []
+    for session_sets in sessions:
+        session_id = next(session_ids)
+        loaded.append(session_id)
+        first = session_sets[0]
+
+        by_exercise = {}
+        for s in session_sets:
+            by_exercise.setdefault(s["exercise_id"], []).append(s)
+
+        volume, working_sets = 0.0, 0
+        for order, (exercise_id, sets) in enumerate(by_exercise.items(), start=1):
+            workout_exercise_id = next(exercise_ids)
+            exercise_rows.append(
+                (workout_exercise_id, session_id, exercise_id, order, len(sets))
+            )
+            for number, s in enumerate(sets, start=1):
+                set_rows.append(
+                    (
+                        next(set_ids),
+                        workout_exercise_id,
+                        s["set_number"] or number,
+                        s["weight"],
+                        s["reps"],
+                        True,
+                        s["rpe"],
+                        s["notes"],
+                        s["is_warmup"],
+                    )
+                )
+                if not s["is_warmup"]:
+                    working_sets += 1
+                    volume += (s["weight"] or 0) * (s["reps"] or 0)
+
+        duration = first["duration"]
+        end_time = (
+            first["start_time"] + timedelta(minutes=duration)
+            if first["start_time"] and duration
+            else None
+        )
+        session_rows.append(
+            (
+                session_id,
+                user_id,
+                first["workout"],
+                first["date"],
+                first["start_time"],
+                end_time,
+                True,
+                volume,
+                working_sets,
+                round(duration or 0),
+                ",".join(sorted({s["muscle_group"] for s in session_sets})),
+            )
+        )
+
+    _copy(WorkoutSession.__tablename__, SESSION_COLUMNS, session_rows)
+    _copy(WorkoutExercise.__tablename__, EXERCISE_COLUMNS, exercise_rows)
+    _copy(ExerciseSet.__tablename__, SET_COLUMNS, set_rows)
+    return loaded, set_count
+
+
+def import_workouts(user_id, stream, fmt, batch_size=BATCH_SETS, progress=None):
+    """Import a text stream of sets for a user (caller commits).
+
+    `progress(report)` is called after every batch. Returns the report:
+    sessions, sets, skipped rows, unknown exercise names, seconds and
+    sets_per_second.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+    started = time.monotonic()
+    report = {
+        "sessions": 0,
+        "sets": 0,
+        "skipped": 0,
+        "unknown_exercises": Counter(),
+        "seconds": 0.0,
+        "sets_per_second": 0.0,
+    }
+    exercise_index = {
+        _normalize(exercise.name): exercise for exercise in get_catalog().exercises
+    }
+    rows = _csv_rows(stream) if fmt == "csv" else _json_rows(stream)
+
+    def flush(batch):
+        session_ids, set_count = _load_batch(user_id, batch)
+        record_session_logs(session_ids)
+        report["sessions"] += len(session_ids)
+        report["sets"] += set_count
+        report["seconds"] = time.monotonic() - started
+        report["sets_per_second"] = report["sets"] / max(report["seconds"], 1e-9)
+        if progress:
+            progress(report)
+
+    batch, batch_sets = [], 0
+    for session_sets in _sessions(rows, exercise_index, report):
+        batch.append(session_sets)
+        batch_sets += len(session_sets)
+        if batch_sets >= batch_size:
+            flush(batch)
+            batch, batch_sets = [], 0
+    if batch:
+        flush(batch)
+
+    if report["sessions"]:
+        rebuild_user_stats(user_id)
+        rebuild_personal_records(user_id)
+        rebuild_user_rollups(user_id)
+        rebuild_monthly_volumes(user_id)
+
+    report["seconds"] = round(time.monotonic() - started, 2)
+    report["sets_per_second"] = round(
+        report["sets"] / max(report["seconds"], 1e-9), 1
+    )
+    report["unknown_exercises"] = dict(report["unknown_exercises"].most_common(20))
+    return report
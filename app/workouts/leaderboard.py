@@ -0,0 +1,224 @@
+"""
+Per-exercise leaderboards.
+
+Max weight and best estimated 1RM come straight from the personal-record
+index, which is already updated as sets are completed. Monthly volume is kept
+in `ExerciseMonthlyVolume` for finished workouts: refreshed for the session's
+exercises when it is finished, and for the touched exercise when a set of a
+finished workout is edited or removed. Autosaves of a workout in progress
+leave it alone. Both are read by scanning an index laid out in the board's
+ORDER BY (ties broken by user id) with LIMIT N, so a leaderboard costs the
+same no matter how large exercise_sets grows. Level/gender filters are
+checked per row against users while scanning.
+"""
+
+from datetime import date, timedelta
+
+from app.extensions import db
+from app.users.models import User
+from .models import (
+    WorkoutSession,
+    WorkoutExercise,
+    PersonalRecord,
+    ExerciseMonthlyVolume,
+)
+from .sources import stored_sets
+
+METRICS = ("max_weight", "e1rm", "volume")
+MAX_LIMIT = 100
+
+
+def month_bounds(day):
+    """(first day of the month containing `day`, first day of the next one)"""
+    start = day.replace(day=1)
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, end
+
+
+def refresh_monthly_volume(user_id, day, exercise_ids, exclude_session_id=None):
+    """Recompute the user's completed-set volume for `exercise_ids` in the
+    month containing `day` (caller commits).
+
+    Scans one user's finished sessions for one month only, archived ones
+    included.
+    """
+    exercise_ids = set(exercise_ids)
+    if not exercise_ids:
+        return
+    db.session.flush()
+    start, end = month_bounds(day)
+
+    sets = stored_sets()
+    volumes = (
+        db.session.query(
+            sets.c.exercise_id,
+            db.func.sum(sets.c.weight * sets.c.reps),
+        )
+        .select_from(sets)
+        .join(WorkoutSession, sets.c.workout_session_id == WorkoutSession.id)
+        .filter(WorkoutSession.user_id == user_id)
+        .filter(WorkoutSession.is_completed == True)
+        .filter(WorkoutSession.date >= start, WorkoutSession.date < end)
+        .filter(sets.c.exercise_id.in_(exercise_ids))
+        .filter(sets.c.is_completed == True)
+        .filter(sets.c.is_warmup == False)
+        .filter(sets.c.weight > 0, sets.c.reps > 0)
+    )
+    if exclude_session_id is not None:
+        volumes = volumes.filter(WorkoutSession.id != exclude_session_id)
+    volumes = dict(volumes.group_by(sets.c.exercise_id).all())
+
+    rows = {
+        row.exercise_id: row
+        for row in ExerciseMonthlyVolume.query.filter(
+            ExerciseMonthlyVolume.user_id == user_id,
+            ExerciseMonthlyVolume.month_start == start,
+            ExerciseMonthlyVolume.exercise_id.in_(exercise_ids),
+        )
+    }
+
+    for exercise_id in exercise_ids:
+        volume = volumes.get(exercise_id) or 0.0
+        row = rows.get(exercise_id)
+        if volume <= 0:
+            if row is not None:
+                db.session.delete(row)
+        elif row is None:
+            db.session.add(
+                ExerciseMonthlyVolume(
+                    user_id=user_id,
+                    exercise_id=exercise_id,
+                    month_start=start,
+                    volume=volume,
+                )
+            )
+        else:
+            row.volume = volume
+
+
+def session_exercise_ids(workout_session_id):
+    return [
+        exercise_id
+        for (exercise_id,) in db.session.query(WorkoutExercise.exercise_id)
+        .filter_by(workout_session_id=workout_session_id)
+        .distinct()
+    ]
+
+
+def record_finished_volume(workout):
+    """Fold a just-finished session into its month (caller commits)"""
+    refresh_monthly_volume(
+        workout.user_id, workout.date, session_exercise_ids(workout.id)
+    )
+
+
+def forget_session_volume(workout):
+    """Take a session that is about to be deleted out of the monthly volumes"""
+    if not workout.is_completed:
+        return
+    refresh_monthly_volume(
+        workout.user_id,
+        workout.date,
+        session_exercise_ids(workout.id),
+        exclude_session_id=workout.id,
+    )
+
+
+def rebuild_monthly_volumes(user_id):
+    """Recompute all of a user's monthly exercise volumes (caller commits)"""
+    ExerciseMonthlyVolume.query.filter_by(user_id=user_id).delete()
+
+    totals = {}
+    sets = stored_sets()
+    rows = (
+        db.session.query(
+            sets.c.exercise_id,
+            WorkoutSession.date,
+            db.func.sum(sets.c.weight * sets.c.reps),
+        )
+        .select_from(sets)
+        .join(WorkoutSession, sets.c.workout_session_id == WorkoutSession.id)
+        .filter(WorkoutSession.user_id == user_id)
+        .filter(WorkoutSession.is_completed == True)
+        .filter(sets.c.is_completed == True)
+        .filter(sets.c.is_warmup == False)
+        .filter(sets.c.weight > 0, sets.c.reps > 0)
+        .group_by(sets.c.exercise_id, WorkoutSession.date)
+    )
+    for exercise_id, session_date, volume in rows:
+        key = (exercise_id, month_bounds(session_date)[0])
+        totals[key] = totals.get(key, 0.0) + (volume or 0.0)
+
+    db.session.add_all(
+        ExerciseMonthlyVolume(
+            user_id=user_id, exercise_id=exercise_id, month_start=start, volume=volume
+        )
+        for (exercise_id, start), volume in totals.items()
+        if volume > 0
+    )
+    return len(totals)
+
+
+def leaderboard(exercise_id, metric="max_weight", level=None, gender=None, limit=10):
+    """Top `limit` users for an exercise, optionally filtered by level/gender"""
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    if metric == "max_weight":
+        source = PersonalRecord
+        columns = (
+            PersonalRecord.max_weight,
+            PersonalRecord.max_weight_reps,
+            PersonalRecord.max_weight_date,
+        )
+        criteria = (PersonalRecord.max_weight.isnot(None),)
+        order = (
+            PersonalRecord.max_weight.desc(),
+            PersonalRecord.max_weight_reps.desc(),
+        )
+    elif metric == "e1rm":
+        source = PersonalRecord
+        columns = (
+            PersonalRecord.best_e1rm,
+            PersonalRecord.best_e1rm_reps,
+            PersonalRecord.best_e1rm_date,
+        )
+        criteria = (PersonalRecord.best_e1rm.isnot(None),)
+        order = (PersonalRecord.best_e1rm.desc(),)
+    else:
+        source = ExerciseMonthlyVolume
+        columns = (
+            ExerciseMonthlyVolume.volume,
+            db.null(),
+            ExerciseMonthlyVolume.month_start,
+        )
+        criteria = (
+            ExerciseMonthlyVolume.month_start == month_bounds(date.today())[0],
+        )
+        order = (ExerciseMonthlyVolume.volume.desc(),)
+
+    query = (
+        db.session.query(User.id, User.username, *columns)
+        .select_from(source)
+        .join(User, User.id == source.user_id)
+        .filter(source.exercise_id == exercise_id, *criteria)
+    )
+    if level:
+        query = query.filter(User.level == level)
+    if gender:
+        query = query.filter(User.gender == gender)
+
+    return [
+        {
+            "rank": rank,
+            "user_id": user_id,
+            "username": username,
+            "value": round(value, 1),
+            "reps": reps,
+            "date": record_date.isoformat() if record_date else None,
+        }
+        for rank, (user_id, username, value, reps, record_date) in enumerate(
+            query.order_by(*order, source.user_id).limit(limit), start=1
+        )
+    ]
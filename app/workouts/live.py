@@ -0,0 +1,152 @@
+"""
+Live active-workout sync.
+
+Routes publish set changes with `pg_notify` inside their transaction, so an
+event only goes out once the change is committed. Events carry ids only; the
+page refetches /workouts/<id>/details (with its ETag) to get the values, which
+keeps every payload far below the 8000 byte NOTIFY limit.
+
+Streams are served by a separate uwsgi instance running gevent (stream.ini),
+to which nginx routes /workouts/<id>/stream, so an open stream is a greenlet
+there instead of a thread of the app workers. Each stream process runs one
+listener with a dedicated LISTEN connection and fans incoming events out to
+its streams through an in-process hub: one queue per open stream, grouped by
+workout session.
+"""
+
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "workout_events"
+
+# Queued events per stream; a client that falls this far behind misses events
+# and resyncs from the page on reconnect
+STREAM_QUEUE_SIZE = 100
+STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+STREAM_MAX_SECONDS = 300  # EventSource reconnects and the page catches up
+NOTIFY_CHUNK = 500  # set ids per notification
+
+
+def publish(workout_session_id, event, data):
+    """Send an event to every stream of a session when the transaction commits"""
+    payload = json.dumps(
+        {"workout_id": workout_session_id, "event": event, "data": data}
+    )
+    db.session.execute(db.select(db.func.pg_notify(CHANNEL, payload)))
+
+
+def publish_sets(workout_session_id, set_ids):
+    """Send the ids of changed sets, a chunk per NOTIFY"""
+    set_ids = list(set_ids)
+    for i in range(0, len(set_ids), NOTIFY_CHUNK):
+        publish(workout_session_id, "sets_updated", set_ids[i : i + NOTIFY_CHUNK])
+
+
+class LiveHub:
+    """In-process fan-out from the listener to open SSE streams"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {}  # workout_session_id -> set of queues
+        self._listener = None
+        self._pid = None
+
+    def subscribe(self, workout_session_id):
+        stream = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._streams.setdefault(workout_session_id, set()).add(stream)
+        return stream
+
+    def unsubscribe(self, workout_session_id, stream):
+        with self._lock:
+            streams = self._streams.get(workout_session_id)
+            if streams is not None:
+                streams.discard(stream)
+                if not streams:
+                    del self._streams[workout_session_id]
+
+    def dispatch(self, workout_session_id, event, data):
+        with self._lock:
+            streams = list(self._streams.get(workout_session_id, ()))
+        for stream in streams:
+            try:
+                stream.put_nowait((event, data))
+            except queue.Full:
+                pass
+
+    def stream(self, workout_session_id):
+        """SSE body for one client; needs no request or app context"""
+        stream = self.subscribe(workout_session_id)
+        try:
+            yield "retry: 3000\n\n"
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event, data = stream.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.unsubscribe(workout_session_id, stream)
+
+    def ensure_listening(self, app):
+        """Start this process's listener (once per process)"""
+        if self._listener_alive():
+            return
+        with self._lock:
+            if self._listener_alive():
+                return
+            self._pid = os.getpid()
+            self._listener = threading.Thread(
+                target=self._listen, args=(app,), name="workout-events", daemon=True
+            )
+            self._listener.start()
+
+    def _listener_alive(self):
+        return (
+            self._listener is not None
+            and self._listener.is_alive()
+            and self._pid == os.getpid()
+        )
+
+    def _listen(self, app):
+        while True:
+            raw = None
+            try:
+                with app.app_context():
+                    # Own connection, outside the pool, for as long as we listen
+                    raw = db.engine.raw_connection()
+                    raw.detach()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        message = json.loads(notify.payload)
+                        self.dispatch(
+                            message["workout_id"], message["event"], message["data"]
+                        )
+            except Exception:
+                logger.exception("Workout event listener failed, reconnecting")
+                if raw is not None:
+                    raw.close()
+                time.sleep(1)
+
+
+hub = LiveHub()
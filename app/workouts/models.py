@@ -1,5 +1,7 @@
 from app.extensions import db
+from collections import namedtuple
 from datetime import date
+from sqlalchemy.dialects.postgresql import ARRAY
 
 
 class WorkoutSession(db.Model):
@@ -16,6 +18,26 @@ class WorkoutSession(db.Model):
     end_time = db.Column(db.DateTime)
     notes = db.Column(db.Text)
     is_completed = db.Column(db.Boolean, default=False, nullable=False)
+    version = db.Column(
+        db.Integer, default=0, server_default="0", nullable=False
+    )  # bumped on every change to the session or its sets
+    # Owner's sync counter at the last change (see sync.py)
+    sync_version = db.Column(
+        db.BigInteger, default=0, server_default="0", nullable=False
+    )
+    # Id the PWA gave a session it started offline
+    client_id = db.Column(db.String(64))
+
+    # Summary frozen at finish time (NULL until the session is completed)
+    summary_volume = db.Column(db.Float)  # working sets, kg
+    summary_sets = db.Column(db.Integer)  # working sets
+    summary_duration = db.Column(db.Integer)  # in minutes
+    summary_muscle_groups = db.Column(db.String(200))  # comma-separated
+
+    # Set when the session's exercises and sets were moved to the archive tables
+    archived_at = db.Column(db.DateTime)
+    # Set when they were packed into packed_workout_exercises
+    packed_at = db.Column(db.DateTime)
 
     # Relationships
     user = db.relationship("User", back_populates="workout_sessions")
@@ -25,8 +47,36 @@ class WorkoutSession(db.Model):
         back_populates="workout_session",
         cascade="all, delete-orphan",
     )
+    archived_exercises = db.relationship(
+        "ArchivedWorkoutExercise",
+        back_populates="workout_session",
+        passive_deletes=True,
+    )
+    packed_exercises = db.relationship(
+        "PackedWorkoutExercise",
+        back_populates="workout_session",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        db.Index("idx_workout_session_user_date", "user_id", "date", "id"),
+        # Completed-session dates only: streak queries are index-only scans
+        db.Index(
+            "idx_workout_session_streak",
+            "user_id",
+            "date",
+            postgresql_where=db.text("is_completed"),
+        ),
+        db.Index("idx_workout_session_sync", "user_id", "sync_version"),
+        db.UniqueConstraint("user_id", "client_id", name="uq_workout_session_client"),
+    )
 
-    __table_args__ = (db.Index("idx_workout_session_user_date", "user_id", "date"),)
+    @property
+    def exercise_entries(self):
+        """Exercises with their sets, wherever the session is stored"""
+        if self.packed_at:
+            return self.packed_exercises
+        return self.archived_exercises if self.archived_at else self.exercises
 
     @property
     def total_duration(self):
@@ -36,6 +86,8 @@ class WorkoutSession(db.Model):
 
     @property
     def total_volume(self):
+        if self.summary_volume is not None:
+            return self.summary_volume
         total = 0
         for exercise in self.exercises:  # type: ignore
             for ex_set in exercise.sets:
@@ -45,6 +97,12 @@ class WorkoutSession(db.Model):
 
     @property
     def muscle_groups(self):
+        if self.summary_muscle_groups is not None:
+            return (
+                self.summary_muscle_groups.split(",")
+                if self.summary_muscle_groups
+                else []
+            )
         groups = set()
         for exercise in self.exercises:  # type: ignore
             if exercise.exercise and exercise.exercise.muscle_group:
@@ -54,6 +112,8 @@ class WorkoutSession(db.Model):
     @property
     def duration(self):
         """Duration in minutes"""
+        if self.summary_duration is not None:
+            return self.summary_duration
         if self.start_time and self.end_time:
             return round((self.end_time - self.start_time).total_seconds() / 60)
         return 0
@@ -61,6 +121,8 @@ class WorkoutSession(db.Model):
     @property
     def total_sets(self):
         """Count total working sets (excluding warmup)"""
+        if self.summary_sets is not None:
+            return self.summary_sets
         total = 0
         for exercise in self.exercises:  # type: ignore
             total += len([s for s in exercise.sets if not s.is_warmup])
@@ -68,31 +130,19 @@ class WorkoutSession(db.Model):
 
     @property
     def new_records(self):
-        """Get personal records set in this workout - placeholder for now"""
-        # TODO: Implement PR tracking logic
-        return []
-
-
-class WorkoutExercise(db.Model):
-    __tablename__ = "workout_exercises"
-
-    id = db.Column(db.Integer, primary_key=True)
-    workout_session_id = db.Column(
-        db.Integer, db.ForeignKey("workout_sessions.id"), nullable=False
-    )
-    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id"), nullable=False)
-    order_in_workout = db.Column(db.Integer, nullable=False)
-    target_sets = db.Column(db.Integer, nullable=False, default=1)
-    notes = db.Column(db.Text)
+        """Personal records currently held by sets of this workout"""
+        return PersonalRecord.query.filter(
+            PersonalRecord.user_id == self.user_id,
+            db.or_(
+                PersonalRecord.max_weight_session_id == self.id,
+                PersonalRecord.best_e1rm_session_id == self.id,
+                PersonalRecord.best_volume_session_id == self.id,
+            ),
+        ).all()
 
-    # Relationships
-    workout_session = db.relationship("WorkoutSession", back_populates="exercises")
-    exercise = db.relationship("Exercise", back_populates="workout_exercises")
-    sets = db.relationship(
-        "ExerciseSet", back_populates="workout_exercise", cascade="all, delete-orphan"
-    )
 
-    __table_args__ = (db.Index("idx_workout_exercise_session", "workout_session_id"),)
+class ExerciseEntryMixin:
+    """Read helpers shared by live and archived workout exercises"""
 
     @property
     def name(self):
@@ -117,9 +167,39 @@ class WorkoutExercise(db.Model):
 
     @property
     def is_pr(self):
-        """Check if this exercise contains a PR - placeholder for now"""
-        # TODO: Implement PR detection logic
-        return False
+        """Check if this exercise holds one of the user's personal records"""
+        record = db.session.get(
+            PersonalRecord, (self.workout_session.user_id, self.exercise_id)
+        )
+        if not record:
+            return False
+        return self.workout_session_id in (
+            record.max_weight_session_id,
+            record.best_e1rm_session_id,
+            record.best_volume_session_id,
+        )
+
+
+class WorkoutExercise(ExerciseEntryMixin, db.Model):
+    __tablename__ = "workout_exercises"
+
+    id = db.Column(db.Integer, primary_key=True)
+    workout_session_id = db.Column(
+        db.Integer, db.ForeignKey("workout_sessions.id"), nullable=False
+    )
+    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id"), nullable=False)
+    order_in_workout = db.Column(db.Integer, nullable=False)
+    target_sets = db.Column(db.Integer, nullable=False, default=1)
+    notes = db.Column(db.Text)
+
+    # Relationships
+    workout_session = db.relationship("WorkoutSession", back_populates="exercises")
+    exercise = db.relationship("Exercise", back_populates="workout_exercises")
+    sets = db.relationship(
+        "ExerciseSet", back_populates="workout_exercise", cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (db.Index("idx_workout_exercise_session", "workout_session_id"),)
 
 
 class ExerciseSet(db.Model):
@@ -148,6 +228,340 @@ class ExerciseSet(db.Model):
     )
 
 
+class ArchivedWorkoutExercise(ExerciseEntryMixin, db.Model):
+    """workout_exercises row of an archived session (same ids and columns)"""
+
+    __tablename__ = "workout_exercises_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    workout_session_id = db.Column(
+        db.Integer,
+        db.ForeignKey("workout_sessions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id"), nullable=False)
+    order_in_workout = db.Column(db.Integer, nullable=False)
+    target_sets = db.Column(db.Integer, nullable=False, default=1)
+    notes = db.Column(db.Text)
+
+    workout_session = db.relationship(
+        "WorkoutSession", back_populates="archived_exercises"
+    )
+    exercise = db.relationship("Exercise")
+    sets = db.relationship(
+        "ArchivedExerciseSet", back_populates="workout_exercise", passive_deletes=True
+    )
+
+    __table_args__ = (
+        db.Index("idx_workout_exercise_archive_session", "workout_session_id"),
+    )
+
+
+class ArchivedExerciseSet(db.Model):
+    """exercise_sets row of an archived session (same ids and columns)"""
+
+    __tablename__ = "exercise_sets_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    workout_exercise_id = db.Column(
+        db.Integer,
+        db.ForeignKey("workout_exercises_archive.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    set_number = db.Column(db.Integer, nullable=False)
+    weight = db.Column(db.Float)
+    reps = db.Column(db.Integer)
+    duration_seconds = db.Column(db.Integer)
+    distance_meters = db.Column(db.Float)
+    rest_seconds = db.Column(db.Integer)
+    is_completed = db.Column(db.Boolean, default=False, nullable=False)
+    rpe = db.Column(db.Integer)
+    notes = db.Column(db.Text)
+    is_warmup = db.Column(db.Boolean, default=False, nullable=False)
+
+    workout_exercise = db.relationship("ArchivedWorkoutExercise", back_populates="sets")
+
+    __table_args__ = (
+        db.Index("idx_exercise_set_archive_workout_exercise", "workout_exercise_id"),
+    )
+
+
+# One set expanded from a PackedWorkoutExercise (same attributes as ExerciseSet)
+PackedSet = namedtuple(
+    "PackedSet",
+    [
+        "id",
+        "workout_exercise_id",
+        "set_number",
+        "weight",
+        "reps",
+        "duration_seconds",
+        "distance_meters",
+        "rest_seconds",
+        "is_completed",
+        "rpe",
+        "notes",
+        "is_warmup",
+    ],
+)
+
+
+class PackedWorkoutExercise(ExerciseEntryMixin, db.Model):
+    """A compacted session's exercise with all of its sets in one row.
+
+    Each array holds one set column; index i across the arrays is one set.
+    """
+
+    __tablename__ = "packed_workout_exercises"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    workout_session_id = db.Column(
+        db.Integer,
+        db.ForeignKey("workout_sessions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id"), nullable=False)
+    order_in_workout = db.Column(db.Integer, nullable=False)
+    target_sets = db.Column(db.Integer, nullable=False, default=1)
+    notes = db.Column(db.Text)
+
+    set_ids = db.Column(ARRAY(db.Integer), nullable=False)
+    set_numbers = db.Column(ARRAY(db.Integer), nullable=False)
+    weights = db.Column(ARRAY(db.Float), nullable=False)
+    reps = db.Column(ARRAY(db.Integer), nullable=False)
+    durations = db.Column(ARRAY(db.Integer), nullable=False)
+    distances = db.Column(ARRAY(db.Float), nullable=False)
+    rests = db.Column(ARRAY(db.Integer), nullable=False)
+    completed = db.Column(ARRAY(db.Boolean), nullable=False)
+    rpes = db.Column(ARRAY(db.Integer), nullable=False)
+    set_notes = db.Column(ARRAY(db.Text), nullable=False)
+    warmups = db.Column(ARRAY(db.Boolean), nullable=False)
+
+    workout_session = db.relationship("WorkoutSession", back_populates="packed_exercises")
+    exercise = db.relationship("Exercise")
+
+    __table_args__ = (
+        db.Index("idx_packed_workout_exercise_session", "workout_session_id"),
+    )
+
+    @property
+    def sets(self):
+        """Sets expanded from the arrays on first access"""
+        expanded = self.__dict__.get("_expanded_sets")
+        if expanded is None:
+            expanded = [
+                PackedSet(set_id, self.id, *values)
+                for set_id, *values in zip(
+                    self.set_ids,
+                    self.set_numbers,
+                    self.weights,
+                    self.reps,
+                    self.durations,
+                    self.distances,
+                    self.rests,
+                    self.completed,
+                    self.rpes,
+                    self.set_notes,
+                    self.warmups,
+                )
+            ]
+            self.__dict__["_expanded_sets"] = expanded
+        return expanded
+
+
+class PendingSetUpdate(db.Model):
+    """Latest queued autosave for a set, waiting to be applied in a batch"""
+
+    __tablename__ = "pending_set_updates"
+
+    set_id = db.Column(
+        db.Integer,
+        db.ForeignKey("exercise_sets.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    workout_session_id = db.Column(
+        db.Integer,
+        db.ForeignKey("workout_sessions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    weight = db.Column(db.Float)
+    reps = db.Column(db.Integer)
+    is_completed = db.Column(db.Boolean, default=False, nullable=False)
+    rpe = db.Column(db.Integer)
+    notes = db.Column(db.Text)
+    received_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index("idx_pending_set_update_session", "workout_session_id"),
+        db.Index("idx_pending_set_update_received", "received_at"),
+    )
+
+
+class DeletedWorkoutSession(db.Model):
+    """Tombstone of a cancelled session, so offline clients drop their copy"""
+
+    __tablename__ = "deleted_workout_sessions"
+
+    workout_session_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    client_id = db.Column(db.String(64))
+    sync_version = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index("idx_deleted_workout_session_sync", "user_id", "sync_version"),
+    )
+
+
+class UserWorkoutStats(db.Model):
+    """Per-user rollup of completed workouts, maintained incrementally"""
+
+    __tablename__ = "user_workout_stats"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    total_workouts = db.Column(db.Integer, default=0, nullable=False)
+    current_streak = db.Column(
+        db.Integer, default=0, nullable=False
+    )  # consecutive days ending at last_workout_date
+    longest_streak = db.Column(
+        db.Integer, default=0, server_default="0", nullable=False
+    )  # longest run of consecutive workout days ever
+    last_workout_date = db.Column(db.Date)
+    total_volume = db.Column(db.Float, default=0.0, nullable=False)  # working sets, kg
+    duration_sum = db.Column(db.Float, default=0.0, nullable=False)  # in minutes
+    duration_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Relationships
+    user = db.relationship("User", back_populates="workout_stats")
+
+
+class TrainingRollup(db.Model):
+    """Completed-workout totals per user and calendar week/month.
+
+    Updated in the same transaction as finish_workout, and recomputed for the
+    affected periods when a completed session is edited or removed.
+    """
+
+    __tablename__ = "training_rollups"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    period = db.Column(db.String(10), primary_key=True)  # "week" or "month"
+    period_start = db.Column(db.Date, primary_key=True)  # Monday / 1st of month
+    session_count = db.Column(db.Integer, default=0, nullable=False)
+    working_sets = db.Column(db.Integer, default=0, nullable=False)
+    total_volume = db.Column(db.Float, default=0.0, nullable=False)  # kg
+    duration = db.Column(db.Float, default=0.0, nullable=False)  # in minutes
+    muscle_group_volume = db.Column(db.JSON)  # {"legs": 5400.0, ...}
+
+    # Relationships
+    user = db.relationship("User", back_populates="training_rollups")
+
+
+class PersonalRecord(db.Model):
+    """Best lifts per user and exercise, maintained as sets are completed.
+
+    Set/session ids are plain references (no FK) so records survive until
+    they are recomputed when the holding set or session goes away.
+    """
+
+    __tablename__ = "personal_records"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    exercise_id = db.Column(
+        db.Integer, db.ForeignKey("exercises.id"), primary_key=True
+    )
+
+    # Heaviest completed working set
+    max_weight = db.Column(db.Float)
+    max_weight_reps = db.Column(db.Integer)
+    max_weight_set_id = db.Column(db.Integer)
+    max_weight_session_id = db.Column(db.Integer)
+    max_weight_date = db.Column(db.Date)
+
+    # Best estimated one-rep max (Epley)
+    best_e1rm = db.Column(db.Float)
+    best_e1rm_weight = db.Column(db.Float)
+    best_e1rm_reps = db.Column(db.Integer)
+    best_e1rm_set_id = db.Column(db.Integer)
+    best_e1rm_session_id = db.Column(db.Integer)
+    best_e1rm_date = db.Column(db.Date)
+
+    # Best working volume for this exercise in a single finished session
+    best_volume = db.Column(db.Float)
+    best_volume_session_id = db.Column(db.Integer)
+    best_volume_date = db.Column(db.Date)
+
+    # Relationships
+    user = db.relationship("User", back_populates="personal_records")
+    exercise = db.relationship("Exercise")
+
+    # Leaderboards read these in order with LIMIT N (same order as the query)
+    __table_args__ = (
+        db.Index(
+            "idx_personal_record_max_weight",
+            exercise_id,
+            max_weight.desc(),
+            max_weight_reps.desc(),
+            user_id,
+        ),
+        db.Index(
+            "idx_personal_record_e1rm", exercise_id, best_e1rm.desc(), user_id
+        ),
+    )
+
+
+class RepRecord(db.Model):
+    """Most reps completed at a given weight, per user and exercise"""
+
+    __tablename__ = "rep_records"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id"), nullable=False)
+    weight = db.Column(db.Float, nullable=False)
+    reps = db.Column(db.Integer, nullable=False)
+    set_id = db.Column(db.Integer)
+    workout_session_id = db.Column(db.Integer)
+    date = db.Column(db.Date)
+
+    # Relationships
+    user = db.relationship("User", back_populates="rep_records")
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "exercise_id", "weight", name="uq_rep_record_user_ex_weight"
+        ),
+    )
+
+
+class ExerciseMonthlyVolume(db.Model):
+    """Completed working-set volume per user, exercise and calendar month"""
+
+    __tablename__ = "exercise_monthly_volumes"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    exercise_id = db.Column(
+        db.Integer, db.ForeignKey("exercises.id"), primary_key=True
+    )
+    month_start = db.Column(db.Date, primary_key=True)
+    volume = db.Column(db.Float, default=0.0, nullable=False)  # kg
+
+    # Relationships
+    user = db.relationship("User", back_populates="monthly_volumes")
+
+    __table_args__ = (
+        db.Index(
+            "idx_exercise_monthly_volume_board",
+            exercise_id,
+            month_start,
+            volume.desc(),
+            user_id,
+        ),
+    )
+
+
 class WorkoutPlan(db.Model):
     """User's personal workout plan"""
 
@@ -164,6 +578,9 @@ class WorkoutPlan(db.Model):
     created_at = db.Column(
         db.DateTime, default=db.func.current_timestamp(), nullable=False
     )
+    version = db.Column(
+        db.Integer, default=0, server_default="0", nullable=False
+    )  # bumped whenever the plan's days or exercises are edited
 
     # Relationships
     user = db.relationship("User", back_populates="workout_plans")
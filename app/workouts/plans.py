@@ -0,0 +1,190 @@
+"""
+Compiled read model for workout plans.
+
+Plans are read on every dashboard visit and workout start but only change in
+edit_plan, so each worker keeps an immutable snapshot per plan (days, their
+exercises and the exercise details, plus the serialized JSON payload). A read
+costs one primary-key lookup of the plan's `version`; the snapshot is rebuilt
+with a single joined query only after the plan has been edited.
+"""
+
+import json
+from collections import namedtuple
+
+from app.cache import VersionedCache
+from app.extensions import db
+from app.exercises.models import Exercise
+from .models import WorkoutPlan, WorkoutPlanDay, WorkoutPlanExercise
+
+PlanExerciseInfo = namedtuple(
+    "PlanExerciseInfo", ["id", "name", "muscle_group", "description"]
+)
+PlanExerciseSnapshot = namedtuple(
+    "PlanExerciseSnapshot",
+    [
+        "id",
+        "exercise_id",
+        "order_in_workout",
+        "target_sets",
+        "target_reps_min",
+        "target_reps_max",
+        "warmup_sets",
+        "exercise",
+    ],
+)
+PlanDaySnapshot = namedtuple(
+    "PlanDaySnapshot",
+    ["id", "workout_plan_id", "day_number", "name", "is_optional", "exercises"],
+)
+
+
+class PlanSnapshot:
+    """Immutable view of a plan, shaped like the ORM objects for templates"""
+
+    def __init__(self, plan_id, user_id, name, level, version, plan_days):
+        self.id = plan_id
+        self.user_id = user_id
+        self.name = name
+        self.level = level
+        self.version = version
+        self.plan_days = tuple(plan_days)
+        self.days_by_id = {day.id: day for day in self.plan_days}
+
+        self.as_json = json.dumps(
+            {
+                "id": self.id,
+                "name": self.name,
+                "level": self.level,
+                "version": self.version,
+                "days": [
+                    {
+                        "id": day.id,
+                        "day_number": day.day_number,
+                        "name": day.name,
+                        "is_optional": day.is_optional,
+                        "exercises": [
+                            {
+                                "id": ex.id,
+                                "exercise_id": ex.exercise_id,
+                                "exercise_name": ex.exercise.name,
+                                "muscle_group": ex.exercise.muscle_group,
+                                "order": ex.order_in_workout,
+                                "target_sets": ex.target_sets,
+                                "target_reps_min": ex.target_reps_min,
+                                "target_reps_max": ex.target_reps_max,
+                                "warmup_sets": ex.warmup_sets,
+                            }
+                            for ex in day.exercises
+                        ],
+                    }
+                    for day in self.plan_days
+                ],
+            }
+        ).encode()
+
+
+_cache = VersionedCache(maxsize=1024)
+
+
+def build_plan_snapshot(plan_id):
+    """Load a plan with its days and exercises in one query"""
+    rows = (
+        db.session.query(
+            WorkoutPlan.user_id,
+            WorkoutPlan.name,
+            WorkoutPlan.level,
+            WorkoutPlan.version,
+            WorkoutPlanDay.id,
+            WorkoutPlanDay.day_number,
+            WorkoutPlanDay.name,
+            WorkoutPlanDay.is_optional,
+            WorkoutPlanExercise.id,
+            WorkoutPlanExercise.exercise_id,
+            WorkoutPlanExercise.order_in_workout,
+            WorkoutPlanExercise.target_sets,
+            WorkoutPlanExercise.target_reps_min,
+            WorkoutPlanExercise.target_reps_max,
+            WorkoutPlanExercise.warmup_sets,
+            Exercise.name,
+            Exercise.muscle_group,
+            Exercise.description,
+        )
+        .outerjoin(WorkoutPlanDay, WorkoutPlanDay.workout_plan_id == WorkoutPlan.id)
+        .outerjoin(
+            WorkoutPlanExercise, WorkoutPlanExercise.plan_day_id == WorkoutPlanDay.id
+        )
+        .outerjoin(Exercise, Exercise.id == WorkoutPlanExercise.exercise_id)
+        .filter(WorkoutPlan.id == plan_id)
+        .order_by(WorkoutPlanDay.day_number, WorkoutPlanExercise.order_in_workout)
+        .all()
+    )
+    if not rows:
+        return None
+
+    user_id, name, level, version = rows[0][:4]
+    days = {}
+    for row in rows:
+        day_id = row[4]
+        if day_id is None:
+            continue
+        day = days.setdefault(day_id, (row[5], row[6], row[7], []))
+        if row[8] is not None:
+            day[3].append(
+                PlanExerciseSnapshot(
+                    *row[8:15], PlanExerciseInfo(row[9], *row[15:18])
+                )
+            )
+
+    return PlanSnapshot(
+        plan_id,
+        user_id,
+        name,
+        level,
+        version,
+        (
+            PlanDaySnapshot(
+                day_id, plan_id, day_number, day_name, is_optional, tuple(exercises)
+            )
+            for day_id, (day_number, day_name, is_optional, exercises) in days.items()
+        ),
+    )
+
+
+def _snapshot(plan_id, version):
+    snapshot = _cache.get(plan_id, version)
+    if snapshot is None:
+        snapshot = build_plan_snapshot(plan_id)
+        if snapshot is not None:
+            _cache.put(plan_id, snapshot.version, snapshot)
+    return snapshot
+
+
+def get_plan_snapshot(plan_id):
+    """Current snapshot of a plan, or None if it does not exist"""
+    version = db.session.scalar(
+        db.select(WorkoutPlan.version).where(WorkoutPlan.id == plan_id)
+    )
+    if version is None:
+        return None
+    return _snapshot(plan_id, version)
+
+
+def get_plan_day_snapshot(plan_day_id):
+    """(plan snapshot, day snapshot) for a plan day, or (None, None)"""
+    row = db.session.execute(
+        db.select(WorkoutPlanDay.workout_plan_id, WorkoutPlan.version)
+        .join(WorkoutPlan, WorkoutPlan.id == WorkoutPlanDay.workout_plan_id)
+        .where(WorkoutPlanDay.id == plan_day_id)
+    ).first()
+    if row is None:
+        return None, None
+    plan = _snapshot(*row)
+    if plan is None:
+        return None, None
+    return plan, plan.days_by_id.get(plan_day_id)
+
+
+def bump_plan_version(plan):
+    """Mark a plan as edited for every worker (atomic, applied at flush)"""
+    plan.version = WorkoutPlan.version + 1
+    _cache.invalidate(plan.id)
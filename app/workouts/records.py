@@ -0,0 +1,373 @@
+"""
+Personal-record index.
+
+`PersonalRecord` holds the heaviest set, best estimated 1RM and best session
+volume per (user, exercise); `RepRecord` holds the most reps per weight. Routes
+feed completed sets in as they are saved, so checking a set is a primary-key
+lookup instead of a scan over the user's exercise_sets history. When the set or
+session holding a record is edited down, deleted or cancelled, only that
+exercise is recomputed.
+"""
+
+from app.extensions import db
+from .models import (
+    WorkoutSession,
+    WorkoutExercise,
+    ExerciseSet,
+    PersonalRecord,
+    RepRecord,
+)
+from .sources import stored_sets
+
+
+def estimated_1rm(weight, reps):
+    """Epley estimate of the one-rep max"""
+    if reps == 1:
+        return weight
+    return weight * (1 + reps / 30)
+
+
+def _qualifies(entry):
+    return (
+        entry["is_completed"]
+        and not entry["is_warmup"]
+        and entry["weight"]
+        and entry["reps"]
+        and entry["weight"] > 0
+        and entry["reps"] > 0
+    )
+
+
+def _new_record(user_id, exercise_id):
+    record = PersonalRecord(user_id=user_id, exercise_id=exercise_id)
+    db.session.add(record)
+    return record
+
+
+def _holder_got_worse(record, entry):
+    """True if `entry` holds a record on `record` and no longer deserves it"""
+    if entry["id"] == record.max_weight_set_id and (
+        not _qualifies(entry)
+        or entry["weight"] < record.max_weight
+        or (
+            entry["weight"] == record.max_weight
+            and entry["reps"] < record.max_weight_reps
+        )
+    ):
+        return True
+    if entry["id"] == record.best_e1rm_set_id and (
+        not _qualifies(entry)
+        or estimated_1rm(entry["weight"], entry["reps"]) < record.best_e1rm
+    ):
+        return True
+    return False
+
+
+def _improve(record, entry, session_id, session_date):
+    """Raise max weight / e1RM on `record` if `entry` beats them"""
+    weight, reps = entry["weight"], entry["reps"]
+
+    if (
+        record.max_weight is None
+        or weight > record.max_weight
+        or (weight == record.max_weight and reps > (record.max_weight_reps or 0))
+    ):
+        record.max_weight = weight
+        record.max_weight_reps = reps
+        record.max_weight_set_id = entry["id"]
+        record.max_weight_session_id = session_id
+        record.max_weight_date = session_date
+
+    e1rm = estimated_1rm(weight, reps)
+    if record.best_e1rm is None or e1rm > record.best_e1rm:
+        record.best_e1rm = e1rm
+        record.best_e1rm_weight = weight
+        record.best_e1rm_reps = reps
+        record.best_e1rm_set_id = entry["id"]
+        record.best_e1rm_session_id = session_id
+        record.best_e1rm_date = session_date
+
+
+def apply_set_changes(workout, entries):
+    """Update records for sets of `workout` that were just saved.
+
+    `entries` are dicts with id, exercise_id, weight, reps, is_warmup and
+    is_completed holding the new values. Records for all touched exercises are
+    loaded with two queries; exercises whose record holder got worse are
+    recomputed.
+    """
+    if not entries:
+        return
+
+    user_id = workout.user_id
+    exercise_ids = {e["exercise_id"] for e in entries}
+
+    records = {
+        r.exercise_id: r
+        for r in PersonalRecord.query.filter(
+            PersonalRecord.user_id == user_id,
+            PersonalRecord.exercise_id.in_(exercise_ids),
+        )
+    }
+    rep_records = {
+        (r.exercise_id, r.weight): r
+        for r in RepRecord.query.filter(
+            RepRecord.user_id == user_id, RepRecord.exercise_id.in_(exercise_ids)
+        )
+    }
+    rep_holders = {r.set_id: r for r in rep_records.values()}
+
+    stale = set()
+    for entry in entries:
+        exercise_id = entry["exercise_id"]
+        record = records.get(exercise_id)
+
+        # A record holder was edited down: recompute instead of guessing
+        if record and _holder_got_worse(record, entry):
+            stale.add(exercise_id)
+            continue
+        held = rep_holders.get(entry["id"])
+        if held and (
+            not _qualifies(entry)
+            or held.weight != entry["weight"]
+            or entry["reps"] < held.reps
+        ):
+            stale.add(exercise_id)
+            continue
+
+        if not _qualifies(entry):
+            continue
+
+        if record is None:
+            record = records[exercise_id] = _new_record(user_id, exercise_id)
+        _improve(record, entry, workout.id, workout.date)
+
+        key = (exercise_id, entry["weight"])
+        rep_record = rep_records.get(key)
+        if rep_record is None:
+            rep_record = rep_records[key] = RepRecord(
+                user_id=user_id, exercise_id=exercise_id, weight=entry["weight"]
+            )
+            db.session.add(rep_record)
+        if rep_record.reps is None or entry["reps"] > rep_record.reps:
+            rep_record.reps = entry["reps"]
+            rep_record.set_id = entry["id"]
+            rep_record.workout_session_id = workout.id
+            rep_record.date = workout.date
+
+    for exercise_id in stale:
+        rebuild_personal_records(user_id, exercise_id)
+
+
+def set_entry(exercise_set, exercise_id=None):
+    """Build an apply_set_changes entry from an ExerciseSet"""
+    return {
+        "id": exercise_set.id,
+        "exercise_id": exercise_id or exercise_set.workout_exercise.exercise_id,
+        "weight": exercise_set.weight,
+        "reps": exercise_set.reps,
+        "is_warmup": exercise_set.is_warmup,
+        "is_completed": exercise_set.is_completed,
+    }
+
+
+def forget_set(user_id, exercise_id, set_id):
+    """Recompute an exercise's records if a deleted set was holding one"""
+    record = db.session.get(PersonalRecord, (user_id, exercise_id))
+    holds = record is not None and set_id in (
+        record.max_weight_set_id,
+        record.best_e1rm_set_id,
+    )
+    if not holds:
+        holds = (
+            RepRecord.query.filter_by(
+                user_id=user_id, exercise_id=exercise_id, set_id=set_id
+            ).first()
+            is not None
+        )
+    if holds:
+        db.session.flush()
+        rebuild_personal_records(user_id, exercise_id)
+
+
+def record_session_volumes(workout):
+    """Compare each exercise's volume in a finished session to the best one"""
+    volumes = dict(
+        db.session.query(
+            WorkoutExercise.exercise_id,
+            db.func.sum(ExerciseSet.weight * ExerciseSet.reps),
+        )
+        .join(ExerciseSet, ExerciseSet.workout_exercise_id == WorkoutExercise.id)
+        .filter(WorkoutExercise.workout_session_id == workout.id)
+        .filter(ExerciseSet.is_warmup == False)
+        .filter(ExerciseSet.is_completed == True)
+        .group_by(WorkoutExercise.exercise_id)
+        .all()
+    )
+    if not volumes:
+        return
+
+    records = {
+        r.exercise_id: r
+        for r in PersonalRecord.query.filter(
+            PersonalRecord.user_id == workout.user_id,
+            PersonalRecord.exercise_id.in_(list(volumes)),
+        )
+    }
+
+    for exercise_id, volume in volumes.items():
+        volume = volume or 0
+        record = records.get(exercise_id)
+        if record and record.best_volume_session_id == workout.id:
+            if volume < (record.best_volume or 0):
+                rebuild_personal_records(workout.user_id, exercise_id)
+                continue
+        elif volume <= 0 or (record and volume <= (record.best_volume or 0)):
+            continue
+
+        if record is None:
+            record = _new_record(workout.user_id, exercise_id)
+        record.best_volume = volume
+        record.best_volume_session_id = workout.id
+        record.best_volume_date = workout.date
+
+
+def forget_session(workout):
+    """Recompute records held by a session that is about to be deleted"""
+    exercise_ids = {
+        r.exercise_id
+        for r in PersonalRecord.query.filter(
+            PersonalRecord.user_id == workout.user_id,
+            db.or_(
+                PersonalRecord.max_weight_session_id == workout.id,
+                PersonalRecord.best_e1rm_session_id == workout.id,
+                PersonalRecord.best_volume_session_id == workout.id,
+            ),
+        )
+    }
+    exercise_ids.update(
+        exercise_id
+        for (exercise_id,) in db.session.query(RepRecord.exercise_id).filter_by(
+            user_id=workout.user_id, workout_session_id=workout.id
+        )
+    )
+    for exercise_id in exercise_ids:
+        rebuild_personal_records(
+            workout.user_id, exercise_id, exclude_session_id=workout.id
+        )
+
+
+def rebuild_personal_records(user_id, exercise_id=None, exclude_session_id=None):
+    """Recompute records from the user's completed sets (caller commits).
+
+    Scans one exercise (or all of them), in every storage tier - used for
+    backfills and for the rare case where a record holder was lowered or
+    removed.
+    """
+    stored = stored_sets()
+    sets = (
+        db.session.query(
+            stored.c.id,
+            stored.c.exercise_id,
+            stored.c.weight,
+            stored.c.reps,
+            WorkoutSession.id,
+            WorkoutSession.date,
+        )
+        .select_from(stored)
+        .join(WorkoutSession, stored.c.workout_session_id == WorkoutSession.id)
+        .filter(WorkoutSession.user_id == user_id)
+        .filter(stored.c.is_completed == True)
+        .filter(stored.c.is_warmup == False)
+        .filter(stored.c.weight > 0, stored.c.reps > 0)
+    )
+    volumes = (
+        db.session.query(
+            stored.c.exercise_id,
+            WorkoutSession.id,
+            WorkoutSession.date,
+            db.func.sum(stored.c.weight * stored.c.reps),
+        )
+        .select_from(stored)
+        .join(WorkoutSession, stored.c.workout_session_id == WorkoutSession.id)
+        .filter(WorkoutSession.user_id == user_id)
+        .filter(WorkoutSession.is_completed == True)
+        .filter(stored.c.is_completed == True)
+        .filter(stored.c.is_warmup == False)
+        .group_by(stored.c.exercise_id, WorkoutSession.id, WorkoutSession.date)
+    )
+    old_records = PersonalRecord.query.filter_by(user_id=user_id)
+    old_rep_records = RepRecord.query.filter_by(user_id=user_id)
+
+    if exercise_id is not None:
+        sets = sets.filter(stored.c.exercise_id == exercise_id)
+        volumes = volumes.filter(stored.c.exercise_id == exercise_id)
+        old_records = old_records.filter_by(exercise_id=exercise_id)
+        old_rep_records = old_rep_records.filter_by(exercise_id=exercise_id)
+    if exclude_session_id is not None:
+        sets = sets.filter(WorkoutSession.id != exclude_session_id)
+        volumes = volumes.filter(WorkoutSession.id != exclude_session_id)
+
+    old_records.delete(synchronize_session="fetch")
+    old_rep_records.delete(synchronize_session="fetch")
+
+    records = {}
+    rep_records = {}
+    for set_id, ex_id, weight, reps, session_id, session_date in sets.yield_per(1000):
+        entry = {"id": set_id, "weight": weight, "reps": reps}
+
+        record = records.get(ex_id)
+        if record is None:
+            record = records[ex_id] = PersonalRecord(user_id=user_id, exercise_id=ex_id)
+        _improve(record, entry, session_id, session_date)
+
+        rep_record = rep_records.get((ex_id, weight))
+        if rep_record is None or reps > rep_record.reps:
+            rep_records[(ex_id, weight)] = RepRecord(
+                user_id=user_id,
+                exercise_id=ex_id,
+                weight=weight,
+                reps=reps,
+                set_id=set_id,
+                workout_session_id=session_id,
+                date=session_date,
+            )
+
+    for ex_id, session_id, session_date, volume in volumes:
+        if not volume or volume <= 0:
+            continue
+        record = records.get(ex_id)
+        if record is None:
+            record = records[ex_id] = PersonalRecord(user_id=user_id, exercise_id=ex_id)
+        if record.best_volume is None or volume > record.best_volume:
+            record.best_volume = volume
+            record.best_volume_session_id = session_id
+            record.best_volume_date = session_date
+
+    db.session.add_all(records.values())
+    db.session.add_all(rep_records.values())
+
+
+def recent_records(user_id, limit=5):
+    """Latest heaviest-set records for the history page, one query"""
+    from app.exercises.models import Exercise
+
+    rows = (
+        db.session.query(
+            Exercise.name,
+            PersonalRecord.max_weight,
+            PersonalRecord.max_weight_reps,
+            PersonalRecord.max_weight_date,
+        )
+        .join(Exercise, Exercise.id == PersonalRecord.exercise_id)
+        .filter(PersonalRecord.user_id == user_id)
+        .filter(PersonalRecord.max_weight.isnot(None))
+        .order_by(
+            PersonalRecord.max_weight_date.desc(), PersonalRecord.max_weight.desc()
+        )
+        .limit(limit)
+    )
+    return [
+        {"exercise_name": name, "weight": weight, "reps": reps, "date": record_date}
+        for name, weight, reps, record_date in rows
+    ]
@@ -0,0 +1,273 @@
+"""
+Weekly and monthly training rollups.
+
+`TrainingRollup` keeps session count, working sets, volume, duration and
+per-muscle-group volume per (user, period, period_start). finish_workout folds
+the new session in; edits to a completed session recompute just the week and
+month it falls in. Range aggregates then read a few dozen rollup rows instead
+of joining exercise_sets -> workout_exercises -> workout_sessions.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.extensions import db
+from app.exercises.models import Exercise
+from .models import WorkoutSession, TrainingRollup
+from .sources import stored_sets
+
+PERIODS = ("week", "month")
+UNKNOWN_GROUP = "other"
+
+# Key-wise sum of the stored and the incoming muscle group volumes
+_MERGED_GROUPS = db.literal_column(
+    """coalesce((
+        SELECT json_object_agg(key, volume) FROM (
+            SELECT key, sum(value::float) AS volume FROM (
+                SELECT * FROM json_each_text(
+                    coalesce(training_rollups.muscle_group_volume, '{}')
+                )
+                UNION ALL
+                SELECT * FROM json_each_text(excluded.muscle_group_volume)
+            ) AS both_groups
+            GROUP BY key
+        ) AS merged
+    ), '{}')"""
+)
+
+
+def period_start(day, period):
+    """Monday of the week / first day of the month containing `day`"""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def period_end(start, period):
+    """First day after the period beginning at `start`"""
+    if period == "week":
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _contributions(user_id, *criteria):
+    """Totals of the user's completed sessions matching `criteria`.
+
+    Two grouped queries: session dates/times, then set counts and volume per
+    session and muscle group. Returns {session_id: dict}.
+    """
+    filters = (
+        WorkoutSession.user_id == user_id,
+        WorkoutSession.is_completed == True,
+        *criteria,
+    )
+
+    contributions = {}
+    for session_id, session_date, start_time, end_time in db.session.query(
+        WorkoutSession.id,
+        WorkoutSession.date,
+        WorkoutSession.start_time,
+        WorkoutSession.end_time,
+    ).filter(*filters):
+        minutes = (
+            (end_time - start_time).total_seconds() / 60
+            if start_time and end_time
+            else 0.0
+        )
+        contributions[session_id] = {
+            "date": session_date,
+            "sets": 0,
+            "volume": 0.0,
+            "duration": minutes,
+            "groups": defaultdict(float),
+        }
+    if not contributions:
+        return contributions
+
+    # Sets of archived and packed sessions too
+    sets = stored_sets()
+    rows = (
+        db.session.query(
+            sets.c.workout_session_id,
+            Exercise.muscle_group,
+            db.func.count(sets.c.id),
+            db.func.sum(sets.c.weight * sets.c.reps),
+        )
+        .select_from(sets)
+        .join(WorkoutSession, sets.c.workout_session_id == WorkoutSession.id)
+        .join(Exercise, Exercise.id == sets.c.exercise_id)
+        .filter(*filters)
+        .filter(sets.c.is_warmup == False)
+        .group_by(sets.c.workout_session_id, Exercise.muscle_group)
+    )
+    for session_id, muscle_group, sets, volume in rows:
+        contribution = contributions[session_id]
+        contribution["sets"] += sets
+        if volume:
+            contribution["volume"] += volume
+            contribution["groups"][muscle_group or UNKNOWN_GROUP] += volume
+
+    return contributions
+
+
+def _fold(contributions):
+    """Sum session contributions into {(period, period_start): totals}"""
+    totals = {}
+    for contribution in contributions.values():
+        for period in PERIODS:
+            key = (period, period_start(contribution["date"], period))
+            total = totals.setdefault(
+                key,
+                {
+                    "sessions": 0,
+                    "sets": 0,
+                    "volume": 0.0,
+                    "duration": 0.0,
+                    "groups": defaultdict(float),
+                },
+            )
+            total["sessions"] += 1
+            total["sets"] += contribution["sets"]
+            total["volume"] += contribution["volume"]
+            total["duration"] += contribution["duration"]
+            for group, volume in contribution["groups"].items():
+                total["groups"][group] += volume
+    return totals
+
+
+def _rollup_row(user_id, period, start, total):
+    return {
+        "user_id": user_id,
+        "period": period,
+        "period_start": start,
+        "session_count": total["sessions"],
+        "working_sets": total["sets"],
+        "total_volume": total["volume"],
+        "duration": total["duration"],
+        "muscle_group_volume": dict(total["groups"]),
+    }
+
+
+def _new_rollup(user_id, period, start, total):
+    return TrainingRollup(**_rollup_row(user_id, period, start, total))
+
+
+def _upsert(user_id, totals, add):
+    """Write {(period, period_start): totals} in one INSERT ... ON CONFLICT.
+
+    With `add`, rows that exist get the totals added to theirs (concurrent
+    finishes in one period serialize on the row); otherwise replaced.
+    """
+    if not totals:
+        return
+    stmt = pg_insert(TrainingRollup).values(
+        [
+            _rollup_row(user_id, period, start, total)
+            for (period, start), total in totals.items()
+        ]
+    )
+    counters = ("session_count", "working_sets", "total_volume", "duration")
+    if add:
+        updates = {
+            name: getattr(TrainingRollup, name) + stmt.excluded[name]
+            for name in counters
+        }
+        updates["muscle_group_volume"] = _MERGED_GROUPS
+    else:
+        updates = {
+            name: stmt.excluded[name] for name in counters + ("muscle_group_volume",)
+        }
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[
+                TrainingRollup.user_id,
+                TrainingRollup.period,
+                TrainingRollup.period_start,
+            ],
+            set_=updates,
+        )
+    )
+
+
+def record_finished_rollups(workout):
+    """Fold a just-finished session into its week and month (caller commits)"""
+    db.session.flush()
+    totals = _fold(_contributions(workout.user_id, WorkoutSession.id == workout.id))
+    _upsert(workout.user_id, totals, add=True)
+
+
+def refresh_rollups(user_id, day, exclude_session_id=None):
+    """Recompute the week and month containing `day` (caller commits).
+
+    Used when sets of a completed session change or the session is removed.
+    """
+    db.session.flush()
+    keys = [(period, period_start(day, period)) for period in PERIODS]
+    first = min(start for _, start in keys)
+    last = max(period_end(start, period) for period, start in keys)
+
+    criteria = [WorkoutSession.date >= first, WorkoutSession.date < last]
+    if exclude_session_id is not None:
+        criteria.append(WorkoutSession.id != exclude_session_id)
+    totals = {
+        key: total
+        for key, total in _fold(_contributions(user_id, *criteria)).items()
+        if key in keys
+    }
+
+    _upsert(user_id, totals, add=False)
+    for period, start in keys:
+        if (period, start) not in totals:
+            TrainingRollup.query.filter_by(
+                user_id=user_id, period=period, period_start=start
+            ).delete()
+
+
+def rebuild_user_rollups(user_id):
+    """Recompute all of a user's rollups from their sessions (caller commits)"""
+    TrainingRollup.query.filter_by(user_id=user_id).delete()
+    totals = _fold(_contributions(user_id))
+    db.session.add_all(
+        _new_rollup(user_id, period, start, total)
+        for (period, start), total in totals.items()
+    )
+    return len(totals)
+
+
+def rollup_summary(user_id, period="week", start=None, end=None):
+    """Rollup rows for a period type within [start, end], plus their totals"""
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+
+    query = TrainingRollup.query.filter_by(user_id=user_id, period=period)
+    if start is not None:
+        query = query.filter(TrainingRollup.period_start >= period_start(start, period))
+    if end is not None:
+        query = query.filter(TrainingRollup.period_start <= end)
+
+    rows = []
+    totals = {"sessions": 0, "working_sets": 0, "volume": 0.0, "duration": 0.0}
+    for rollup in query.order_by(TrainingRollup.period_start):
+        rows.append(
+            {
+                "period_start": rollup.period_start.isoformat(),
+                "sessions": rollup.session_count,
+                "working_sets": rollup.working_sets,
+                "volume": round(rollup.total_volume, 1),
+                "duration": round(rollup.duration),
+                "muscle_groups": {
+                    group: round(volume, 1)
+                    for group, volume in (rollup.muscle_group_volume or {}).items()
+                },
+            }
+        )
+        totals["sessions"] += rollup.session_count
+        totals["working_sets"] += rollup.working_sets
+        totals["volume"] += rollup.total_volume
+        totals["duration"] += rollup.duration
+
+    totals["volume"] = round(totals["volume"], 1)
+    totals["duration"] = round(totals["duration"])
+    return {"period": period, "rows": rows, "totals": totals}
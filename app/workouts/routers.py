@@ -1,5 +1,8 @@
 from flask import (
     Blueprint,
+    Response,
+    abort,
+    current_app,
     request,
     jsonify,
     render_template,
@@ -11,21 +14,66 @@ from flask import (
 from app.extensions import db
 from .models import (
     WorkoutSession,
-    WorkoutExercise,
-    ExerciseSet,
     WorkoutPlan,
     WorkoutPlanDay,
     WorkoutPlanExercise,
     WorkoutTemplate,
     TemplateExercise,
+    PendingSetUpdate,
 )
+from .stats import (
+    refresh_session_summary,
+    session_muscle_groups,
+    session_volumes,
+    set_volume,
+    read_user_stats,
+    record_removed_workout,
+    record_volume_change,
+)
+from .records import (
+    apply_set_changes,
+    forget_session,
+    recent_records,
+    record_session_volumes,
+    set_entry,
+)
+from .analytics import volume_series
+from .archive import editable_set, load_exercise_entries, restore_session
+from .autosave import autosave_window, buffer_set_patches
+from .services import (
+    InvalidPatch,
+    apply_set_patches,
+    begin_workout,
+    bump_session_version,
+    clean_set_patch,
+    complete_workout,
+    details_cache,
+    drain_pending,
+    flush_autosaves,
+    record_deleted_session,
+    remove_set,
+    serialize_workout_details,
+    session_set_rows,
+)
+from .importer import detect_format, import_workouts
+from .exercise_logs import (
+    exercise_progress,
+    forget_session_logs,
+    refresh_session_logs,
+)
+from .live import hub, publish, publish_sets
+from .leaderboard import forget_session_volume, leaderboard, refresh_monthly_volume
+from .rollups import refresh_rollups, rollup_summary
+from .plans import bump_plan_version, get_plan_day_snapshot, get_plan_snapshot
+from .sync import MAX_MUTATIONS, apply_mutations, changes_since
 from app.exercises.models import Exercise
+from app.exercises.catalog import get_catalog
 from app.users.models import User
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
+import io
 
 workout_routes = Blueprint("workouts", __name__, url_prefix="/workouts")
 
-
 # ------------------ CREATE PLAN FROM TEMPLATE ------------------
 @workout_routes.route("/create-plan", methods=["GET", "POST"])
 def create_plan():
@@ -55,19 +103,8 @@ def create_plan():
             .all()
         )
 
-        # Get all exercises grouped by muscle group
-        exercises = (
-            Exercise.query.filter_by(is_active=True)
-            .order_by(Exercise.muscle_group, Exercise.name)
-            .all()
-        )
-
-        exercises_by_group = {}
-        for ex in exercises:
-            group = ex.muscle_group
-            if group not in exercises_by_group:
-                exercises_by_group[group] = []
-            exercises_by_group[group].append(ex)
+        # Active exercises grouped by muscle group, from the shared catalog
+        exercises_by_group = get_catalog().by_group
 
         return render_template(
             "workouts/create_plan.html",
@@ -97,62 +134,73 @@ def create_plan():
 
         # Process each training day
         day_count = 3 if user.level == "intermediate" else 2  # beginner has 2 days
+        goal_type = active_goal.goal_type
 
+        day_rows = []
+        day_selections = []
         for day_num in range(1, day_count + 1):
-            day_name = request.form.get(f"day_{day_num}_name", f"Training #{day_num}")
-            is_optional = (
-                day_num == 3 and user.level == "intermediate"
-            )  # Friday is optional
-
-            plan_day = WorkoutPlanDay(
-                workout_plan_id=plan.id,
-                day_number=day_num,
-                name=day_name,
-                is_optional=is_optional,
+            day_rows.append(
+                {
+                    "workout_plan_id": plan.id,
+                    "day_number": day_num,
+                    "name": request.form.get(
+                        f"day_{day_num}_name", f"Training #{day_num}"
+                    ),
+                    "is_optional": day_num == 3
+                    and user.level == "intermediate",  # Friday is optional
+                }
             )
-            db.session.add(plan_day)
-            db.session.flush()
 
-            # Get selected exercises for this day
+            # Selected exercises for this day, numbered in form-key order
             exercise_keys = [
                 k
                 for k in sorted(request.form.keys())
                 if k.startswith(f"day_{day_num}_exercise_") and request.form.get(k)
             ]
+            day_selections.append(
+                [
+                    (i, parse_int(request.form.get(key)))
+                    for i, key in enumerate(exercise_keys, start=1)
+                ]
+            )
 
-            # app/workouts/routers.py
-            for i, key in enumerate(sorted(exercise_keys), start=1):
-                exercise_id = request.form.get(key)
-                if not exercise_id:
-                    continue
+        # All days in one INSERT ... RETURNING
+        day_ids = db.session.scalars(
+            db.insert(WorkoutPlanDay).returning(
+                WorkoutPlanDay.id, sort_by_parameter_order=True
+            ),
+            day_rows,
+        ).all()
+
+        # Resolve every selected exercise with a single IN query
+        muscle_groups = resolve_muscle_groups(
+            exercise_id
+            for selections in day_selections
+            for _, exercise_id in selections
+        )
 
-                # 1️⃣ СНАЧАЛА получаем упражнение
-                exercise = Exercise.query.get(exercise_id)
-                if not exercise:
+        plan_exercise_rows = []
+        for plan_day_id, selections in zip(day_ids, day_selections):
+            for i, exercise_id in selections:
+                if exercise_id not in muscle_groups:
                     continue
-
-                # 2️⃣ ПОТОМ получаем цель юзера
-                active_goal = next((g for g in user.goals if g.is_active), None)
-                goal_type = active_goal.goal_type if active_goal else None
-
-                # 3️⃣ ЗАТЕМ вычисляем параметры
-                target_sets, reps_min, reps_max, warmup_sets = get_plan_params(
-                    user_level=user.level,
-                    goal_type=goal_type,
-                    muscle_group=exercise.muscle_group,
+                target_sets, reps_min, reps_max, warmup_sets = plan_params(
+                    user.level, goal_type, muscle_groups[exercise_id]
                 )
-
-                # 4️⃣ И ТОЛЬКО ПОТОМ создаём plan_exercise
-                plan_exercise = WorkoutPlanExercise(
-                    plan_day_id=plan_day.id,
-                    exercise_id=exercise_id,
-                    order_in_workout=i,
-                    target_sets=target_sets,
-                    target_reps_min=reps_min,
-                    target_reps_max=reps_max,
-                    warmup_sets=warmup_sets,
+                plan_exercise_rows.append(
+                    {
+                        "plan_day_id": plan_day_id,
+                        "exercise_id": exercise_id,
+                        "order_in_workout": i,
+                        "target_sets": target_sets,
+                        "target_reps_min": reps_min,
+                        "target_reps_max": reps_max,
+                        "warmup_sets": warmup_sets,
+                    }
                 )
-                db.session.add(plan_exercise)
+
+        if plan_exercise_rows:
+            db.session.execute(db.insert(WorkoutPlanExercise), plan_exercise_rows)
         db.session.commit()
         flash("Your workout plan has been created!", "success")
         return redirect(url_for("users.dashboard"))
@@ -170,7 +218,10 @@ def view_plan(plan_id):
     if "user_id" not in session:
         return redirect(url_for("users.login"))
 
-    plan = WorkoutPlan.query.get_or_404(plan_id)
+    # Cached snapshot; rebuilt only after the plan has been edited
+    plan = get_plan_snapshot(plan_id)
+    if plan is None:
+        abort(404)
 
     if plan.user_id != session["user_id"]:
         flash("Access denied", "error")
@@ -179,6 +230,26 @@ def view_plan(plan_id):
     return render_template("workouts/view_plan.html", plan=plan)
 
 
+# ------------------ PLAN (API) ------------------
+@workout_routes.route("/plan/<int:plan_id>/json", methods=["GET"])
+def get_plan_json(plan_id):
+    """Plan with days and exercises as JSON, served from the plan snapshot"""
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    plan = get_plan_snapshot(plan_id)
+    if plan is None:
+        abort(404)
+
+    if plan.user_id != session["user_id"]:
+        return jsonify({"error": "Access denied"}), 403
+
+    response = Response(plan.as_json, mimetype="application/json")
+    response.set_etag(f"plan-{plan.id}-{plan.version}")
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
 # ------------------ EDIT PLAN ------------------
 @workout_routes.route("/plan/<int:plan_id>/edit", methods=["GET", "POST"])
 def edit_plan(plan_id):
@@ -206,22 +277,13 @@ def edit_plan(plan_id):
         ).first()
 
         if active_workout:
+            forget_session(active_workout)
             db.session.delete(active_workout)
             db.session.commit()
             flash("Active workout session was removed to allow plan editing.", "info")
 
     if request.method == "GET":
-        exercises = (
-            Exercise.query.filter_by(is_active=True)
-            .order_by(Exercise.muscle_group, Exercise.name)
-            .all()
-        )
-        exercises_by_group = {}
-        for ex in exercises:
-            group = ex.muscle_group
-            if group not in exercises_by_group:
-                exercises_by_group[group] = []
-            exercises_by_group[group].append(ex)
+        exercises_by_group = get_catalog().by_group
 
         return render_template(
             "workouts/edit_plan.html",
@@ -240,34 +302,43 @@ def edit_plan(plan_id):
         )
         goal_type = active_goal.goal_type if active_goal else None
 
-        # Update each day's exercises
-        for day in plan.plan_days:
-            for plan_ex in day.exercises:
-                # Get new exercise ID from form
-                new_exercise_id = request.form.get(f"exercise_{plan_ex.id}")
-                if not new_exercise_id:
-                    continue
-
-                # Update exercise
-                plan_ex.exercise_id = int(new_exercise_id)
-
-                # Get exercise object to check muscle group
-                exercise = Exercise.query.get(int(new_exercise_id))
-                if not exercise:
-                    continue
-
-                # Recalculate parameters based on new exercise
-                target_sets, reps_min, reps_max, warmup_sets = get_plan_params(
-                    user_level=user.level,
-                    goal_type=goal_type,
-                    muscle_group=exercise.muscle_group,
-                )
+        # Current plan rows in one query, new choices from the form
+        plan_exercise_ids = [
+            plan_ex_id
+            for (plan_ex_id,) in db.session.query(WorkoutPlanExercise.id)
+            .join(WorkoutPlanDay, WorkoutPlanExercise.plan_day_id == WorkoutPlanDay.id)
+            .filter(WorkoutPlanDay.workout_plan_id == plan.id)
+        ]
+        choices = {
+            plan_ex_id: parse_int(request.form.get(f"exercise_{plan_ex_id}"))
+            for plan_ex_id in plan_exercise_ids
+        }
+        muscle_groups = resolve_muscle_groups(choices.values())
+
+        # Recalculate parameters based on the new exercises
+        rows = []
+        for plan_ex_id, exercise_id in choices.items():
+            if exercise_id not in muscle_groups:
+                continue
+            target_sets, reps_min, reps_max, warmup_sets = plan_params(
+                user.level, goal_type, muscle_groups[exercise_id]
+            )
+            rows.append(
+                {
+                    "id": plan_ex_id,
+                    "exercise_id": exercise_id,
+                    "target_sets": target_sets,
+                    "target_reps_min": reps_min,
+                    "target_reps_max": reps_max,
+                    "warmup_sets": warmup_sets,
+                }
+            )
 
-                plan_ex.target_sets = target_sets
-                plan_ex.target_reps_min = reps_min
-                plan_ex.target_reps_max = reps_max
-                plan_ex.warmup_sets = warmup_sets
+        if rows:
+            # ORM bulk UPDATE by primary key: one executemany statement
+            db.session.execute(db.update(WorkoutPlanExercise), rows)
 
+        bump_plan_version(plan)
         db.session.commit()
         flash("Plan updated successfully", "success")
         return redirect(url_for("workouts.view_plan", plan_id=plan.id))
@@ -295,55 +366,15 @@ def start_workout(plan_day_id):
             url_for("workouts.active_workout", workout_id=active_workout.id)
         )
 
-    plan_day = WorkoutPlanDay.query.get_or_404(plan_day_id)
+    plan, plan_day = get_plan_day_snapshot(plan_day_id)
+    if plan_day is None:
+        abort(404)
 
-    if plan_day.workout_plan.user_id != session["user_id"]:
+    if plan.user_id != session["user_id"]:
         flash("Access denied", "error")
         return redirect(url_for("users.dashboard"))
 
-    # Create new workout session
-    workout_session = WorkoutSession(
-        user_id=session["user_id"],
-        workout_plan_id=plan_day.workout_plan_id,
-        name=plan_day.name,
-        date=date.today(),
-        start_time=datetime.utcnow(),
-        is_completed=False,
-    )
-    db.session.add(workout_session)
-    db.session.flush()
-
-    # Copy exercises from plan to session
-    for plan_ex in plan_day.exercises:
-        workout_ex = WorkoutExercise(
-            workout_session_id=workout_session.id,
-            exercise_id=plan_ex.exercise_id,
-            order_in_workout=plan_ex.order_in_workout,
-            target_sets=plan_ex.target_sets,
-        )
-        db.session.add(workout_ex)
-        db.session.flush()
-
-        # Create warmup sets
-        for i in range(1, plan_ex.warmup_sets + 1):
-            warmup_set = ExerciseSet(
-                workout_exercise_id=workout_ex.id,
-                set_number=i,
-                is_warmup=True,
-                is_completed=False,
-            )
-            db.session.add(warmup_set)
-
-        # Create working sets
-        for i in range(1, plan_ex.target_sets + 1):
-            working_set = ExerciseSet(
-                workout_exercise_id=workout_ex.id,
-                set_number=plan_ex.warmup_sets + i,
-                is_warmup=False,
-                is_completed=False,
-            )
-            db.session.add(working_set)
-
+    workout_session = begin_workout(session["user_id"], plan, plan_day)
     db.session.commit()
     flash("Workout started!", "success")
     return redirect(url_for("workouts.active_workout", workout_id=workout_session.id))
@@ -362,7 +393,17 @@ def active_workout(workout_id):
         flash("Access denied", "error")
         return redirect(url_for("users.dashboard"))
 
-    return render_template("workouts/active_workout.html", workout=workout)
+    # Show queued autosaves on reload
+    if drain_pending(workout.id):
+        db.session.commit()
+
+    # Archived sessions are shown read-only, straight from their tier
+    return render_template(
+        "workouts/active_workout.html",
+        workout=workout,
+        exercises=load_exercise_entries(workout),
+        read_only=workout.archived_at is not None,
+    )
 
 
 # ------------------ UPDATE SET ------------------
@@ -372,39 +413,142 @@ def update_set(set_id):
     if "user_id" not in session:
         return jsonify({"error": "Unauthorized"}), 401
 
-    exercise_set = ExerciseSet.query.get_or_404(set_id)
+    try:
+        data = clean_set_patch(request.get_json(silent=True))
+    except InvalidPatch as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Sets of archived sessions come back to the hot tables to be edited
+    exercise_set = editable_set(set_id, session["user_id"])
+    if exercise_set is None:
+        abort(404)
 
     # Verify ownership
     if exercise_set.workout_exercise.workout_session.user_id != session["user_id"]:
         return jsonify({"error": "Access denied"}), 403
 
-    data = request.get_json()
-
-    exercise_set.weight = data.get("weight")
-    exercise_set.reps = data.get("reps")
-    exercise_set.is_completed = data.get("is_completed", False)
-    exercise_set.rpe = data.get("rpe")
-    exercise_set.notes = data.get("notes")
+    workout_session = exercise_set.workout_exercise.workout_session
+    if not workout_session.is_completed and autosave_window() > 0:
+        buffer_set_patches(workout_session.id, {set_id: data})
+        publish_sets(workout_session.id, [set_id])
+        db.session.commit()
+        flush_autosaves()
+        return jsonify({"message": "Set queued", "set_id": set_id}), 202
+
+    old_volume = set_volume(exercise_set)
+
+    exercise_set.weight = data["weight"]
+    exercise_set.reps = data["reps"]
+    exercise_set.is_completed = data["is_completed"]
+    exercise_set.rpe = data["rpe"]
+    exercise_set.notes = data["notes"]
+
+    apply_set_changes(workout_session, [set_entry(exercise_set)])
+    bump_session_version(workout_session)
+
+    # Editing a finished workout moves the user's total volume
+    if workout_session.is_completed:
+        refresh_monthly_volume(
+            workout_session.user_id,
+            workout_session.date,
+            [exercise_set.workout_exercise.exercise_id],
+        )
+        record_volume_change(
+            workout_session.user_id, set_volume(exercise_set) - old_volume
+        )
+        refresh_session_summary(workout_session)
+        record_session_volumes(workout_session)
+        refresh_rollups(workout_session.user_id, workout_session.date)
+        refresh_session_logs(workout_session)
 
+    publish_sets(workout_session.id, [set_id])
     db.session.commit()
 
     return jsonify({"message": "Set updated", "set_id": set_id})
 
 
+# ------------------ BULK UPDATE SETS ------------------
+@workout_routes.route("/<int:workout_id>/sets", methods=["POST"])
+def update_sets(workout_id):
+    """Save a batch of set patches from the active workout page.
+
+    Patches to an in-progress workout go through the write-behind queue
+    (see autosave.py) and are answered with 202; edits to a finished workout are
+    applied right away.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    workout = WorkoutSession.query.get_or_404(workout_id)
+
+    # Verify ownership once for the whole batch
+    if workout.user_id != session["user_id"]:
+        return jsonify({"error": "Access denied"}), 403
+
+    data = request.get_json(silent=True)
+    patches = data.get("sets") if isinstance(data, dict) else data
+    if not isinstance(patches, list):
+        return jsonify({"error": "Expected a list of set updates"}), 400
+
+    # Last patch wins when the client sends the same set twice
+    by_id = {}
+    for patch in patches:
+        try:
+            set_id = int(patch["id"])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "Each set update needs an integer id"}), 400
+        try:
+            by_id[set_id] = clean_set_patch(patch)
+        except InvalidPatch as e:
+            return jsonify({"error": f"Set {set_id}: {e}"}), 400
+
+    if not by_id:
+        return jsonify({"message": "Sets updated", "updated": [], "skipped": []})
+
+    # Sets of archived sessions come back to the hot tables to be edited
+    restore_session(workout)
+    # Only sets that belong to this workout may be touched
+    current = session_set_rows(workout.id, by_id)
+    patches = {set_id: patch for set_id, patch in by_id.items() if set_id in current}
+    skipped = [set_id for set_id in by_id if set_id not in current]
+
+    try:
+        # In-progress workouts go through the write-behind queue
+        if not workout.is_completed and autosave_window() > 0:
+            queued = buffer_set_patches(workout.id, patches)
+            publish_sets(workout.id, queued)
+            db.session.commit()
+            flush_autosaves()
+            return (
+                jsonify({"message": "Sets queued", "updated": queued, "skipped": skipped}),
+                202,
+            )
+
+        updated = apply_set_patches(workout, patches, current)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({"message": "Sets updated", "updated": updated, "skipped": skipped})
+
+
 # ------------------- DELETE SET ------------------
 @workout_routes.route("/set/<int:set_id>/delete", methods=["POST"])
 def delete_set(set_id):
     if "user_id" not in session:
         return jsonify({"error": "Unauthorized"}), 401
 
-    exercise_set = ExerciseSet.query.get_or_404(set_id)
+    exercise_set = editable_set(set_id, session["user_id"])
+    if exercise_set is None:
+        abort(404)
 
     # Проверка владельца
     if exercise_set.workout_exercise.workout_session.user_id != session["user_id"]:
         return jsonify({"error": "Access denied"}), 403
 
     try:
-        db.session.delete(exercise_set)
+        remove_set(exercise_set)
         db.session.commit()
         return jsonify({"message": "Set deleted", "set_id": set_id})
     except Exception as e:
@@ -425,8 +569,7 @@ def finish_workout(workout_id):
         flash("Access denied", "error")
         return redirect(url_for("users.dashboard"))
 
-    workout.end_time = datetime.utcnow()
-    workout.is_completed = True
+    complete_workout(workout)
     db.session.commit()
 
     flash("Great work! Workout completed! 💪", "success")
@@ -446,7 +589,18 @@ def cancel_workout(workout_id):
         flash("Access denied", "error")
         return redirect(url_for("users.dashboard"))
 
+    # Derived data is taken out set by set, so the sets must be in the hot tables
+    restore_session(workout)
+    if workout.is_completed:
+        record_removed_workout(workout)
+        refresh_rollups(workout.user_id, workout.date, exclude_session_id=workout.id)
+        forget_session_logs(workout.id)
+    forget_session(workout)
+    forget_session_volume(workout)
+    record_deleted_session(workout)
+
     # Delete the workout session (cascade will delete all exercises and sets)
+    publish(workout.id, "workout_cancelled", {"redirect": url_for("users.dashboard")})
     db.session.delete(workout)
     db.session.commit()
 
@@ -455,50 +609,134 @@ def cancel_workout(workout_id):
 
 
 # ------------------ DASHBOARD (workout history) ------------------
+HISTORY_PAGE_SIZE = 30
+
+
 @workout_routes.route("/history")
 def history():
-    """Show user's workout history"""
+    """Show user's workout history.
+
+    Paginated with a keyset cursor on (date, id) so "Load more" walks the
+    idx_workout_session_user_date (user_id, date, id) index instead of
+    skipping rows with OFFSET. A malformed cursor is a 400.
+    XHR requests get a JSON fragment with the rendered items and next cursor.
+    """
     if "user_id" not in session:
         return redirect(url_for("users.login"))
 
-    from sqlalchemy.orm import joinedload
-    from typing import cast
-    from sqlalchemy.orm.attributes import InstrumentedAttribute
+    try:
+        cursor = parse_history_cursor(request.args.get("cursor"))
+    except ValueError:
+        abort(400, description="Invalid history cursor")
 
-    workouts = (
-        WorkoutSession.query.options(
-            joinedload(
-                cast(InstrumentedAttribute, WorkoutSession.exercises)
-            ).joinedload(cast(InstrumentedAttribute, WorkoutExercise.exercise))
+    # Completed sessions carry their summary columns, no joins needed
+    query = WorkoutSession.query.filter_by(
+        user_id=session["user_id"], is_completed=True
+    )
+
+    if cursor:
+        query = query.filter(
+            db.tuple_(WorkoutSession.date, WorkoutSession.id) < cursor
         )
-        .filter_by(user_id=session["user_id"], is_completed=True)
-        .order_by(WorkoutSession.date.desc())
-        .limit(30)
+
+    # One extra row tells us whether there is another page
+    workouts = (
+        query.order_by(WorkoutSession.date.desc(), WorkoutSession.id.desc())
+        .limit(HISTORY_PAGE_SIZE + 1)
         .all()
     )
 
+    # Для кнопки Load More
+    has_more = len(workouts) > HISTORY_PAGE_SIZE
+    workouts = workouts[:HISTORY_PAGE_SIZE]
+    next_cursor = (
+        f"{workouts[-1].date.isoformat()}_{workouts[-1].id}" if has_more else None
+    )
+
+    # Stored summary volume; sessions finished before it existed are summed
+    # for the whole page in one grouped query instead of lazy-loading sets
+    volumes = session_volumes(w.id for w in workouts if w.summary_volume is None)
+    volumes.update(
+        (w.id, w.summary_volume) for w in workouts if w.summary_volume is not None
+    )
+    # Same for muscle groups, instead of lazy-loading exercises per row
+    muscle_groups = session_muscle_groups(
+        w.id for w in workouts if w.summary_muscle_groups is None
+    )
+    muscle_groups.update(
+        (w.id, w.muscle_groups)
+        for w in workouts
+        if w.summary_muscle_groups is not None
+    )
+
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return jsonify(
+            {
+                "html": render_template(
+                    "workouts/_history_items.html",
+                    workouts=workouts,
+                    volumes=volumes,
+                    muscle_groups=muscle_groups,
+                ),
+                "count": len(workouts),
+                "has_more": has_more,
+                "next_cursor": next_cursor,
+            }
+        )
+
     # Статистика
     stats = get_user_stats(session["user_id"])
 
     # Chart data
     chart_data = {
         "labels": [w.date.strftime("%d.%m") for w in workouts],
-        "values": [w.total_volume for w in workouts],
+        "values": [volumes[w.id] for w in workouts],
     }
 
-    # Личные рекорды (пока пустой список)
-    personal_records = []
-
-    # Для кнопки Load More
-    has_more = len(workouts) == 30
+    # Личные рекорды
+    personal_records = recent_records(session["user_id"])
 
     return render_template(
         "workouts/history.html",
         workouts=workouts,
+        volumes=volumes,
+        muscle_groups=muscle_groups,
         stats=stats,
         chart_data=chart_data,
         personal_records=personal_records,
         has_more=has_more,
+        next_cursor=next_cursor,
+    )
+
+
+# ------------------ LIVE WORKOUT STREAM (SSE) ------------------
+@workout_routes.route("/<int:workout_id>/stream")
+def workout_stream(workout_id):
+    """Server-Sent Events with set changes saved from any device.
+
+    Replaces polling /details on the active workout page: events are
+    published on commit (see live.py) and pushed as they arrive. Served by
+    the gevent stream server (stream.ini), not the app workers.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    owner_id = db.session.scalar(
+        db.select(WorkoutSession.user_id).where(WorkoutSession.id == workout_id)
+    )
+    if owner_id is None:
+        abort(404)
+    if owner_id != session["user_id"]:
+        return jsonify({"error": "Access denied"}), 403
+
+    hub.ensure_listening(current_app._get_current_object())
+    # Don't hold a pooled connection for the life of the stream
+    db.session.close()
+
+    return Response(
+        hub.stream(workout_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -527,46 +765,240 @@ def workout_summary(workout_id):
 # ------------------ GET WORKOUT DETAILS (API) ------------------
 @workout_routes.route("/<int:workout_id>/details", methods=["GET"])
 def get_workout_details(workout_id):
-    """API endpoint for workout details"""
-    workout = WorkoutSession.query.get_or_404(workout_id)
+    """API endpoint for workout details.
+
+    Clients poll this during a session, so the response carries an ETag built
+    from the session's change counter. An unchanged session costs one tiny
+    version lookup: 304 if the client has it, else the cached payload.
+    While autosaves are queued for the session the payload shows them and is
+    built fresh, without an ETag: the version only moves once they apply.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    row = db.session.execute(
+        db.select(
+            WorkoutSession.user_id,
+            WorkoutSession.version,
+            db.select(PendingSetUpdate.set_id)
+            .where(PendingSetUpdate.workout_session_id == WorkoutSession.id)
+            .exists()
+            .label("queued"),
+        ).where(WorkoutSession.id == workout_id)
+    ).first()
+    if row is None:
+        abort(404)
+    # Checked before the ETag, so a 304 never confirms someone else's workout
+    if row.user_id != session["user_id"]:
+        return jsonify({"error": "Access denied"}), 403
+    version = row.version
+
+    if row.queued:
+        response = Response(
+            serialize_workout_details(workout_id, with_queued=True),
+            mimetype="application/json",
+        )
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    etag = f"{workout_id}-{version}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        payload = details_cache.get(workout_id, version)
+        if payload is None:
+            payload = details_cache.put(
+                workout_id, version, serialize_workout_details(workout_id)
+            )
+        response = Response(payload, mimetype="application/json")
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+# ------------------ OFFLINE SYNC (API) ------------------
+@workout_routes.route("/sync", methods=["POST"])
+def sync_workouts():
+    """Apply mutations queued offline and return what changed since `since`.
+
+    Body: {"since": <sync version>, "mutations": [...]}, see sync.py.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    mutations = data.get("mutations", [])
+    if not isinstance(mutations, list) or len(mutations) > MAX_MUTATIONS:
+        return (
+            jsonify({"error": f"mutations must be a list of at most {MAX_MUTATIONS}"}),
+            400,
+        )
+    since = parse_int(data.get("since")) or 0
+
+    try:
+        results = apply_mutations(session["user_id"], mutations)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({"results": results, **changes_since(session["user_id"], since)})
+
+
+# ------------------ VOLUME ANALYTICS (API) ------------------
+@workout_routes.route("/analytics/volume", methods=["GET"])
+def volume_analytics():
+    """Working volume bucketed by day/week/month, optionally per muscle group.
+
+    Query params: bucket (day|week|month, default week),
+    group_by=muscle_group, start and end (YYYY-MM-DD, inclusive).
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    bucket = request.args.get("bucket", "week")
+    by_muscle_group = request.args.get("group_by") == "muscle_group"
+
+    try:
+        start, end = (
+            datetime.strptime(request.args[key], "%Y-%m-%d").date()
+            if request.args.get(key)
+            else None
+            for key in ("start", "end")
+        )
+        series = volume_series(
+            session["user_id"],
+            bucket=bucket,
+            by_muscle_group=by_muscle_group,
+            start=start,
+            end=end,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(series)
+
+
+# ------------------ TRAINING ROLLUPS (API) ------------------
+@workout_routes.route("/analytics/rollups", methods=["GET"])
+def training_rollups():
+    """Weekly or monthly training totals from the rollup table.
+
+    Query params: period (week|month, default week), start and end
+    (YYYY-MM-DD, inclusive; periods overlapping the range are returned).
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        start, end = (
+            datetime.strptime(request.args[key], "%Y-%m-%d").date()
+            if request.args.get(key)
+            else None
+            for key in ("start", "end")
+        )
+        summary = rollup_summary(
+            session["user_id"],
+            period=request.args.get("period", "week"),
+            start=start,
+            end=end,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(summary)
+
+
+# ------------------ LEADERBOARD (API) ------------------
+@workout_routes.route("/leaderboard/<int:exercise_id>", methods=["GET"])
+def exercise_leaderboard(exercise_id):
+    """Best lifts for an exercise across users.
+
+    Query params: metric (max_weight|e1rm|volume, default max_weight; volume
+    is the current month), level, gender, limit (default 10, max 100).
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    metric = request.args.get("metric", "max_weight")
+    try:
+        entries = leaderboard(
+            exercise_id,
+            metric=metric,
+            level=request.args.get("level") or None,
+            gender=request.args.get("gender") or None,
+            limit=request.args.get("limit", 10, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"exercise_id": exercise_id, "metric": metric, "entries": entries})
+
+
+# ------------------ EXERCISE PROGRESS (API) ------------------
+@workout_routes.route("/progress/<int:exercise_id>", methods=["GET"])
+def exercise_progress_api(exercise_id):
+    """Per-day sets, reps, top weight and volume for one exercise.
+
+    Query params: start and end (YYYY-MM-DD, inclusive).
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        start, end = (
+            datetime.strptime(request.args[key], "%Y-%m-%d").date()
+            if request.args.get(key)
+            else None
+            for key in ("start", "end")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify(
         {
-            "id": workout.id,
-            "name": workout.name,
-            "date": workout.date.isoformat() if workout.date else None,
-            "start_time": (
-                workout.start_time.isoformat() if workout.start_time else None
+            "exercise_id": exercise_id,
+            "days": exercise_progress(
+                session["user_id"], exercise_id, start=start, end=end
             ),
-            "end_time": workout.end_time.isoformat() if workout.end_time else None,
-            "is_completed": workout.is_completed,
-            "exercises": [
-                {
-                    "id": ex.id,
-                    "exercise_id": ex.exercise_id,
-                    "exercise_name": ex.exercise.name,
-                    "muscle_group": ex.exercise.muscle_group,
-                    "order": ex.order_in_workout,
-                    "target_sets": ex.target_sets,
-                    "sets": [
-                        {
-                            "id": s.id,
-                            "set_number": s.set_number,
-                            "weight": s.weight,
-                            "reps": s.reps,
-                            "is_completed": s.is_completed,
-                            "is_warmup": s.is_warmup,
-                            "rpe": s.rpe,
-                        }
-                        for s in ex.sets
-                    ],
-                }
-                for ex in workout.exercises
-            ],
         }
     )
 
 
+# ------------------ IMPORT HISTORY ------------------
+@workout_routes.route("/import", methods=["POST"])
+def import_history():
+    """Bulk-import sets exported from another tracker (CSV, JSON or JSON Lines).
+
+    Multipart upload with a `file` field; `format` (csv|json) overrides the
+    file extension. See importer.py for the columns.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    try:
+        fmt = request.form.get("format") or detect_format(upload.filename)
+        # Decode the upload as it is read instead of loading it whole
+        stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+        report = import_workouts(session["user_id"], stream, fmt)
+        db.session.commit()
+    except (ValueError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify(report)
+
+
 # ------------------ FUNCTIONS(extras) ------------------
 def get_plan_params(user_level, goal_type, muscle_group):
     """Determine plan parameters based on user level, goal, and muscle group"""
@@ -603,46 +1035,73 @@ def get_plan_params(user_level, goal_type, muscle_group):
     return target_sets, reps_min, reps_max, warmup_sets
 
 
-def get_user_stats(user_id):
-    # 1. Completed workouts count
-    workouts = WorkoutSession.query.filter_by(user_id=user_id, is_completed=True).all()
-
-    total_workouts = len(workouts)
-
-    # 2. DAY STREAK calculation
-    dates = sorted({w.date for w in workouts}, reverse=True)
-    today = datetime.utcnow().date()
-
-    streak = 0
-    expected_date = today
-
-    for workout_date in dates:
-        if workout_date == expected_date:
-            streak += 1
-            expected_date -= timedelta(days=1)
-        elif workout_date < expected_date:
-            break
-
-    # 3. Total volume
-    total_volume = (
-        db.session.query(db.func.sum(ExerciseSet.weight * ExerciseSet.reps))
-        .join(WorkoutExercise, ExerciseSet.workout_exercise_id == WorkoutExercise.id)
-        .join(WorkoutSession, WorkoutExercise.workout_session_id == WorkoutSession.id)
-        .filter(WorkoutSession.user_id == user_id)
-        .filter(ExerciseSet.is_warmup == False)
-        .scalar()
-        or 0
+# Parameters for every (level, goal, muscle group) combination, computed once
+PLAN_PARAMS = {
+    (level, goal_type, muscle_group): get_plan_params(level, goal_type, muscle_group)
+    for level in ("beginner", "intermediate", "advanced")
+    for goal_type in (
+        None,
+        "weight_loss",
+        "muscle_gain",
+        "strength",
+        "endurance",
+        "flexibility",
+    )
+    for muscle_group in (
+        "chest",
+        "back",
+        "shoulders",
+        "arms",
+        "legs",
+        "core",
+        "calves",
+        "cardio",
     )
+}
 
-    # 4. Avg duration
-    durations = [
-        (w.end_time - w.start_time).seconds / 60 for w in workouts if w.end_time
-    ]
-    avg_duration = round(sum(durations) / len(durations)) if durations else 0
-
-    return {
-        "total_workouts": total_workouts,
-        "current_streak": streak,
-        "total_volume": int(total_volume),
-        "avg_duration": avg_duration,
-    }
+
+def plan_params(user_level, goal_type, muscle_group):
+    """Table lookup for get_plan_params (computes unknown combinations)"""
+    key = (user_level, goal_type, muscle_group)
+    if key not in PLAN_PARAMS:
+        return get_plan_params(user_level, goal_type, muscle_group)
+    return PLAN_PARAMS[key]
+
+
+def parse_int(value):
+    """int(value), or None for missing/garbage form input"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def resolve_muscle_groups(exercise_ids):
+    """{exercise_id: muscle_group} for the existing ids, one IN query"""
+    exercise_ids = {ex_id for ex_id in exercise_ids if ex_id is not None}
+    if not exercise_ids:
+        return {}
+    return dict(
+        db.session.query(Exercise.id, Exercise.muscle_group).filter(
+            Exercise.id.in_(exercise_ids)
+        )
+    )
+
+
+def parse_history_cursor(raw):
+    """Parse a "YYYY-MM-DD_id" history cursor into a (date, id) tuple.
+
+    None without a cursor (first page); raises ValueError for a malformed one.
+    """
+    if not raw:
+        return None
+    raw_date, _, raw_id = raw.rpartition("_")
+    return datetime.strptime(raw_date, "%Y-%m-%d").date(), int(raw_id)
+
+
+def get_user_stats(user_id):
+    """Dashboard/history stats, read from the per-user rollup row, plus this
+    week's totals from its training rollup"""
+    stats = read_user_stats(user_id)
+    stats["this_week"] = rollup_summary(user_id, "week", start=date.today())["totals"]
+    return stats
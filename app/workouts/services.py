@@ -0,0 +1,467 @@
+"""
+Workout helpers shared by the routes, offline sync and autosave: starting,
+editing and finishing sessions, and the /details payload.
+
+The write helpers stage changes in the current transaction and leave the commit to the
+caller, except flush_autosaves, which runs on its own after a request's work
+is committed.
+"""
+
+import json
+import logging
+import math
+from datetime import date, datetime
+
+from flask import url_for
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.cache import VersionedCache
+from .models import (
+    WorkoutSession,
+    WorkoutExercise,
+    ExerciseSet,
+    DeletedWorkoutSession,
+)
+from .stats import (
+    refresh_session_summary,
+    record_finished_workout,
+    record_volume_change,
+    set_volume,
+    working_volume,
+)
+from .records import apply_set_changes, forget_set, record_session_volumes
+from .exercise_logs import record_session_logs, refresh_session_logs
+from .leaderboard import record_finished_volume, refresh_monthly_volume
+from .rollups import record_finished_rollups, refresh_rollups
+from .archive import load_exercise_entries
+from .live import publish, publish_sets
+from .autosave import (
+    autosave_window,
+    due_sessions,
+    queued_patches,
+    take_pending,
+    take_queued,
+    take_queued_batch,
+)
+from app.users.models import User
+
+logger = logging.getLogger(__name__)
+
+# Serialized /details payloads keyed by session id, tagged with session version
+details_cache = VersionedCache(maxsize=512)
+
+
+def next_sync_version(user_id):
+    """The user's sync version for the current transaction.
+
+    The first change in a transaction takes the next value (the UPDATE keeps
+    the user's row locked until commit); later changes reuse it.
+    """
+    versions = db.session.info.setdefault("sync_versions", {})
+    if user_id not in versions:
+        versions[user_id] = db.session.scalar(
+            db.update(User)
+            .where(User.id == user_id)
+            .values(sync_version=User.sync_version + 1)
+            .returning(User.sync_version)
+        )
+    return versions[user_id]
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_sync_versions(session, transaction):
+    # A rolled back savepoint may have undone the UPDATE, so take a new one
+    if transaction.parent is None or transaction.nested:
+        session.info.pop("sync_versions", None)
+
+
+def bump_session_version(workout_session):
+    """Increment the session's change counter (atomic, applied at flush) and
+    stamp it with the user's next sync version"""
+    workout_session.version = WorkoutSession.version + 1
+    workout_session.sync_version = next_sync_version(workout_session.user_id)
+    details_cache.invalidate(workout_session.id)
+
+
+def record_deleted_session(workout):
+    """Leave a tombstone for a session that is about to be deleted"""
+    db.session.add(
+        DeletedWorkoutSession(
+            workout_session_id=workout.id,
+            user_id=workout.user_id,
+            client_id=workout.client_id,
+            sync_version=next_sync_version(workout.user_id),
+            deleted_at=datetime.utcnow(),
+        )
+    )
+
+
+def materialize_workout(workout_session_id, plan_exercises):
+    """Insert a session's exercises and their warmup/working sets in bulk.
+
+    One multi-row INSERT ... RETURNING for the exercises (ids come back in
+    parameter order) and one batched INSERT for all sets, instead of a flush
+    per exercise and an ORM object per set.
+    """
+    plan_exercises = list(plan_exercises)
+    if not plan_exercises:
+        return []
+
+    exercise_ids = db.session.scalars(
+        db.insert(WorkoutExercise).returning(
+            WorkoutExercise.id, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "workout_session_id": workout_session_id,
+                "exercise_id": plan_ex.exercise_id,
+                "order_in_workout": plan_ex.order_in_workout,
+                "target_sets": plan_ex.target_sets,
+            }
+            for plan_ex in plan_exercises
+        ],
+    ).all()
+
+    set_rows = []
+    for workout_ex_id, plan_ex in zip(exercise_ids, plan_exercises):
+        # Warmup sets first, then working sets numbered after them
+        for i in range(1, plan_ex.warmup_sets + plan_ex.target_sets + 1):
+            set_rows.append(
+                {
+                    "workout_exercise_id": workout_ex_id,
+                    "set_number": i,
+                    "is_warmup": i <= plan_ex.warmup_sets,
+                    "is_completed": False,
+                }
+            )
+
+    if set_rows:
+        db.session.execute(db.insert(ExerciseSet), set_rows)
+
+    return exercise_ids
+
+
+def begin_workout(user_id, plan, plan_day, client_id=None, start_time=None):
+    """Create an in-progress session from a plan day (caller commits)"""
+    workout_session = WorkoutSession(
+        user_id=user_id,
+        workout_plan_id=plan.id,
+        name=plan_day.name,
+        date=start_time.date() if start_time else date.today(),
+        start_time=start_time or datetime.utcnow(),
+        is_completed=False,
+        client_id=client_id,
+    )
+    db.session.add(workout_session)
+    db.session.flush()
+
+    # Copy exercises and their sets from plan to session in bulk
+    materialize_workout(workout_session.id, plan_day.exercises)
+    bump_session_version(workout_session)
+    return workout_session
+
+
+def complete_workout(workout, end_time=None):
+    """Finish a session and fold it into the derived data (caller commits)"""
+    # Queued autosaves must land before the summary is frozen
+    drain_pending(workout.id)
+
+    if workout.is_completed:
+        return False
+    workout.end_time = end_time or datetime.utcnow()
+    workout.is_completed = True
+    refresh_session_summary(workout)
+    record_finished_workout(workout)
+    record_session_volumes(workout)
+    record_finished_rollups(workout)
+    record_finished_volume(workout)
+    record_session_logs([workout.id])
+    bump_session_version(workout)
+    publish(
+        workout.id,
+        "workout_finished",
+        {"redirect": url_for("workouts.workout_summary", workout_id=workout.id)},
+    )
+    return True
+
+
+def remove_set(exercise_set):
+    """Delete a set and take it out of the derived data (caller commits)"""
+    workout_session = exercise_set.workout_exercise.workout_session
+    set_id = exercise_set.id
+    exercise_id = exercise_set.workout_exercise.exercise_id
+    volume = set_volume(exercise_set)
+    db.session.delete(exercise_set)
+    if workout_session.is_completed:
+        db.session.flush()
+        record_volume_change(workout_session.user_id, -volume)
+    forget_set(workout_session.user_id, exercise_id, set_id)
+    bump_session_version(workout_session)
+    if workout_session.is_completed:
+        refresh_monthly_volume(
+            workout_session.user_id, workout_session.date, [exercise_id]
+        )
+        refresh_session_summary(workout_session)
+        record_session_volumes(workout_session)
+        refresh_rollups(workout_session.user_id, workout_session.date)
+        refresh_session_logs(workout_session)
+    publish(workout_session.id, "set_deleted", {"id": set_id})
+
+
+def workout_details(workout):
+    """/details payload of a session, loaded with eager queries"""
+    exercises = load_exercise_entries(workout)
+    return {
+        "id": workout.id,
+        "name": workout.name,
+        "date": workout.date.isoformat() if workout.date else None,
+        "start_time": workout.start_time.isoformat() if workout.start_time else None,
+        "end_time": workout.end_time.isoformat() if workout.end_time else None,
+        "is_completed": workout.is_completed,
+        "version": workout.version,
+        "exercises": [
+            {
+                "id": ex.id,
+                "exercise_id": ex.exercise_id,
+                "exercise_name": ex.exercise.name,
+                "muscle_group": ex.exercise.muscle_group,
+                "order": ex.order_in_workout,
+                "target_sets": ex.target_sets,
+                "sets": [
+                    {
+                        "id": s.id,
+                        "set_number": s.set_number,
+                        "weight": s.weight,
+                        "reps": s.reps,
+                        "is_completed": s.is_completed,
+                        "is_warmup": s.is_warmup,
+                        "rpe": s.rpe,
+                    }
+                    for s in ex.sets
+                ],
+            }
+            for ex in exercises
+        ],
+    }
+
+
+def serialize_workout_details(workout_id, with_queued=False):
+    """JSON bytes for /details, with queued autosaves over the applied values
+    if `with_queued`"""
+    workout = WorkoutSession.query.filter_by(id=workout_id).one()
+    details = workout_details(workout)
+    if with_queued:
+        queued = queued_patches(workout_id)
+        for exercise in details["exercises"]:
+            for s in exercise["sets"]:
+                patch = queued.get(s["id"], {})
+                s.update((field, patch[field]) for field in s.keys() & patch.keys())
+    return json.dumps(details).encode()
+
+
+MAX_WEIGHT = 10000
+MAX_REPS = 10000
+MAX_RPE = 10
+
+
+class InvalidPatch(Exception):
+    pass
+
+
+def _patch_number(patch, field, cast, maximum):
+    value = patch.get(field)
+    if value is None or value == "":
+        return None
+    # bool is an int subclass; true is not a weight
+    if isinstance(value, bool):
+        raise InvalidPatch(f"{field} must be a number")
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        raise InvalidPatch(f"{field} must be a number")
+    if not math.isfinite(number) or not 0 <= number <= maximum:
+        raise InvalidPatch(f"{field} must be between 0 and {maximum}")
+    if cast is int:
+        if not number.is_integer():
+            raise InvalidPatch(f"{field} must be a whole number")
+        return int(number)
+    return number
+
+
+def clean_set_patch(patch):
+    """A set patch with its fields coerced to the column types; raises
+    InvalidPatch"""
+    if not isinstance(patch, dict):
+        raise InvalidPatch("Expected an object")
+    is_completed = patch.get("is_completed")
+    if is_completed is None:
+        is_completed = False
+    if not isinstance(is_completed, bool):
+        raise InvalidPatch("is_completed must be true or false")
+    notes = patch.get("notes")
+    if notes is not None and not isinstance(notes, str):
+        raise InvalidPatch("notes must be text")
+    return {
+        "weight": _patch_number(patch, "weight", float, MAX_WEIGHT),
+        "reps": _patch_number(patch, "reps", int, MAX_REPS),
+        "is_completed": is_completed,
+        "rpe": _patch_number(patch, "rpe", int, MAX_RPE),
+        "notes": notes,
+    }
+
+
+def session_set_rows(workout_session_id, set_ids):
+    """{set_id: row} for the given sets that belong to the session, one SELECT"""
+    return {
+        row.id: row
+        for row in db.session.query(
+            ExerciseSet.id,
+            ExerciseSet.weight,
+            ExerciseSet.reps,
+            ExerciseSet.is_warmup,
+            WorkoutExercise.exercise_id,
+        )
+        .join(WorkoutExercise, ExerciseSet.workout_exercise_id == WorkoutExercise.id)
+        .filter(WorkoutExercise.workout_session_id == workout_session_id)
+        .filter(ExerciseSet.id.in_(list(set_ids)))
+    }
+
+
+def apply_set_patches(workout, patches, current=None):
+    """Write {set_id: patch} to the session's sets and update derived data.
+
+    One bulk UPDATE for the sets, then personal records and, for finished
+    workouts, monthly volumes and the stats rollups. Returns the updated set
+    ids.
+    """
+    if current is None:
+        current = session_set_rows(workout.id, patches)
+
+    rows = [
+        {
+            "id": set_id,
+            "weight": patch.get("weight"),
+            "reps": patch.get("reps"),
+            "is_completed": patch.get("is_completed", False),
+            "rpe": patch.get("rpe"),
+            "notes": patch.get("notes"),
+        }
+        for set_id, patch in patches.items()
+        if set_id in current
+    ]
+    if not rows:
+        return []
+
+    # ORM bulk UPDATE by primary key: one executemany statement
+    db.session.execute(db.update(ExerciseSet), rows)
+
+    bump_session_version(workout)
+    apply_set_changes(
+        workout,
+        [
+            dict(
+                r,
+                exercise_id=current[r["id"]].exercise_id,
+                is_warmup=current[r["id"]].is_warmup,
+            )
+            for r in rows
+        ],
+    )
+    if workout.is_completed:
+        refresh_monthly_volume(
+            workout.user_id,
+            workout.date,
+            {current[r["id"]].exercise_id for r in rows},
+        )
+        delta = sum(
+            working_volume(r["weight"], r["reps"], current[r["id"]].is_warmup)
+            - working_volume(
+                current[r["id"]].weight,
+                current[r["id"]].reps,
+                current[r["id"]].is_warmup,
+            )
+            for r in rows
+        )
+        record_volume_change(workout.user_id, delta)
+        refresh_session_summary(workout)
+        record_session_volumes(workout)
+        refresh_rollups(workout.user_id, workout.date)
+        refresh_session_logs(workout)
+
+    publish_sets(workout.id, [r["id"] for r in rows])
+    return [r["id"] for r in rows]
+
+
+def _apply_queued(workout_session_id, patches):
+    """Apply a session's queued patches; returns how many were applied.
+
+    Runs in a savepoint so a failure leaves the caller's transaction usable.
+    If the batch fails, each patch is retried on its own and the ones that
+    still fail are dropped: they came off the queue and would fail again.
+    """
+    workout = db.session.get(WorkoutSession, workout_session_id)
+    # A cancelled session's patches are dropped
+    if workout is None or not patches:
+        return 0
+    try:
+        with db.session.begin_nested():
+            return len(apply_set_patches(workout, patches))
+    except Exception:
+        logger.exception(
+            "Applying queued set updates for session %s failed", workout_session_id
+        )
+
+    applied = 0
+    for set_id, patch in patches.items():
+        try:
+            with db.session.begin_nested():
+                applied += len(apply_set_patches(workout, {set_id: patch}))
+        except Exception:
+            logger.warning("Dropped queued update for set %s: %r", set_id, patch)
+    return applied
+
+
+def drain_pending(workout_session_id):
+    """Apply every autosave queued for a session (caller commits).
+
+    Returns how many set patches were applied.
+    """
+    return _apply_queued(workout_session_id, take_pending(workout_session_id))
+
+
+def flush_autosaves():
+    """Apply the queued autosaves of sessions that are a window old (commits).
+
+    Each session is taken, applied and committed on its own, so one bad
+    session can't hold back the others. Rows another worker is applying are
+    skipped.
+    """
+    applied = 0
+    for workout_session_id in due_sessions(autosave_window()):
+        try:
+            taken = take_queued([workout_session_id], skip_locked=True)
+            applied += _apply_queued(
+                workout_session_id, taken.get(workout_session_id, {})
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception(
+                "Flushing queued set updates for session %s failed",
+                workout_session_id,
+            )
+    return applied
+
+
+def apply_queued_autosaves():
+    """Apply the whole queue, one committed batch at a time"""
+    total = 0
+    while True:
+        taken = take_queued_batch()
+        for workout_session_id, patches in taken.items():
+            total += _apply_queued(workout_session_id, patches)
+        db.session.commit()
+        if not taken:
+            return total
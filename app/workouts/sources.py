@@ -0,0 +1,97 @@
+"""
+Where the sets of a workout session are stored.
+
+Sets live in one of three tiers: the hot tables, the cold archive
+(`flask archive-workouts`) or packed per-exercise arrays
+(`flask compact-workouts`), see archive.py. Anything that scans sets across
+sessions must read all three, or archived history silently drops out of the
+totals.
+"""
+
+from sqlalchemy.orm import aliased
+
+from app.extensions import db
+from .models import (
+    WorkoutSession,
+    WorkoutExercise,
+    ExerciseSet,
+    ArchivedWorkoutExercise,
+    ArchivedExerciseSet,
+    PackedWorkoutExercise,
+)
+
+# Packed array column -> ExerciseSet column, in PackedSet order after the ids
+PACKED_COLUMNS = {
+    "set_numbers": "set_number",
+    "weights": "weight",
+    "reps": "reps",
+    "durations": "duration_seconds",
+    "distances": "distance_meters",
+    "rests": "rest_seconds",
+    "completed": "is_completed",
+    "rpes": "rpe",
+    "set_notes": "notes",
+    "warmups": "is_warmup",
+}
+
+
+def _packed_sets():
+    """Packed sets unnested into rows, mapped like ArchivedExerciseSet"""
+    packed = PackedWorkoutExercise.__table__
+    sets = (
+        db.func.unnest(packed.c.set_ids, *(packed.c[name] for name in PACKED_COLUMNS))
+        .table_valued("id", *PACKED_COLUMNS.values())
+        .render_derived()
+    )
+    rows = (
+        db.select(packed.c.id.label("workout_exercise_id"), *sets.c)
+        .select_from(packed)
+        .join(sets, db.true())
+        .subquery("packed_sets")
+    )
+    return aliased(ArchivedExerciseSet, rows, adapt_on_names=True)
+
+
+def set_sources():
+    """(exercise model, set model, sessions stored there) for each storage tier.
+
+    Hot tables first, then the archive, then packed sets unnested into rows.
+    """
+    return (
+        (WorkoutExercise, ExerciseSet, WorkoutSession.archived_at.is_(None)),
+        (
+            ArchivedWorkoutExercise,
+            ArchivedExerciseSet,
+            db.and_(
+                WorkoutSession.archived_at.isnot(None),
+                WorkoutSession.packed_at.is_(None),
+            ),
+        ),
+        (PackedWorkoutExercise, _packed_sets(), WorkoutSession.packed_at.isnot(None)),
+    )
+
+
+def stored_sets():
+    """Every stored set, whatever its tier, as one UNION ALL subquery.
+
+    Columns: id, workout_session_id, exercise_id, weight, reps, is_warmup and
+    is_completed. Join it to WorkoutSession on workout_session_id; filters on
+    the session are pushed down into each branch.
+    """
+    return db.union_all(
+        *(
+            db.select(
+                exercise_set.id,
+                workout_exercise.workout_session_id,
+                workout_exercise.exercise_id,
+                exercise_set.weight,
+                exercise_set.reps,
+                exercise_set.is_warmup,
+                exercise_set.is_completed,
+            ).join(
+                workout_exercise,
+                exercise_set.workout_exercise_id == workout_exercise.id,
+            )
+            for workout_exercise, exercise_set, _ in set_sources()
+        )
+    ).subquery("stored_sets")
@@ -0,0 +1,372 @@
+"""
+Per-user workout stats rollup.
+
+The dashboard and history pages read a single `UserWorkoutStats` row instead of
+scanning every completed session. Routes that change completed workouts call the
+helpers below in the same transaction; `flask rebuild-user-stats` recomputes the
+rollup from scratch.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.extensions import db
+from app.exercises.models import Exercise
+from .models import WorkoutSession, WorkoutExercise, ExerciseSet, UserWorkoutStats
+from .sources import set_sources, stored_sets
+
+
+def working_volume(weight, reps, is_warmup):
+    """Working volume of a single set from raw values (warmups don't count)"""
+    if is_warmup or not weight or not reps:
+        return 0
+    return weight * reps
+
+
+def set_volume(exercise_set):
+    """Working volume contributed by a single set (warmups don't count)"""
+    return working_volume(
+        exercise_set.weight, exercise_set.reps, exercise_set.is_warmup
+    )
+
+
+def session_minutes(workout):
+    """Duration of a finished session in minutes, None if it has no end time"""
+    if not workout.start_time or not workout.end_time:
+        return None
+    return (workout.end_time - workout.start_time).total_seconds() / 60
+
+
+def session_volumes(workout_session_ids):
+    """Working volume per session as {session_id: volume}, one grouped query.
+
+    Sessions without working sets are returned with 0 so callers can index
+    the result directly.
+    """
+    workout_session_ids = list(workout_session_ids)
+    volumes = dict.fromkeys(workout_session_ids, 0)
+    if not workout_session_ids:
+        return volumes
+
+    sets = stored_sets()
+    rows = (
+        db.session.query(
+            sets.c.workout_session_id,
+            db.func.sum(sets.c.weight * sets.c.reps),
+        )
+        .filter(sets.c.workout_session_id.in_(workout_session_ids))
+        .filter(sets.c.is_warmup == False)
+        .group_by(sets.c.workout_session_id)
+    )
+    for workout_session_id, volume in rows:
+        volumes[workout_session_id] = volume or 0
+    return volumes
+
+
+def session_muscle_groups(workout_session_ids):
+    """Sorted muscle groups per session as {session_id: [group, ...]}, one
+    query over the exercises of every storage tier"""
+    workout_session_ids = list(workout_session_ids)
+    groups = {workout_session_id: [] for workout_session_id in workout_session_ids}
+    if not workout_session_ids:
+        return groups
+
+    exercises = db.union_all(
+        *(
+            db.select(
+                workout_exercise.workout_session_id, workout_exercise.exercise_id
+            ).where(workout_exercise.workout_session_id.in_(workout_session_ids))
+            for workout_exercise, _, _ in set_sources()
+        )
+    ).subquery()
+    rows = (
+        db.session.query(exercises.c.workout_session_id, Exercise.muscle_group)
+        .join(Exercise, Exercise.id == exercises.c.exercise_id)
+        .filter(Exercise.muscle_group.isnot(None))
+        .distinct()
+        .order_by(exercises.c.workout_session_id, Exercise.muscle_group)
+    )
+    for workout_session_id, muscle_group in rows:
+        groups[workout_session_id].append(muscle_group)
+    return groups
+
+
+def session_volume(workout_session_id):
+    """Working volume of one session, summed in SQL"""
+    return session_volumes([workout_session_id])[workout_session_id]
+
+
+def refresh_session_summary(workout):
+    """Freeze volume, set count, duration and muscle groups onto the session.
+
+    Called when a session is finished and again whenever sets of a completed
+    session are edited, so read pages never have to walk exercise_sets.
+    """
+    db.session.flush()
+
+    volume, working_sets = (
+        db.session.query(
+            db.func.sum(ExerciseSet.weight * ExerciseSet.reps),
+            db.func.count(ExerciseSet.id),
+        )
+        .join(WorkoutExercise, ExerciseSet.workout_exercise_id == WorkoutExercise.id)
+        .filter(WorkoutExercise.workout_session_id == workout.id)
+        .filter(ExerciseSet.is_warmup == False)
+        .one()
+    )
+
+    groups = [
+        group
+        for (group,) in db.session.query(Exercise.muscle_group)
+        .join(WorkoutExercise, WorkoutExercise.exercise_id == Exercise.id)
+        .filter(WorkoutExercise.workout_session_id == workout.id)
+        .distinct()
+        .order_by(Exercise.muscle_group)
+    ]
+
+    minutes = session_minutes(workout)
+
+    workout.summary_volume = volume or 0.0
+    workout.summary_sets = working_sets or 0
+    workout.summary_duration = round(minutes) if minutes is not None else 0
+    workout.summary_muscle_groups = ",".join(groups)
+
+
+def _locked(user_id):
+    return (
+        UserWorkoutStats.query.filter_by(user_id=user_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+
+
+def _get_for_update(user_id):
+    """Load the rollup row, locking it for the current transaction.
+
+    Returns (stats, built). A user without a row yet (history from before
+    the rollup existed) gets one built from scratch under the same lock, so
+    the caller must not add the change it has already flushed on top.
+    """
+    stats = _locked(user_id)
+    if stats is not None:
+        return stats, False
+
+    # A concurrent first change waits on this insert, then finds the row
+    created = (
+        db.session.execute(
+            pg_insert(UserWorkoutStats)
+            .values(
+                user_id=user_id,
+                total_workouts=0,
+                current_streak=0,
+                longest_streak=0,
+                total_volume=0.0,
+                duration_sum=0.0,
+                duration_count=0,
+            )
+            .on_conflict_do_nothing(index_elements=[UserWorkoutStats.user_id])
+            .returning(UserWorkoutStats.user_id)
+        ).first()
+        is not None
+    )
+    stats = _locked(user_id)
+    if created:
+        _rebuild(stats)
+    return stats, created
+
+
+def _island_key(day, row_number):
+    """Constant across a run of consecutive days (PostgreSQL date - integer)"""
+    return day - db.cast(row_number, db.Integer)
+
+
+def compute_streaks(user_id, exclude_session_id=None):
+    """(last workout date, current streak, longest streak) in one SQL query.
+
+    Gaps-and-islands: numbering the distinct workout dates in order and
+    subtracting the row number from each date gives the same value for every
+    day of a consecutive run. Grouping by it yields the runs; the latest one
+    is the current streak and the longest comes from a window over the same
+    rows. The dates are read from idx_workout_session_streak alone.
+    """
+    days = db.select(WorkoutSession.date.label("day")).where(
+        WorkoutSession.user_id == user_id,
+        WorkoutSession.is_completed == True,
+    )
+    if exclude_session_id is not None:
+        days = days.where(WorkoutSession.id != exclude_session_id)
+    days = days.distinct().subquery()
+
+    numbered = db.select(
+        days.c.day,
+        _island_key(
+            days.c.day, db.func.row_number().over(order_by=days.c.day)
+        ).label("island"),
+    ).subquery()
+
+    islands = (
+        db.select(
+            db.func.max(numbered.c.day).label("last_day"),
+            db.func.count().label("length"),
+        )
+        .group_by(numbered.c.island)
+        .subquery()
+    )
+
+    row = db.session.execute(
+        db.select(
+            islands.c.last_day,
+            islands.c.length,
+            db.func.max(islands.c.length).over(),
+        )
+        .order_by(islands.c.last_day.desc())
+        .limit(1)
+    ).first()
+    if row is None:
+        return None, 0, 0
+    return tuple(row)
+
+
+def _recompute_streak(stats, exclude_session_id=None):
+    """Rebuild the streak fields from the user's session dates.
+
+    Only used when a change lands before the end of the current streak
+    (an out-of-order finish or a deleted session), which is rare.
+    """
+    (
+        stats.last_workout_date,
+        stats.current_streak,
+        stats.longest_streak,
+    ) = compute_streaks(stats.user_id, exclude_session_id)
+
+
+def record_finished_workout(workout):
+    """Fold a just-finished session into the owner's rollup (caller commits)"""
+    stats, built = _get_for_update(workout.user_id)
+    if built:
+        return
+
+    stats.total_workouts += 1
+    stats.total_volume += (
+        workout.summary_volume
+        if workout.summary_volume is not None
+        else session_volume(workout.id)
+    )
+
+    minutes = session_minutes(workout)
+    if minutes is not None:
+        stats.duration_sum += minutes
+        stats.duration_count += 1
+
+    last = stats.last_workout_date
+    if last is None or workout.date > last + timedelta(days=1):
+        stats.last_workout_date = workout.date
+        stats.current_streak = 1
+    elif workout.date == last + timedelta(days=1):
+        stats.last_workout_date = workout.date
+        stats.current_streak += 1
+    elif workout.date < last:
+        db.session.flush()
+        _recompute_streak(stats)
+    stats.longest_streak = max(stats.longest_streak or 0, stats.current_streak)
+
+
+def record_removed_workout(workout):
+    """Take a completed session that is about to be deleted out of the rollup"""
+    # A freshly built row still counts the session, so it is taken out below
+    stats, _ = _get_for_update(workout.user_id)
+
+    stats.total_workouts = max(stats.total_workouts - 1, 0)
+    stats.total_volume = max(stats.total_volume - session_volume(workout.id), 0.0)
+
+    minutes = session_minutes(workout)
+    if minutes is not None and stats.duration_count > 0:
+        stats.duration_sum = max(stats.duration_sum - minutes, 0.0)
+        stats.duration_count -= 1
+
+    # The streak only changes if this was the last session on its date
+    same_day = (
+        WorkoutSession.query.filter(
+            WorkoutSession.user_id == workout.user_id,
+            WorkoutSession.is_completed == True,
+            WorkoutSession.date == workout.date,
+            WorkoutSession.id != workout.id,
+        ).first()
+        is not None
+    )
+    if not same_day:
+        db.session.flush()
+        _recompute_streak(stats, exclude_session_id=workout.id)
+
+
+def record_volume_change(user_id, delta):
+    """Adjust total volume after a set of a completed session was edited or
+    deleted; the change must already be flushed"""
+    if not delta:
+        return
+    stats, built = _get_for_update(user_id)
+    if not built:
+        stats.total_volume = max(stats.total_volume + delta, 0.0)
+
+
+def rebuild_user_stats(user_id):
+    """Recompute a user's rollup from scratch (caller commits)"""
+    stats, built = _get_for_update(user_id)
+    if not built:
+        _rebuild(stats)
+    return stats
+
+
+def _rebuild(stats):
+    """Recompute every field of a locked rollup row from the user's history"""
+    user_id = stats.user_id
+    workouts = WorkoutSession.query.filter_by(user_id=user_id, is_completed=True)
+    stats.total_workouts = 0
+    stats.duration_sum = 0.0
+    stats.duration_count = 0
+    for w in workouts:
+        stats.total_workouts += 1
+        minutes = session_minutes(w)
+        if minutes is not None:
+            stats.duration_sum += minutes
+            stats.duration_count += 1
+
+    # Archived and packed sessions count too
+    sets = stored_sets()
+    stats.total_volume = (
+        db.session.query(db.func.sum(sets.c.weight * sets.c.reps))
+        .select_from(sets)
+        .join(WorkoutSession, sets.c.workout_session_id == WorkoutSession.id)
+        .filter(WorkoutSession.user_id == user_id)
+        .filter(WorkoutSession.is_completed == True)
+        .filter(sets.c.is_warmup == False)
+        .scalar()
+        or 0.0
+    )
+
+    _recompute_streak(stats)
+
+
+def read_user_stats(user_id):
+    """Dashboard stats from the rollup row (built on first access)"""
+    stats = db.session.get(UserWorkoutStats, user_id)
+    if stats is None:
+        stats = rebuild_user_stats(user_id)
+        db.session.commit()
+
+    today = datetime.utcnow().date()
+    streak = stats.current_streak if stats.last_workout_date == today else 0
+
+    avg_duration = (
+        round(stats.duration_sum / stats.duration_count)
+        if stats.duration_count
+        else 0
+    )
+
+    return {
+        "total_workouts": stats.total_workouts,
+        "current_streak": streak,
+        "longest_streak": max(stats.longest_streak or 0, stats.current_streak),
+        "total_volume": int(stats.total_volume),
+        "avg_duration": avg_duration,
+    }
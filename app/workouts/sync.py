@@ -0,0 +1,271 @@
+"""
+Offline delta sync for the PWA.
+
+While offline, the active workout page queues its edits instead of losing
+them. Back online, it sends them all with one POST /workouts/sync:
+
+    {"since": 1042, "mutations": [
+        {"id": "c1", "type": "start", "client_id": "w-9f2", "plan_day_id": 3},
+        {"id": "c2", "type": "set", "workout_client_id": "w-9f2", "order": 1,
+         "set_number": 2, "weight": 60, "reps": 8, "is_completed": true},
+        {"id": "c3", "type": "set", "set_id": 881, "weight": 80, "reps": 5},
+        {"id": "c4", "type": "delete_set", "set_id": 882},
+        {"id": "c5", "type": "finish", "workout_client_id": "w-9f2"}]}
+
+Mutations are applied in order in one transaction, each through the same
+helpers as the regular routes. Set patches are collected per session and
+written with one bulk update before the next start/finish/delete, or at the
+end. Sets are addressed by id, or by session, exercise order and set number
+for a session started offline. Sessions are addressed by id or by the
+client_id their start carried. Replaying a batch is safe: a start with a
+known client_id returns the existing session, and set patches, deletes and
+finishes are idempotent. A mutation that cannot apply (unknown set, another
+user's session) is reported as rejected and the rest still go through.
+
+Each transaction that changes a user's workouts takes the next value of
+`users.sync_version`, once, and stamps it on every session it touches. The
+UPDATE locks the user's row until commit, so the numbers are committed in
+order. The response holds the sessions changed since `since`, in full, plus
+the ids of cancelled sessions, about SYNC_PAGE of them, and the cursor for
+the next call. Pages end on a whole version, since one transaction can stamp
+many sessions.
+"""
+
+from datetime import datetime, timezone
+
+from app.extensions import db
+from .archive import editable_set, restore_session
+from .services import (
+    InvalidPatch,
+    apply_set_patches,
+    begin_workout,
+    clean_set_patch,
+    complete_workout,
+    drain_pending,
+    remove_set,
+    workout_details,
+)
+from .models import WorkoutSession, WorkoutExercise, ExerciseSet, DeletedWorkoutSession
+from .plans import get_plan_day_snapshot
+
+MUTATION_TYPES = ("start", "set", "delete_set", "finish")
+MAX_MUTATIONS = 500
+SYNC_PAGE = 50
+
+
+class Rejected(Exception):
+    pass
+
+
+def _timestamp(value):
+    """Naive UTC datetime, like the stored ones, from an ISO 8601 string"""
+    if value is None:
+        return None
+    try:
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise Rejected("Invalid timestamp")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class _Batch:
+    """Applies one user's mutations, holding set patches until they must land"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.patches = {}  # session id -> {set_id: patch}
+
+    def flush(self):
+        for workout_id, patches in self.patches.items():
+            workout = db.session.get(WorkoutSession, workout_id)
+            # Older queued autosaves must not overwrite these later
+            drain_pending(workout_id)
+            apply_set_patches(workout, patches)
+        self.patches = {}
+
+    def workout(self, mutation):
+        if mutation.get("workout_client_id") is not None:
+            workout = WorkoutSession.query.filter_by(
+                user_id=self.user_id, client_id=str(mutation["workout_client_id"])
+            ).first()
+        else:
+            try:
+                workout = db.session.get(WorkoutSession, int(mutation["workout_id"]))
+            except (KeyError, TypeError, ValueError):
+                raise Rejected("workout_id or workout_client_id is required")
+        if workout is None or workout.user_id != self.user_id:
+            raise Rejected("Workout not found")
+        # Sets of archived sessions must be back in the hot tables to be edited
+        restore_session(workout)
+        return workout
+
+    def exercise_set(self, mutation):
+        """(set, session) addressed by set_id or by session/order/set_number"""
+        if mutation.get("set_id") is not None:
+            try:
+                set_id = int(mutation["set_id"])
+            except (TypeError, ValueError):
+                raise Rejected("set_id must be an integer")
+            exercise_set = editable_set(set_id, self.user_id)
+            if exercise_set is None:
+                return None, None
+            workout = exercise_set.workout_exercise.workout_session
+            if workout.user_id != self.user_id:
+                raise Rejected("Set not found")
+            return exercise_set, workout
+
+        workout = self.workout(mutation)
+        try:
+            order, set_number = int(mutation["order"]), int(mutation["set_number"])
+        except (KeyError, TypeError, ValueError):
+            raise Rejected("set_id, or order and set_number, is required")
+        exercise_set = (
+            ExerciseSet.query.join(WorkoutExercise)
+            .filter(
+                WorkoutExercise.workout_session_id == workout.id,
+                WorkoutExercise.order_in_workout == order,
+                ExerciseSet.set_number == set_number,
+            )
+            .first()
+        )
+        return exercise_set, workout
+
+    def start(self, mutation):
+        client_id = mutation.get("client_id")
+        if not client_id or len(str(client_id)) > 64:
+            raise Rejected("client_id is required (at most 64 characters)")
+        existing = WorkoutSession.query.filter_by(
+            user_id=self.user_id, client_id=str(client_id)
+        ).first()
+        if existing is not None:
+            return {"workout_id": existing.id}
+        # A replayed start must not bring back a session cancelled since
+        if DeletedWorkoutSession.query.filter_by(
+            user_id=self.user_id, client_id=str(client_id)
+        ).first():
+            raise Rejected("Workout was cancelled")
+
+        if WorkoutSession.query.filter_by(
+            user_id=self.user_id, is_completed=False
+        ).first():
+            raise Rejected("You already have an active workout")
+        try:
+            plan, plan_day = get_plan_day_snapshot(int(mutation["plan_day_id"]))
+        except (KeyError, TypeError, ValueError):
+            raise Rejected("plan_day_id is required")
+        if plan_day is None or plan.user_id != self.user_id:
+            raise Rejected("Plan day not found")
+
+        workout = begin_workout(
+            self.user_id,
+            plan,
+            plan_day,
+            client_id=str(client_id),
+            start_time=_timestamp(mutation.get("started_at")),
+        )
+        return {"workout_id": workout.id}
+
+    def set(self, mutation):
+        try:
+            patch = clean_set_patch(mutation)
+        except InvalidPatch as e:
+            raise Rejected(str(e))
+        exercise_set, workout = self.exercise_set(mutation)
+        if exercise_set is None:
+            raise Rejected("Set not found")
+        # Last patch wins, like the bulk endpoint
+        self.patches.setdefault(workout.id, {})[exercise_set.id] = patch
+        return {"set_id": exercise_set.id}
+
+    def delete_set(self, mutation):
+        self.flush()
+        exercise_set, _ = self.exercise_set(mutation)
+        # Already deleted: a replayed delete is a no-op
+        if exercise_set is not None:
+            remove_set(exercise_set)
+        return {}
+
+    def finish(self, mutation):
+        workout = self.workout(mutation)
+        self.flush()
+        complete_workout(workout, end_time=_timestamp(mutation.get("finished_at")))
+        return {"workout_id": workout.id}
+
+
+def apply_mutations(user_id, mutations):
+    """Apply a batch of queued mutations in order (caller commits).
+
+    Returns one result per mutation: its id, "applied" or "rejected" with an
+    error, and the server ids it resolved to.
+    """
+    batch = _Batch(user_id)
+    results = []
+    for mutation in mutations:
+        if not isinstance(mutation, dict):
+            results.append(
+                {"id": None, "status": "rejected", "error": "Invalid mutation"}
+            )
+            continue
+        result = {"id": mutation.get("id")}
+        kind = mutation.get("type")
+        try:
+            if kind not in MUTATION_TYPES:
+                raise Rejected(f"type must be one of {', '.join(MUTATION_TYPES)}")
+            result.update(getattr(batch, kind)(mutation), status="applied")
+        except Rejected as e:
+            result.update(status="rejected", error=str(e))
+        results.append(result)
+    batch.flush()
+    return results
+
+
+def _changes(user_id, condition, limit=None):
+    """Changed sessions and tombstones matching `condition` on sync_version"""
+    changes = []
+    for model in (WorkoutSession, DeletedWorkoutSession):
+        query = model.query.filter(
+            model.user_id == user_id, condition(model.sync_version)
+        ).order_by(model.sync_version)
+        if limit is not None:
+            query = query.limit(limit)
+        changes += query.all()
+    return sorted(changes, key=lambda change: change.sync_version)
+
+
+def changes_since(user_id, since=0, limit=SYNC_PAGE):
+    """Sessions changed and cancelled after sync version `since`.
+
+    Returns {"sessions", "deleted", "version", "has_more"}; pass "version" as
+    the next `since` and call again while has_more.
+    """
+    changes = _changes(user_id, lambda version: version > since, limit + 1)
+    has_more = len(changes) > limit
+    page = changes[:limit]
+    if has_more:
+        # The next call starts after page[-1], so never split a version
+        cut = changes[limit].sync_version
+        page = [change for change in page if change.sync_version < cut]
+        if not page:
+            # One transaction changed more than a page: send all of it
+            page = _changes(user_id, lambda version: version == cut)
+
+    return {
+        "sessions": [
+            dict(
+                workout_details(change),
+                client_id=change.client_id,
+                sync_version=change.sync_version,
+            )
+            for change in page
+            if isinstance(change, WorkoutSession)
+        ],
+        "deleted": [
+            change.workout_session_id
+            for change in page
+            if isinstance(change, DeletedWorkoutSession)
+        ],
+        "version": page[-1].sync_version if page else since,
+        "has_more": has_more,
+    }
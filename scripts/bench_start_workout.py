@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark: database round trips per started workout.
+
+Materializes a workout session from a plan day twice - once with the old
+per-object path (flush per exercise, one ORM object per set) and once with
+`materialize_workout` - and prints statement count and wall time for each.
+Everything runs inside a transaction that is rolled back, so no data is kept.
+
+Usage:
+  export FLASK_APP=app
+  python scripts/bench_start_workout.py            # first plan day in the DB
+  python scripts/bench_start_workout.py --plan-day-id 3 --runs 20
+
+This script requires the DB configured in app/config.py to be reachable.
+"""
+import argparse
+import time
+from datetime import date, datetime
+
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.workouts.models import (
+    WorkoutSession,
+    WorkoutExercise,
+    ExerciseSet,
+    WorkoutPlanDay,
+)
+from app.workouts.services import materialize_workout
+
+
+def start_legacy(plan_day):
+    """The previous start_workout body, kept here for comparison"""
+    workout_session = WorkoutSession(
+        user_id=plan_day.workout_plan.user_id,
+        workout_plan_id=plan_day.workout_plan_id,
+        name=plan_day.name,
+        date=date.today(),
+        start_time=datetime.utcnow(),
+        is_completed=False,
+    )
+    db.session.add(workout_session)
+    db.session.flush()
+
+    for plan_ex in plan_day.exercises:
+        workout_ex = WorkoutExercise(
+            workout_session_id=workout_session.id,
+            exercise_id=plan_ex.exercise_id,
+            order_in_workout=plan_ex.order_in_workout,
+            target_sets=plan_ex.target_sets,
+        )
+        db.session.add(workout_ex)
+        db.session.flush()
+
+        for i in range(1, plan_ex.warmup_sets + 1):
+            db.session.add(
+                ExerciseSet(
+                    workout_exercise_id=workout_ex.id,
+                    set_number=i,
+                    is_warmup=True,
+                    is_completed=False,
+                )
+            )
+        for i in range(1, plan_ex.target_sets + 1):
+            db.session.add(
+                ExerciseSet(
+                    workout_exercise_id=workout_ex.id,
+                    set_number=plan_ex.warmup_sets + i,
+                    is_warmup=False,
+                    is_completed=False,
+                )
+            )
+    db.session.flush()
+
+
+def start_bulk(plan_day):
+    """The current start_workout body"""
+    workout_session = WorkoutSession(
+        user_id=plan_day.workout_plan.user_id,
+        workout_plan_id=plan_day.workout_plan_id,
+        name=plan_day.name,
+        date=date.today(),
+        start_time=datetime.utcnow(),
+        is_completed=False,
+    )
+    db.session.add(workout_session)
+    db.session.flush()
+    materialize_workout(workout_session.id, plan_day.exercises)
+
+
+def measure(fn, plan_day, runs):
+    statements = {"count": 0, "counting": False}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        # Only statements issued by fn; reloading the plan between runs is not
+        if statements["counting"]:
+            statements["count"] += 1
+
+    event.listen(db.engine, "before_cursor_execute", on_execute)
+    elapsed = 0.0
+    try:
+        for _ in range(runs):
+            # Plan rows are loaded up front so only the writes are counted
+            plan_day.workout_plan
+            list(plan_day.exercises)
+            statements["counting"] = True
+            start = time.perf_counter()
+            try:
+                fn(plan_day)
+            finally:
+                elapsed += time.perf_counter() - start
+                statements["counting"] = False
+            db.session.rollback()
+            plan_day = db.session.merge(plan_day)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", on_execute)
+        db.session.rollback()
+
+    return statements["count"] / runs, elapsed / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--plan-day-id", type=int)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.plan_day_id:
+            plan_day = db.session.get(WorkoutPlanDay, args.plan_day_id)
+        else:
+            plan_day = WorkoutPlanDay.query.order_by(WorkoutPlanDay.id).first()
+        if not plan_day:
+            print("No plan day found - create a workout plan first")
+            return
+
+        n_exercises = len(plan_day.exercises)
+        n_sets = sum(pe.warmup_sets + pe.target_sets for pe in plan_day.exercises)
+        print(
+            f"Plan day {plan_day.id} '{plan_day.name}': "
+            f"{n_exercises} exercises, {n_sets} sets, {args.runs} runs"
+        )
+
+        for label, fn in (("per-object", start_legacy), ("bulk", start_bulk)):
+            round_trips, ms = measure(fn, plan_day, args.runs)
+            print(f"  {label:<11} {round_trips:6.1f} round trips  {ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
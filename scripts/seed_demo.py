@@ -14,6 +14,7 @@ from app import create_app
 from app.extensions import db
 from app.users.models import User
 from app.exercises.models import Exercise
+from app.exercises.catalog import bump_catalog_version
 from werkzeug.security import generate_password_hash
 
 
@@ -64,6 +65,7 @@ def seed():
                     is_active=True,
                 )
                 db.session.add(e)
+        bump_catalog_version()
 
         db.session.commit()
         print("Seed data created: user 'd' and sample exercises")
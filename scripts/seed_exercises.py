@@ -11,6 +11,7 @@ Usage:
 from app import create_app
 from app.extensions import db
 from app.exercises.models import Exercise
+from app.exercises.catalog import bump_catalog_version
 
 
 def seed_all_exercises():
@@ -272,6 +273,7 @@ def seed_all_exercises():
         # Bulk insert
         try:
             db.session.bulk_save_objects(exercises)
+            bump_catalog_version()
             db.session.commit()
             print(f"✅ Successfully seeded {len(exercises)} exercises!")
 
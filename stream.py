@@ -0,0 +1,6 @@
+from psycogreen.gevent import patch_psycopg
+
+# psycopg2 waits on the gevent hub instead of blocking the whole process
+patch_psycopg()
+
+from run import application  # noqa: E402
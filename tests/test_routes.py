@@ -1,5 +1,9 @@
+import os
+from datetime import date, datetime, time, timedelta
+
 import pytest
 from app import create_app
+from app.extensions import db
 
 
 @pytest.fixture
@@ -31,3 +35,568 @@ def test_login_page(client):
 def test_register_json_missing_fields(client):
     r = client.post("/users/create", json={})
     assert r.status_code == 400 or r.status_code == 500
+
+
+def test_bulk_update_sets_requires_login(client):
+    r = client.post("/workouts/1/sets", json={"sets": []})
+    assert r.status_code == 401
+
+
+def test_plan_json_requires_login(client):
+    r = client.get("/workouts/plan/1/json")
+    assert r.status_code == 401
+
+
+def test_volume_analytics_requires_login(client):
+    r = client.get("/workouts/analytics/volume?bucket=month")
+    assert r.status_code == 401
+
+
+def test_training_rollups_requires_login(client):
+    r = client.get("/workouts/analytics/rollups?period=month")
+    assert r.status_code == 401
+
+
+def test_leaderboard_requires_login(client):
+    r = client.get("/workouts/leaderboard/1?metric=e1rm")
+    assert r.status_code == 401
+
+
+def test_workout_stream_requires_login(client):
+    r = client.get("/workouts/1/stream")
+    assert r.status_code == 401
+
+
+def test_workout_details_requires_login(client):
+    r = client.get("/workouts/1/details", headers={"If-None-Match": '"1-1"'})
+    assert r.status_code == 401
+
+
+def test_exercise_progress_requires_login(client):
+    r = client.get("/workouts/progress/1")
+    assert r.status_code == 401
+
+
+def test_import_workouts_requires_login(client):
+    r = client.post("/workouts/import")
+    assert r.status_code == 401
+
+
+def test_export_requires_login(client):
+    r = client.get("/users/export?format=csv")
+    assert r.status_code == 401
+
+
+def test_sync_requires_login(client):
+    r = client.post("/workouts/sync", json={"mutations": []})
+    assert r.status_code == 401
+
+
+def test_nutrition_bulk_rejects_non_list(client):
+    r = client.post("/nutrition/bulk", json={"entries": "nope"})
+    assert r.status_code == 400
+
+
+def test_history_cursor_rejects_garbage():
+    from app.workouts.routers import parse_history_cursor
+
+    assert parse_history_cursor(None) is None
+    assert parse_history_cursor("") is None
+    assert parse_history_cursor("2026-10-18_42") == (date(2026, 10, 18), 42)
+    for raw in (
+        "nope",
+        "2026-10-18",
+        "2026-13-01_4",
+        "2026-10-18_x",
+        "2026-10-18_",
+        "_42",
+        "2026-10-18_1.5",
+        "2026_10_18_4",
+    ):
+        with pytest.raises(ValueError):
+            parse_history_cursor(raw)
+
+
+def test_bulk_nutrition_entry_parsing():
+    from app.nutritionlogs.bulk import InvalidEntry, _parse
+
+    row = _parse(
+        {
+            "user_id": "7",
+            "name": " Creatine ",
+            "amount": "5 g",
+            "date": "2026-10-18",
+            "time": "08:30:00",
+            "idempotency_key": "dose-1",
+        }
+    )
+    assert row == {
+        "user_id": 7,
+        "name": "Creatine",
+        "amount": "5 g",
+        "date": date(2026, 10, 18),
+        "time": time(8, 30),
+        "idempotency_key": "dose-1",
+    }
+    entry = {"user_id": 7, "name": "Creatine", "amount": "5 g"}
+    for bad in (
+        "nope",
+        {"name": "Creatine", "amount": "5 g"},
+        dict(entry, user_id="seven"),
+        dict(entry, name="  "),
+        dict(entry, name="x" * 101),
+        dict(entry, date="18.10.2026"),
+        dict(entry, time="8 am"),
+        dict(entry, idempotency_key="k" * 65),
+    ):
+        with pytest.raises(InvalidEntry):
+            _parse(bad)
+
+
+def test_set_patch_cleaning():
+    from app.workouts.services import InvalidPatch, clean_set_patch
+
+    assert clean_set_patch({"weight": "62.5", "reps": 8.0, "rpe": ""}) == {
+        "weight": 62.5,
+        "reps": 8,
+        "is_completed": False,
+        "rpe": None,
+        "notes": None,
+    }
+    for bad in (
+        None,
+        [],
+        {"weight": "heavy"},
+        {"weight": float("nan")},
+        {"weight": "1e400"},
+        {"weight": -5},
+        {"weight": True},
+        {"reps": 7.5},
+        {"reps": 10**400},
+        {"rpe": 11},
+        {"is_completed": "yes"},
+        {"notes": 5},
+    ):
+        with pytest.raises(InvalidPatch):
+            clean_set_patch(bad)
+
+def test_import_row_parsing():
+    import io
+    from collections import Counter
+    from types import SimpleNamespace
+
+    from app.workouts.importer import _json_rows, _number, _sessions
+
+    assert _number("", float) is None
+    assert _number("62.5", float) == 62.5
+    assert _number("8.0", int) == 8
+    for bad in ("nan", "inf", "-Infinity", "1e400", 10**400, "heavy"):
+        with pytest.raises(ValueError):
+            _number(bad, float)
+
+    text = '[{"date": "2026-10-18", "exercise": "Squat", "weight": 100},\n'
+    text += ' {"date": "2026-10-18", "exercise": "Squat", "weight": NaN}]'
+    rows = list(_json_rows(io.StringIO(text)))
+    assert len(rows) == 2
+    assert list(_json_rows(io.StringIO('{"a": 1}\n{"a": 2}\n'))) == [{"a": 1}, {"a": 2}]
+    for bad in ('[{"a": 1}, 5]', '[{"a": '):
+        with pytest.raises(ValueError):
+            list(_json_rows(io.StringIO(bad)))
+
+    squat = SimpleNamespace(id=1, muscle_group="legs")
+    report = {"skipped": 0, "unknown_exercises": Counter()}
+    sessions = list(_sessions(rows, {"squat": squat}, report))
+    assert [[s["weight"] for s in sets] for sets in sessions] == [[100.0]]
+    assert report["skipped"] == 1
+
+
+def test_sync_timestamps():
+    from app.workouts.sync import Rejected, _timestamp
+
+    assert _timestamp(None) is None
+    assert _timestamp("2026-10-18T10:00:00Z") == datetime(2026, 10, 18, 10, 0)
+    assert _timestamp("2026-10-18T10:00:00+02:00") == datetime(2026, 10, 18, 8, 0)
+    assert _timestamp("2026-10-18T10:00:00") == datetime(2026, 10, 18, 10, 0)
+    for bad in ("yesterday", "2026-13-01T00:00:00", 5):
+        with pytest.raises(Rejected):
+            _timestamp(bad)
+
+
+# ------------------ BEHAVIOUR (needs Postgres) ------------------
+# Set TEST_DATABASE_URL to an empty Postgres database to run these; the
+# tables are created and dropped around each test.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def db_app():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from app.config import Config
+    from app.exercises import catalog
+    from app.workouts import plans
+    from app.workouts.services import details_cache
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = TEST_DATABASE_URL
+        SET_AUTOSAVE_WINDOW = 0
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    # Per-worker caches must not leak ids into the next test
+    for cache in (catalog._cache, plans._cache, details_cache):
+        cache.clear()
+
+
+def make_user(name):
+    from app.users.models import User
+
+    user = User(
+        username=name, email=f"{name}@example.com", password_hash="x", level="beginner"
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_plan_day(user, exercises=2, sets=3):
+    """Plan day with `exercises` exercises of `sets` working sets, no warmups"""
+    from app.exercises.models import Exercise
+    from app.workouts.models import WorkoutPlan, WorkoutPlanDay, WorkoutPlanExercise
+
+    plan = WorkoutPlan(user_id=user.id, name="Plan", level="beginner")
+    db.session.add(plan)
+    db.session.flush()
+    day = WorkoutPlanDay(workout_plan_id=plan.id, day_number=1, name="Day 1")
+    db.session.add(day)
+    db.session.flush()
+    for order in range(1, exercises + 1):
+        exercise = Exercise(
+            name=f"{user.username} lift {order}",
+            muscle_group=("legs", "back")[order % 2],
+            difficulty="beginner",
+        )
+        db.session.add(exercise)
+        db.session.flush()
+        db.session.add(
+            WorkoutPlanExercise(
+                plan_day_id=day.id,
+                exercise_id=exercise.id,
+                order_in_workout=order,
+                target_sets=sets,
+                target_reps_min=5,
+                target_reps_max=8,
+                warmup_sets=0,
+            )
+        )
+    db.session.commit()
+    return day
+
+
+def login(app, user):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = user.id
+    return client
+
+
+def start(client, day, on=None):
+    """Start a workout from `day` (dated `on`); returns the session"""
+    from app.workouts.models import WorkoutSession
+
+    client.post(f"/workouts/start/{day.id}")
+    workout = WorkoutSession.query.filter_by(is_completed=False).one()
+    if on is not None:
+        workout.date = on
+        db.session.commit()
+    return workout
+
+
+def set_ids(workout):
+    return [s.id for ex in workout.exercises for s in ex.sets]
+
+
+def log_sets(client, workout, weight, reps=5):
+    sets = [
+        {"id": set_id, "weight": weight, "reps": reps, "is_completed": True}
+        for set_id in set_ids(workout)
+    ]
+    return client.post(f"/workouts/{workout.id}/sets", json={"sets": sets})
+
+
+def stats_row(user):
+    from app.workouts.models import UserWorkoutStats
+
+    db.session.expire_all()
+    stats = db.session.get(UserWorkoutStats, user.id)
+    return (
+        stats.total_workouts,
+        stats.current_streak,
+        stats.longest_streak,
+        stats.last_workout_date,
+        round(stats.total_volume, 3),
+        stats.duration_count,
+    )
+
+
+def test_autosaves_coalesce_until_finish(db_app):
+    from app.workouts.models import ExerciseSet
+
+    db_app.config["SET_AUTOSAVE_WINDOW"] = 3600
+    user = make_user("autosave")
+    day = make_plan_day(user, exercises=1, sets=1)
+    client = login(db_app, user)
+    workout = start(client, day)
+    (set_id,) = set_ids(workout)
+
+    for weight in (40, 45, 50):
+        r = client.post(
+            f"/workouts/{workout.id}/sets",
+            json={"sets": [{"id": set_id, "weight": weight, "reps": 5}]},
+        )
+        assert r.status_code == 202
+    db.session.expire_all()
+    assert db.session.get(ExerciseSet, set_id).weight is None
+    # Other devices see queued values
+    r = client.get(f"/workouts/{workout.id}/details")
+    assert r.headers.get("ETag") is None
+    assert r.get_json()["exercises"][0]["sets"][0]["weight"] == 50
+
+    # Finishing applies the latest queued value
+    client.post(f"/workouts/{workout.id}/finish")
+    db.session.expire_all()
+    assert db.session.get(ExerciseSet, set_id).weight == 50
+
+
+def test_due_autosaves_are_applied_by_the_next_save(db_app):
+    from app.workouts.models import ExerciseSet, PendingSetUpdate
+
+    db_app.config["SET_AUTOSAVE_WINDOW"] = 1e-6
+    user = make_user("flush")
+    day = make_plan_day(user, exercises=1, sets=1)
+    client = login(db_app, user)
+    workout = start(client, day)
+    (set_id,) = set_ids(workout)
+
+    r = client.post(
+        f"/workouts/{workout.id}/sets",
+        json={"sets": [{"id": set_id, "weight": "heavy", "reps": 3}]},
+    )
+    assert r.status_code == 400
+    r = client.post(
+        f"/workouts/{workout.id}/sets",
+        json={"sets": [{"id": set_id, "weight": 70, "reps": 3}]},
+    )
+    assert r.status_code == 202
+    db.session.expire_all()
+    assert db.session.get(ExerciseSet, set_id).weight == 70
+    assert db.session.scalar(db.select(db.func.count(PendingSetUpdate.set_id))) == 0
+
+def test_archive_and_compact_keep_totals_and_restore(db_app):
+    from app.workouts.archive import archive_batch, compact_batch, restore_session
+    from app.workouts.models import WorkoutSession
+    from app.workouts.records import rebuild_personal_records
+    from app.workouts.stats import rebuild_user_stats
+
+    user = make_user("archive")
+    day = make_plan_day(user)
+    client = login(db_app, user)
+    workout = start(client, day, on=datetime.utcnow().date() - timedelta(days=400))
+    log_sets(client, workout, 60)
+    client.post(f"/workouts/{workout.id}/finish")
+    before = stats_row(user)
+    details = client.get(f"/workouts/{workout.id}/details").get_json()
+
+    cutoff = datetime.utcnow().date()
+    for move in (archive_batch, compact_batch):
+        assert move(cutoff) == 1
+        db.session.commit()
+        rebuild_user_stats(user.id)
+        rebuild_personal_records(user.id)
+        db.session.commit()
+        assert stats_row(user) == before
+
+    workout = db.session.get(WorkoutSession, workout.id)
+    assert restore_session(workout)
+    db.session.commit()
+    restored = client.get(f"/workouts/{workout.id}/details").get_json()
+    assert restored["exercises"] == details["exercises"]
+
+
+def test_archived_session_restores_on_edit_only(db_app):
+    from app.workouts.archive import archive_batch
+    from app.workouts.models import WorkoutSession
+
+    user = make_user("archived")
+    day = make_plan_day(user, exercises=1, sets=1)
+    client = login(db_app, user)
+    workout = start(client, day, on=datetime.utcnow().date() - timedelta(days=400))
+    (set_id,) = set_ids(workout)
+    client.post(f"/workouts/{workout.id}/finish")
+    assert archive_batch(datetime.utcnow().date()) == 1
+    db.session.commit()
+
+    # Viewing stays read-only
+    page = client.get(f"/workouts/active/{workout.id}")
+    assert page.status_code == 200 and b"read-only" in page.data
+    db.session.expire_all()
+    assert db.session.get(WorkoutSession, workout.id).archived_at is not None
+
+    r = client.post(f"/workouts/set/{set_id}/update", json={"weight": 50, "reps": 5})
+    assert r.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(WorkoutSession, workout.id).archived_at is None
+
+
+def test_stats_increments_match_rebuild(db_app):
+    from app.workouts.stats import rebuild_user_stats
+
+    user = make_user("stats")
+    day = make_plan_day(user)
+    client = login(db_app, user)
+    today = datetime.utcnow().date()
+
+    for days_ago, weight in ((3, 60), (1, 70)):
+        workout = start(client, day, on=today - timedelta(days=days_ago))
+        log_sets(client, workout, weight)
+        client.post(f"/workouts/{workout.id}/finish")
+    # Edit and delete sets of the finished workout
+    first, second = set_ids(workout)[:2]
+    client.post(f"/workouts/set/{first}/update", json={"weight": 90, "reps": 5})
+    client.post(f"/workouts/set/{second}/delete")
+
+    incremental = stats_row(user)
+    rebuild_user_stats(user.id)
+    db.session.commit()
+    assert stats_row(user) == incremental
+    assert incremental[0] == 2
+    assert incremental[4] == 6 * 60 * 5 + 90 * 5 + 4 * 70 * 5
+
+
+def test_sync_replay_is_idempotent(db_app):
+    from app.workouts.models import WorkoutSession
+
+    user = make_user("sync")
+    day = make_plan_day(user, exercises=1, sets=2)
+    client = login(db_app, user)
+    mutations = [
+        {"id": "m1", "type": "start", "client_id": "w-1", "plan_day_id": day.id},
+        {"id": "m2", "type": "set", "workout_client_id": "w-1", "order": 1,
+         "set_number": 1, "weight": 60, "reps": 5, "is_completed": True},
+        {"id": "m3", "type": "delete_set", "workout_client_id": "w-1", "order": 1,
+         "set_number": 2},
+        {"id": "m4", "type": "finish", "workout_client_id": "w-1",
+         "finished_at": "2026-10-18T10:00:00+02:00"},
+    ]
+
+    first = client.post("/workouts/sync", json={"mutations": mutations}).get_json()
+    assert [r["status"] for r in first["results"]] == ["applied"] * 4
+    replay = client.post(
+        "/workouts/sync", json={"since": first["version"], "mutations": mutations}
+    ).get_json()
+    assert [r["status"] for r in replay["results"]] == ["applied"] * 4
+
+    workout = WorkoutSession.query.one()
+    assert workout.is_completed and workout.summary_volume == 300
+    assert workout.end_time == datetime(2026, 10, 18, 8, 0)
+    assert len(set_ids(workout)) == 1
+
+    # A bad value rejects its own mutation, not the batch
+    (set_id,) = set_ids(workout)
+    bad = {"type": "set", "set_id": set_id}
+    results = client.post(
+        "/workouts/sync",
+        json={
+            "mutations": [
+                dict(bad, id="m5", weight="heavy"),
+                dict(bad, id="m6", reps=1e400),
+                dict(bad, id="m7", weight=65, reps=5, is_completed=True),
+            ]
+        },
+    ).get_json()["results"]
+    assert [r["status"] for r in results] == ["rejected", "rejected", "applied"]
+
+
+def test_workout_details_etag(db_app):
+    user = make_user("etag")
+    day = make_plan_day(user)
+    client = login(db_app, user)
+    workout = start(client, day)
+
+    r = client.get(f"/workouts/{workout.id}/details")
+    etag = r.headers["ETag"]
+    assert r.status_code == 200
+    r = client.get(f"/workouts/{workout.id}/details", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    log_sets(client, workout, 50)
+    r = client.get(f"/workouts/{workout.id}/details", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["ETag"] != etag
+    assert r.get_json()["exercises"][0]["sets"][0]["weight"] == 50
+
+    stranger = login(db_app, make_user("stranger"))
+    r = stranger.get(f"/workouts/{workout.id}/details", headers={"If-None-Match": etag})
+    assert r.status_code == 403
+
+
+def test_deleting_record_set_falls_back_to_next_best(db_app):
+    from app.workouts.models import PersonalRecord
+
+    user = make_user("records")
+    day = make_plan_day(user, exercises=1, sets=2)
+    client = login(db_app, user)
+    workout = start(client, day)
+    heavy, light = set_ids(workout)
+    client.post(
+        f"/workouts/{workout.id}/sets",
+        json={
+            "sets": [
+                {"id": heavy, "weight": 100, "reps": 5, "is_completed": True},
+                {"id": light, "weight": 80, "reps": 5, "is_completed": True},
+            ]
+        },
+    )
+    client.post(f"/workouts/{workout.id}/finish")
+    assert PersonalRecord.query.one().max_weight == 100
+
+    client.post(f"/workouts/set/{heavy}/delete")
+    db.session.expire_all()
+    record = PersonalRecord.query.one()
+    assert (record.max_weight, record.max_weight_set_id) == (80, light)
+
+
+def test_streak_counts_consecutive_days(db_app):
+    from app.workouts.stats import read_user_stats
+
+    user = make_user("streak")
+    day = make_plan_day(user)
+    client = login(db_app, user)
+    today = datetime.utcnow().date()
+
+    for days_ago in (5, 2, 1, 0):
+        workout = start(client, day, on=today - timedelta(days=days_ago))
+        client.post(f"/workouts/{workout.id}/finish")
+
+    stats = read_user_stats(user.id)
+    assert (stats["current_streak"], stats["longest_streak"]) == (3, 3)
+
+
+def test_bulk_nutrition_duplicate_keys(db_app):
+    user = make_user("nutrition")
+    client = db_app.test_client()
+    entry = {"user_id": user.id, "name": "Creatine", "amount": "5 g",
+             "idempotency_key": "dose-1"}
+
+    r = client.post("/nutrition/bulk", json={"entries": [entry, entry]})
+    first, repeat = r.get_json()["results"]
+    assert first["status"] == "created"
+    assert (repeat["status"], repeat["id"]) == ("duplicate", first["id"])
+
+    r = client.post("/nutrition/bulk", json={"entries": [entry]})
+    (retry,) = r.get_json()["results"]
+    assert (retry["status"], retry["id"]) == ("duplicate", first["id"])